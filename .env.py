@@ -6,4 +6,55 @@ REDSHIFT_HOST=your_redshift_host
 REDSHIFT_PORT=your_redshift_port
 AWS_ACCESS_KEY_ID=your_aws_access_key_id
 AWS_SECRET_ACCESS_KEY=your_aws_secret_access_key
-AWS_DEFAULT_REGION=your_default_aws_region
\ No newline at end of file
+AWS_DEFAULT_REGION=your_default_aws_region
+REDSHIFT_POOL_MIN_SIZE=1
+REDSHIFT_POOL_MAX_SIZE=10
+REDSHIFT_POOL_IDLE_TIMEOUT=300
+REDSHIFT_POOL_CHECKOUT_TIMEOUT=30
+REDSHIFT_POOL_HEALTH_CHECK_INTERVAL=30
+REDSHIFT_STATEMENT_TIMEOUT_MS=60000
+REDSHIFT_MAINTENANCE_STATEMENT_TIMEOUT_MS=0
+TRANSLATION_CACHE_ENABLED=1
+TRANSLATION_CACHE_SIZE=256
+TRANSLATION_CACHE_TTL=604800
+LLM_MAX_CONCURRENCY=8
+DB_MAX_CONCURRENCY=4
+SCHEMA_TOP_K_TABLES=2
+PIPELINE_SETUP_CONCURRENCY=8
+BULK_LOAD_MODE=redshift
+BULK_LOAD_BATCH_SIZE=5000
+BULK_LOAD_FLUSH_INTERVAL=30
+SQL_MAX_ROWS=1000
+SQL_MAX_COST=50000000
+SQL_EXPLAIN_ENABLED=1
+SCHEMA_DIALECT=redshift
+LATEST_REFRESH_LOOKBACK_SECONDS=3600
+QUERY_BACKEND=redshift
+TRACE_EXPORTERS=none
+TRACE_METRICS_PORT=0
+ANSWER_STREAMING=1
+PIPELINE_SETUP_BACKGROUND=1
+PIPELINE_FORCE_SETUP=0
+AGENT_SERVER_PORT=8080
+AGENT_SERVER_WORKERS=8
+AGENT_SERVER_QUEUE_SIZE=64
+AGENT_SERVER_REQUEST_TIMEOUT=120
+SQL_REPAIR_ATTEMPTS=2
+SQL_FEW_SHOT_EXAMPLES=3
+SQL_EXAMPLES_ENABLED=1
+SQL_EXAMPLES_MAX=2000
+INTENT_ROUTER_ENABLED=1
+LOCAL_ANSWERS_ENABLED=1
+LOCAL_ANSWER_SCAN_ROWS=200
+LOCAL_ANSWER_MAX_ROWS=20
+ANSWER_CACHE_ENABLED=1
+ANSWER_CACHE_SIZE=256
+ANSWER_CACHE_TTL=86400
+SCHEMA_CACHE_TTL=300
+SCHEMA_STATS_SAMPLE_ROWS=100000
+WAREHOUSE_MAX_CONCURRENCY=8
+WAREHOUSE_MAX_PER_USER=2
+WAREHOUSE_INTERACTIVE_RESERVED=2
+WAREHOUSE_QUEUE_TIMEOUT=30
+WAREHOUSE_INTERACTIVE_STATEMENT_TIMEOUT_MS=60000
+WAREHOUSE_BATCH_STATEMENT_TIMEOUT_MS=30000
\ No newline at end of file
@@ -0,0 +1,264 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+import natural_language_query_agent as agent
+from query_backends import get_query_backend
+from query_scheduler import QueryCancelled, QueryContext, QueueTimeout
+from query_tracing import render_metrics, trace_query
+from sql_guardrail import QueryRejected
+from translation_cache import normalize_question
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_PORT = int(os.getenv("AGENT_SERVER_PORT", 8080))
+# Questions answered concurrently; each holds one LLM call or one query at a time.
+DEFAULT_SERVER_WORKERS = int(os.getenv("AGENT_SERVER_WORKERS", 8))
+# Distinct questions allowed to wait for a worker; beyond this callers get 503 + Retry-After.
+DEFAULT_SERVER_QUEUE_SIZE = int(os.getenv("AGENT_SERVER_QUEUE_SIZE", 64))
+# How long a caller waits for its answer before getting 504; a question nobody waits for is cancelled.
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("AGENT_SERVER_REQUEST_TIMEOUT", 120))
+MAX_QUESTION_BYTES = 4096
+
+
+class ServerBusy(Exception):
+    """The request queue is full; the caller should retry later."""
+
+
+class QueryService:
+    """Answers questions on a fixed worker pool, sharing one run between identical in-flight questions.
+
+    A user asking a question they already have queued or running waits for that run's answer
+    instead of generating and executing the same SQL again. Runs are shared only within a user,
+    so each user's questions count against their own warehouse limits and one user giving up
+    never cancels another's. Only distinct runs take a slot in the bounded queue. Once every
+    caller of a run has given up, the run is cancelled along with its warehouse queries.
+    """
+
+    def __init__(self, workers=DEFAULT_SERVER_WORKERS, queue_size=DEFAULT_SERVER_QUEUE_SIZE,
+                 answer=agent.process_user_query):
+        self.answer = answer
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "rejected_busy": 0, "completed": 0, "failed": 0, "abandoned": 0}
+        self._workers = [threading.Thread(target=self._work, name=f"agent-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, question, correlation_id, user="anonymous"):
+        """Return (future, correlation ID of the run answering it, coalesced).
+
+        A new run's warehouse queries are scheduled as user's, at batch priority.
+        Raises ServerBusy when the queue is full.
+        """
+        key = (user, normalize_question(question))
+        with self._lock:
+            self.stats["requests"] += 1
+            running = self._in_flight.get(key)
+            if running is not None:
+                self.stats["coalesced"] += 1
+                running[3] += 1
+                return running[0], running[1], True
+            future = concurrent.futures.Future()
+            context = QueryContext(user, "batch")
+            try:
+                self._queue.put_nowait((key, question, correlation_id, future, context))
+            except queue.Full:
+                self.stats["rejected_busy"] += 1
+                raise ServerBusy(f"{self._queue.maxsize} questions already waiting")
+            # future, correlation ID, query context, callers waiting
+            self._in_flight[key] = [future, correlation_id, context, 1]
+        return future, correlation_id, False
+
+    def abandon(self, question, future, user="anonymous"):
+        """A caller stopped waiting for future; cancel its run if nobody else is waiting for it."""
+        key = (user, normalize_question(question))
+        with self._lock:
+            running = self._in_flight.get(key)
+            if running is None or running[0] is not future:
+                return
+            running[3] -= 1
+            if running[3]:
+                return
+            # New callers start a fresh run instead of joining the cancelled one.
+            del self._in_flight[key]
+            self.stats["abandoned"] += 1
+        running[2].cancel()
+
+    def _work(self):
+        while True:
+            key, question, correlation_id, future, context = self._queue.get()
+            try:
+                if context.cancelled:
+                    raise QueryCancelled(f"Question from {context.user} was abandoned before it started")
+                with trace_query(question, correlation_id), context:
+                    future.set_result(self.answer(question))
+                outcome = "completed"
+            except Exception as e:
+                future.set_exception(e)
+                outcome = "failed"
+            finally:
+                with self._lock:
+                    if self._in_flight.get(key, [None])[0] is future:
+                        del self._in_flight[key]
+                    self.stats[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, queued=self._queue.qsize(), in_flight=len(self._in_flight))
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """POST /query {"question": ...} (optional X-User header); GET /health; GET /metrics."""
+
+    service = None
+    request_timeout = DEFAULT_REQUEST_TIMEOUT
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, payload, content_type="application/json", headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", **self.service.snapshot()})
+        elif self.path == "/metrics":
+            self._send(200, render_metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/query":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body's extent is unknown, so the connection cannot be reused for another request.
+            self.close_connection = True
+            self._send(400, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_QUESTION_BYTES:
+            # The unread body would be parsed as the next request on a kept-alive connection.
+            self.close_connection = True
+            self._send(413, {"error": f"request larger than {MAX_QUESTION_BYTES} bytes"})
+            return
+        try:
+            question = json.loads(self.rfile.read(length) or b"{}").get("question", "").strip()
+        except (ValueError, AttributeError):
+            question = ""
+        if not question:
+            self._send(400, {"error": 'expected a JSON body like {"question": "..."}'})
+            return
+
+        started = time.perf_counter()
+        correlation_id = self.headers.get("X-Correlation-ID") or uuid.uuid4().hex[:16]
+        # Warehouse concurrency limits apply per user; without X-User each client address is one user.
+        user = self.headers.get("X-User") or str(self.client_address[0])
+        try:
+            future, correlation_id, coalesced = self.service.submit(question, correlation_id, user)
+        except ServerBusy as e:
+            self._send(503, {"error": f"server busy: {e}"}, headers={"Retry-After": "1"})
+            return
+        # A coalesced caller gets the ID of the run that answered it, which is what the trace is under.
+        headers = {"X-Correlation-ID": correlation_id}
+        try:
+            answer = future.result(timeout=self.request_timeout)
+        except concurrent.futures.TimeoutError:
+            self.service.abandon(question, future, user)
+            self._send(504, {"error": f"no answer within {self.request_timeout:g}s"}, headers=headers)
+            return
+        except QueueTimeout as e:
+            self._send(503, {"error": f"warehouse busy: {e}"}, headers=dict(headers, **{"Retry-After": "5"}))
+            return
+        except QueryRejected as e:
+            self._send(422, {"error": f"query rejected: {e.reason}"}, headers=headers)
+            return
+        except Exception as e:
+            self._send(500, {"error": str(e)}, headers=headers)
+            return
+        self._send(200, {"answer": answer, "coalesced": coalesced,
+                         "seconds": round(time.perf_counter() - started, 3)}, headers=headers)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP over a Unix domain socket, for callers on the same host."""
+
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address.
+        return request, ("unix", 0)
+
+
+def warm_up():
+    """Open the backend connection and build the schema index before the first caller arrives."""
+    started = time.perf_counter()
+    get_query_backend().execute("SELECT 1")
+    agent.get_prompt_schema("warm up")
+    logger.info("Agent warmed up in %.2fs", time.perf_counter() - started)
+
+
+def create_server(port=DEFAULT_SERVER_PORT, host="127.0.0.1", unix_socket=None, service=None,
+                  request_timeout=DEFAULT_REQUEST_TIMEOUT):
+    """Build (but do not start) an HTTP server answering questions through a QueryService."""
+    handler = type("AgentHandler", (AgentRequestHandler,), {
+        "service": service or QueryService(), "request_timeout": request_timeout})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        return UnixHTTPServer(unix_socket, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve natural-language AWS questions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT)
+    parser.add_argument("--unix-socket", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=DEFAULT_SERVER_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_SERVER_QUEUE_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    warm_up()
+    server = create_server(args.port, args.host, args.unix_socket, QueryService(args.workers, args.queue_size))
+    print(f"Agent server listening on {args.unix_socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import datetime
+import decimal
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from result_formatter import WIDE_COLUMNS
+from translation_cache import normalize_question
+
+DEFAULT_ANSWER_CACHE_PATH = ".answer_cache.sqlite3"
+DEFAULT_ANSWER_CACHE_SIZE = 256
+DEFAULT_ANSWER_CACHE_TTL = 24 * 3600
+# Rows kept from each result so small ones can be answered without the model.
+DEFAULT_LOCAL_SCAN_ROWS = 200
+# Largest plain table rendered locally; bigger grouped aggregates are shown as a top-N.
+DEFAULT_LOCAL_MAX_ROWS = 20
+DEFAULT_LOCAL_TOP_N = 10
+MAX_LOCAL_TEXT_CHARS = 60
+
+# Questions asking for explanation or judgement get a written answer whatever the rows look like.
+NARRATIVE_WORDS = re.compile(
+    r"\b(?:why|explain|summari[sz]e|summary|describe|recommend|should|analy[sz]e|insights?|trends?|compare|"
+    r"comparison|anomal\w*|unusual|suspicious)\b",
+    re.IGNORECASE,
+)
+# Numeric columns whose values can be added up across groups; ratios and averages cannot.
+ADDITIVE_COLUMN = re.compile(r"count|total|sum|cost|spend|usage|resources|instances|errors|rows|bytes|size")
+NON_ADDITIVE_COLUMN = re.compile(r"avg|average|mean|ratio|rate|percent|pct|utilization|min|max|median|_id$")
+
+QueryResult = namedtuple("QueryResult", ["sql", "columns", "rows", "formatted"])
+QueryResult.__doc__ = """Executed SQL, its column names, every row if the result was small (else None), and the prompt encoding."""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, decimal.Decimal)) and not isinstance(value, bool)
+
+
+def _label(column):
+    """Readable column label; DuckDB names COUNT(*) 'count_star()'."""
+    return re.sub(r"_star\(\)$|\(\*\)$", "", column)
+
+
+def format_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, (float, decimal.Decimal)):
+        value = float(value)
+        return f"{value:,.0f}" if value.is_integer() and abs(value) < 1e15 else f"{value:,.2f}"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def aligned_table(columns, rows, footer=None):
+    """Fixed-width text table, numbers right-aligned, with an optional footer row under a rule."""
+    numeric = [all(_is_number(row[i]) for row in rows if row[i] is not None) for i in range(len(columns))]
+    body = [[format_cell(value) for value in row] for row in rows]
+    footer_cells = [format_cell(value) if _is_number(value) else (value or "") for value in footer] if footer else None
+    lines_cells = [[_label(column) for column in columns]] + body + ([footer_cells] if footer_cells else [])
+    widths = [max(len(cells[i]) for cells in lines_cells) for i in range(len(columns))]
+
+    def line(cells):
+        return "  ".join(cell.rjust(width) if is_numeric else cell.ljust(width)
+                         for cell, width, is_numeric in zip(cells, widths, numeric)).rstrip()
+
+    lines = [line(lines_cells[0]), line(["-" * width for width in widths])]
+    lines.extend(line(cells) for cells in body)
+    if footer_cells:
+        lines.append(line(["-" * width for width in widths]))
+        lines.append(line(footer_cells))
+    return "\n".join(lines)
+
+
+def additive_columns(columns, rows):
+    """Indexes of numeric columns whose sum across rows means something."""
+    return [
+        i for i, column in enumerate(columns)
+        if all(_is_number(row[i]) for row in rows if row[i] is not None)
+        and any(row[i] is not None for row in rows)
+        and ADDITIVE_COLUMN.search(column.lower()) and not NON_ADDITIVE_COLUMN.search(column.lower())
+    ]
+
+
+def totals_footer(columns, rows, label="Total"):
+    summed = additive_columns(columns, rows)
+    if not summed or len(rows) < 2:
+        return None
+    footer = [None] * len(columns)
+    footer[0] = label
+    for i in summed:
+        footer[i] = sum(row[i] for row in rows if row[i] is not None)
+    return footer if 0 not in summed else None
+
+
+def is_grouped_aggregate(columns, rows):
+    """Leading label columns followed only by numeric measures, e.g. region, COUNT(*)."""
+    numeric = [all(_is_number(row[i]) for row in rows if row[i] is not None) for i in range(len(columns))]
+    if numeric[0] or not numeric[-1]:
+        return False
+    first_measure = numeric.index(True)
+    return all(numeric[first_measure:])
+
+
+def render_local_answer(question, result, max_rows=DEFAULT_LOCAL_MAX_ROWS, top_n=DEFAULT_LOCAL_TOP_N):
+    """Answer text rendered from the rows alone, or None if the result needs the answer model.
+
+    Handles empty results, single values, single records, tables of up to max_rows rows and
+    grouped aggregates of any captured size (as their top_n groups plus the rest).
+    """
+    if result.rows is None or NARRATIVE_WORDS.search(question):
+        return None
+    rows, columns = result.rows, result.columns
+    if not rows:
+        return "No matching rows were found."
+    if not columns or any(column.lower() in WIDE_COLUMNS for column in columns):
+        return None
+    if any(isinstance(value, str) and len(value) > MAX_LOCAL_TEXT_CHARS for row in rows for value in row):
+        return None
+
+    if len(rows) == 1 and len(columns) == 1:
+        return f"{_label(columns[0])}: {format_cell(rows[0][0])}"
+    if len(rows) == 1:
+        width = max(len(_label(column)) for column in columns)
+        return "\n".join(f"{_label(column).ljust(width)}  {format_cell(value)}" for column, value in zip(columns, rows[0]))
+    if len(rows) <= max_rows:
+        table = aligned_table(columns, rows, totals_footer(columns, rows))
+        return f"{len(rows)} rows:\n\n{table}"
+    if not is_grouped_aggregate(columns, rows):
+        return None
+
+    measure = next(i for i in range(len(columns)) if all(_is_number(row[i]) for row in rows if row[i] is not None))
+    ranked = sorted(rows, key=lambda row: row[measure] if row[measure] is not None else float("-inf"), reverse=True)
+    top, rest = ranked[:top_n], ranked[top_n:]
+    shown = list(top)
+    summed = additive_columns(columns, rows)
+    if summed and 0 not in summed:
+        others = [None] * len(columns)
+        others[0] = f"({len(rest)} others)"
+        for i in summed:
+            others[i] = sum(row[i] for row in rest if row[i] is not None)
+        shown.append(tuple(others))
+    table = aligned_table(columns, shown, totals_footer(columns, rows))
+    return f"Top {len(top)} of {len(rows)} groups by {_label(columns[measure])}:\n\n{table}"
+
+
+def result_fingerprint(question, sql_query, formatted_data):
+    """Key for an answer: the question, the SQL and exactly what the answer model would have been shown.
+
+    The question is part of the key because different questions can run the same SQL yet need different answers.
+    """
+    digest = hashlib.sha256()
+    digest.update(normalize_question(question).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(" ".join(sql_query.split()).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(formatted_data.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """Model answers keyed by result_fingerprint, in a bounded in-memory LRU backed by SQLite with TTL.
+
+    The same question over unchanged data under the same SQL produces the same fingerprint, so it
+    is answered again without a model call; any change in the rows shown to the model misses.
+    """
+
+    def __init__(self, path=DEFAULT_ANSWER_CACHE_PATH, max_entries=DEFAULT_ANSWER_CACHE_SIZE,
+                 ttl_seconds=DEFAULT_ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # fingerprint -> (answer, created_at)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                fingerprint TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - ttl_seconds,))
+        self._db.commit()
+
+    def _remember(self, fingerprint, entry):
+        self._memory[fingerprint] = entry
+        self._memory.move_to_end(fingerprint)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, question, sql_query, formatted_data):
+        """Return the answer given last time this question's SQL returned this data, or None."""
+        fingerprint = result_fingerprint(question, sql_query, formatted_data)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(fingerprint)
+            if entry is None or now - entry[1] >= self.ttl_seconds:
+                row = self._db.execute(
+                    "SELECT answer, created_at FROM answers WHERE fingerprint = ?", (fingerprint,)
+                ).fetchone()
+                if row is None or now - row[1] >= self.ttl_seconds:
+                    self._memory.pop(fingerprint, None)
+                    self._stats["misses"] += 1
+                    return None
+                entry = tuple(row)
+            self._remember(fingerprint, entry)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, question, sql_query, formatted_data, answer):
+        fingerprint = result_fingerprint(question, sql_query, formatted_data)
+        entry = (answer, time.time())
+        with self._lock:
+            self._remember(fingerprint, entry)
+            self._db.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", (fingerprint,) + entry)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Return the process-wide answer cache, or None if disabled via ANSWER_CACHE_ENABLED=0."""
+    global _cache
+    if os.getenv("ANSWER_CACHE_ENABLED", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(
+                path=os.getenv("ANSWER_CACHE_PATH", DEFAULT_ANSWER_CACHE_PATH),
+                max_entries=int(os.getenv("ANSWER_CACHE_SIZE", DEFAULT_ANSWER_CACHE_SIZE)),
+                ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_ANSWER_CACHE_TTL)),
+            )
+        return _cache
@@ -1,12 +1,102 @@
 import boto3
+import datetime
+import inspect
 import json
 import os
 import subprocess
 from botocore.exceptions import ClientError
 
+from aws_config_pipeline import FIREHOSE_JSONPATHS, FIREHOSE_JSONPATHS_KEY, upload_firehose_jsonpaths
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql
+from incremental_collectors import MAX_CREATION_DATE_FILTER_DAYS, creation_date_filter
+from service_quota_collector import (DEFAULT_BATCH_SIZE, DEFAULT_REQUESTS_PER_SECOND, MAX_RETRIES, QUOTA_COLUMNS,
+                                     THROTTLING_ERROR_CODES, AdaptiveRateLimiter, BatchBuffer, call_with_backoff,
+                                     iter_pages, quota_row)
+
+AMI_WATERMARK_PARAMETER = '/aws-config-pipeline/ami-collector/watermark'
+
 def create_iam_roles():
     iam = boto3.client('iam')
 
+def ami_collector_handler(event, context):
+    """Return self-owned AMIs created since the SSM watermark, asking EC2 only for the days since it."""
+    ec2 = boto3.client('ec2')
+    ssm = boto3.client('ssm')
+    try:
+        watermark = ssm.get_parameter(Name=AMI_WATERMARK_PARAMETER)['Parameter']['Value']
+    except ssm.exceptions.ParameterNotFound:
+        watermark = ''
+    kwargs = {'Owners': ['self']}
+    date_filter = creation_date_filter(watermark)
+    if date_filter:
+        kwargs['Filters'] = [{'Name': 'creation-date', 'Values': date_filter}]
+    paginator = ec2.get_paginator('describe_images')
+    images = [image for page in paginator.paginate(**kwargs) for image in page['Images']
+              if image['CreationDate'] > watermark]
+    if images:
+        ssm.put_parameter(Name=AMI_WATERMARK_PARAMETER, Value=max(image['CreationDate'] for image in images),
+                          Type='String', Overwrite=True)
+    return json.dumps(images, default=str)
+
+def ami_collector_source():
+    """Inline Lambda code for the AMI collector: the handler above plus the helpers it uses."""
+    return "\n".join([
+        "import boto3",
+        "import datetime",
+        "import json",
+        f"MAX_CREATION_DATE_FILTER_DAYS = {MAX_CREATION_DATE_FILTER_DAYS}",
+        f"AMI_WATERMARK_PARAMETER = {AMI_WATERMARK_PARAMETER!r}",
+        inspect.getsource(creation_date_filter),
+        inspect.getsource(ami_collector_handler).replace("def ami_collector_handler(", "def handler(", 1),
+    ])
+
+def quota_collector_handler(event, context):
+    """Write every quota of every service in the Lambda's region to S3 as JSON lines, a batch per object."""
+    quotas = boto3.client('service-quotas')
+    s3 = boto3.client('s3')
+    bucket = os.environ['QUOTA_BUCKET']
+    region = os.environ['AWS_REGION']
+    prefix = f"quotas/{region}/{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}"
+    limiter = AdaptiveRateLimiter()
+    keys = []
+
+    def write(rows):
+        key = f"{prefix}/{len(keys):05d}.json"
+        body = "\n".join(json.dumps(dict(zip(QUOTA_COLUMNS, row))) for row in rows)
+        s3.put_object(Bucket=bucket, Key=key, Body=body.encode('utf-8'))
+        keys.append(key)
+
+    buffer = BatchBuffer(write, DEFAULT_BATCH_SIZE)
+    for service in iter_pages(limiter, quotas.list_services, 'Services'):
+        for quota in iter_pages(limiter, quotas.list_service_quotas, 'Quotas', ServiceCode=service['ServiceCode']):
+            buffer.add(quota_row(quota, region))
+    buffer.flush()
+    return json.dumps({'records': buffer.rows_written, 'objects': keys, 'throttles': limiter.throttles})
+
+def quota_collector_source():
+    """Inline Lambda code for the quota collector: the handler above plus the collector's pacing and batching."""
+    return "\n".join([
+        "import boto3",
+        "import datetime",
+        "import json",
+        "import os",
+        "import random",
+        "import threading",
+        "import time",
+        "from botocore.exceptions import ClientError",
+        f"DEFAULT_BATCH_SIZE = {DEFAULT_BATCH_SIZE}",
+        f"DEFAULT_REQUESTS_PER_SECOND = {DEFAULT_REQUESTS_PER_SECOND}",
+        f"MAX_RETRIES = {MAX_RETRIES}",
+        f"THROTTLING_ERROR_CODES = {THROTTLING_ERROR_CODES!r}",
+        f"QUOTA_COLUMNS = {QUOTA_COLUMNS!r}",
+        inspect.getsource(AdaptiveRateLimiter),
+        inspect.getsource(call_with_backoff),
+        inspect.getsource(iter_pages),
+        inspect.getsource(quota_row),
+        inspect.getsource(BatchBuffer),
+        inspect.getsource(quota_collector_handler).replace("def quota_collector_handler(", "def handler(", 1),
+    ])
+
 def create_cloudformation_template():
     template = {
         "AWSTemplateFormatVersion": "2010-09-09",
@@ -26,7 +116,8 @@ def create_cloudformation_template():
                         "ClusterJDBCURL": {"Ref": "RedshiftClusterJDBCURL"},
                         "CopyCommand": {
                             "DataTableName": "aws_config_resources",
-                            "CopyOptions": "JSON 'auto'"
+                            "DataTableColumns": ",".join(FIREHOSE_JSONPATHS),
+                            "CopyOptions": {"Fn::Sub": f"JSON 's3://aws-config-bucket-${{AWS::AccountId}}/{FIREHOSE_JSONPATHS_KEY}' TIMEFORMAT 'auto'"}
                         },
                         "Username": {"Ref": "RedshiftUsername"},
                         "Password": {"Ref": "RedshiftPassword"},
@@ -58,16 +149,7 @@ def create_cloudformation_template():
                     "Handler": "index.handler",
                     "Role": {"Fn::GetAtt": ["LambdaExecutionRole", "Arn"]},
                     "Code": {
-                        "ZipFile": {
-                            "Fn::Join": ["\n", [
-                                "import boto3",
-                                "import json",
-                                "def handler(event, context):",
-                                "    ec2 = boto3.client('ec2')",
-                                "    response = ec2.describe_images(Owners=['self'])",
-                                "    return json.dumps(response['Images'])"
-                            ]]
-                        }
+                        "ZipFile": ami_collector_source()
                     },
                     "Runtime": "python3.8",
                     "Timeout": 30
@@ -80,19 +162,14 @@ def create_cloudformation_template():
                     "Handler": "index.handler",
                     "Role": {"Fn::GetAtt": ["LambdaExecutionRole", "Arn"]},
                     "Code": {
-                        "ZipFile": {
-                            "Fn::Join": ["\n", [
-                                "import boto3",
-                                "import json",
-                                "def handler(event, context):",
-                                "    quotas = boto3.client('service-quotas')",
-                                "    response = quotas.list_service_quotas(ServiceCode='ec2')",
-                                "    return json.dumps(response['Quotas'])"
-                            ]]
-                        }
+                        "ZipFile": quota_collector_source()
+                    },
+                    "Environment": {
+                        "Variables": {"QUOTA_BUCKET": {"Ref": "AWSConfigBucket"}}
                     },
                     "Runtime": "python3.8",
-                    "Timeout": 30
+                    # Every service's quotas, paced to stay under the Service Quotas request rate.
+                    "Timeout": 900
                 }
             },
             "LambdaExecutionRole": {
@@ -110,7 +187,28 @@ def create_cloudformation_template():
                         "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
                         "arn:aws:iam::aws:policy/AmazonEC2ReadOnlyAccess",
                         "arn:aws:iam::aws:policy/ServiceQuotasReadOnlyAccess"
-                    ]
+                    ],
+                    "Policies": [{
+                        "PolicyName": "CollectorWatermarks",
+                        "PolicyDocument": {
+                            "Version": "2012-10-17",
+                            "Statement": [{
+                                "Effect": "Allow",
+                                "Action": ["ssm:GetParameter", "ssm:PutParameter"],
+                                "Resource": {"Fn::Sub": "arn:aws:ssm:${AWS::Region}:${AWS::AccountId}:parameter/aws-config-pipeline/*"}
+                            }]
+                        }
+                    }, {
+                        "PolicyName": "QuotaBatches",
+                        "PolicyDocument": {
+                            "Version": "2012-10-17",
+                            "Statement": [{
+                                "Effect": "Allow",
+                                "Action": ["s3:PutObject"],
+                                "Resource": {"Fn::Sub": "arn:aws:s3:::aws-config-bucket-${AWS::AccountId}/quotas/*"}
+                            }]
+                        }
+                    }]
                 }
             }
         },
@@ -153,51 +251,19 @@ def deploy_cloudformation_stack(stack_name, template_file, parameters):
     except ClientError as e:
         print(f"Error creating CloudFormation stack: {e}")
 
+def upload_stack_firehose_jsonpaths(stack_name):
+    """Once the stack exists, put the JSONPaths file its Firehose COPY reads into the stack's bucket."""
+    boto3.client('cloudformation').get_waiter('stack_create_complete').wait(StackName=stack_name)
+    account_id = boto3.client('sts').get_caller_identity()['Account']
+    upload_firehose_jsonpaths(boto3.client('s3'), f"aws-config-bucket-{account_id}")
+
 def create_redshift_tables():
     redshift = boto3.client('redshift-data')
     cluster_identifier = 'your-redshift-cluster-identifier'
     database = 'your-redshift-database'
     db_user = 'your-redshift-username'
 
-    sql_commands = """
-    CREATE TABLE IF NOT EXISTS cloudwatch_logs (
-        log_group VARCHAR(255),
-        log_stream VARCHAR(255),
-        timestamp TIMESTAMP,
-        message TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS ami_details (
-        ami_id VARCHAR(255),
-        name VARCHAR(255),
-        description TEXT,
-        creation_date TIMESTAMP,
-        owner_id VARCHAR(255)
-    );
-
-    CREATE TABLE IF NOT EXISTS quota_details (
-        service VARCHAR(255),
-        quota_name VARCHAR(255),
-        quota_value FLOAT,
-        used FLOAT,
-        unit VARCHAR(50)
-    );
-
-    CREATE TABLE IF NOT EXISTS service_limits (
-        service VARCHAR(255),
-        limit_name VARCHAR(255),
-        limit_value FLOAT,
-        unit VARCHAR(50)
-    );
-
-    CREATE TABLE IF NOT EXISTS cost_usage_reports (
-        time_period VARCHAR(50),
-        service VARCHAR(255),
-        cost FLOAT,
-        usage FLOAT,
-        unit VARCHAR(50)
-    );
-    """
+    sql_commands = "".join(generate_create_table_sql(define_extended_schema(), "redshift", if_not_exists=True).values())
 
     try:
         response = redshift.execute_statement(
@@ -226,6 +292,7 @@ def main():
         {'ParameterKey': 'RedshiftPassword', 'ParameterValue': 'your_redshift_password'}
     ]
     deploy_cloudformation_stack(stack_name, template_file, parameters)
+    upload_stack_firehose_jsonpaths(stack_name)
     
     # Create expanded set of tables in Redshift
     create_redshift_tables()
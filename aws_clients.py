@@ -0,0 +1,28 @@
+import threading
+import weakref
+
+_client_cache = weakref.WeakKeyDictionary()
+_account_ids = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+_account_lock = threading.Lock()
+
+
+def get_client(session, service, region=None):
+    """Return a cached boto3 client per (service, region); sessions are not thread-safe, clients are."""
+    key = (service, region)
+    with _cache_lock:
+        clients = _client_cache.setdefault(session, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = session.client(service, region_name=region)
+        return client
+
+
+def get_account_id(session):
+    """Return the caller's account ID, calling STS only once per session."""
+    # Regions set up in parallel all ask at once; the first caller looks it up, the rest wait for it.
+    with _account_lock:
+        account_id = _account_ids.get(session)
+        if account_id is None:
+            account_id = _account_ids[session] = get_client(session, 'sts').get_caller_identity()['Account']
+        return account_id
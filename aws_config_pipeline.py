@@ -1,16 +1,50 @@
 import boto3
 import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from botocore.exceptions import ClientError
+import psycopg2
 import time
 
+from aws_clients import get_account_id, get_client
+from aws_config_schema_design import create_index_sql, define_extended_schema, generate_create_table_sql
+from bulk_loader import AMI_COLUMNS, create_bulk_loader
+from incremental_collectors import (CONFIG_COLUMNS, LOG_COLUMNS, collect_new_config_items, collect_new_log_events,
+                                    collect_new_owned_amis, load_new_images)
+from latest_state import refresh_latest_resources
+from query_backends import get_query_backend
+from service_quota_collector import QUOTA_COLUMNS, collect_service_quotas
+from setup_state import SetupState, desired_state_fingerprint
+from watermark_store import get_watermark_store
+
+logger = logging.getLogger(__name__)
+
+# Number of regions set up concurrently
+DEFAULT_SETUP_CONCURRENCY = int(os.getenv("PIPELINE_SETUP_CONCURRENCY", 8))
+
+# Firehose COPYs AWS Config stream notifications, which carry the configuration item (status
+# included) under configurationItem; these JSONPaths map it onto the history table's columns.
+FIREHOSE_JSONPATHS = {
+    'resource_id': '$.configurationItem.resourceId',
+    'resource_type': '$.configurationItem.resourceType',
+    'region': '$.configurationItem.awsRegion',
+    'configuration': '$.configurationItem.configuration',
+    'tags': '$.configurationItem.tags',
+    'capture_time': '$.configurationItem.configurationItemCaptureTime',
+    'status': '$.configurationItem.configurationItemStatus',
+}
+FIREHOSE_JSONPATHS_KEY = 'jsonpaths/aws_config_resources.json'
+
 def enable_aws_config(session, region):
     """Enable AWS Config in the specified region."""
-    config = session.client('config', region_name=region)
+    config = get_client(session, 'config', region)
     try:
         config.put_configuration_recorder(
             ConfigurationRecorder={
                 'name': 'default',
-                'roleARN': f'arn:aws:iam::{session.client("sts").get_caller_identity()["Account"]}:role/aws-service-role/config.amazonaws.com/AWSServiceRoleForConfig',
+                'roleARN': f'arn:aws:iam::{get_account_id(session)}:role/aws-service-role/config.amazonaws.com/AWSServiceRoleForConfig',
                 'recordingGroup': {
                     'allSupported': True,
                     'includeGlobalResourceTypes': True
@@ -18,13 +52,15 @@ def enable_aws_config(session, region):
             }
         )
         config.start_configuration_recorder(ConfigurationRecorderName='default')
-        print(f"AWS Config enabled in region {region}")
+        logger.info("AWS Config enabled in region %s", region)
+        return True
     except ClientError as e:
-        print(f"Error enabling AWS Config in region {region}: {e}")
+        logger.error("Error enabling AWS Config in region %s: %s", region, e)
+        return False
 
 def create_streaming_delivery_channel(session, region, bucket_name, firehose_name):
     """Create a streaming delivery channel for AWS Config."""
-    config = session.client('config', region_name=region)
+    config = get_client(session, 'config', region)
     try:
         config.put_delivery_channel(
             DeliveryChannel={
@@ -34,130 +70,132 @@ def create_streaming_delivery_channel(session, region, bucket_name, firehose_nam
                     'deliveryFrequency': 'One_Hour'
                 },
                 'streamingDeliveryProperties': {
-                    'streamArn': f'arn:aws:kinesis::{session.client("sts").get_caller_identity()["Account"]}:stream/{firehose_name}'
+                    'streamArn': f'arn:aws:kinesis::{get_account_id(session)}:stream/{firehose_name}'
                 }
             }
         )
-        print(f"Streaming delivery channel created in region {region}")
+        logger.info("Streaming delivery channel created in region %s", region)
+        return True
     except ClientError as e:
-        print(f"Error creating streaming delivery channel in region {region}: {e}")
+        logger.error("Error creating streaming delivery channel in region %s: %s", region, e)
+        return False
 
-def create_firehose_delivery_stream(session, region, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password):
-    """Create a Kinesis Data Firehose delivery stream."""
-    firehose = session.client('firehose', region_name=region)
+def aws_config_converged(session, region, firehose_name, log_group_name):
+    """Cheap describe-based check that the region's recorder and log subscription are in place.
+
+    A recorder can only be recording while its delivery channel exists, so the channel needs no call of its own.
+    """
+    config = get_client(session, 'config', region)
+    logs = get_client(session, 'logs', region)
     try:
+        recorders = config.describe_configuration_recorder_status(ConfigurationRecorderNames=['default'])
+        if not all(status.get('recording') for status in recorders['ConfigurationRecordersStatus']):
+            return False
+        filters = logs.describe_subscription_filters(logGroupName=log_group_name, filterNamePrefix='FirehoseSubscription')
+        destination = f"arn:aws:firehose:{region}:{get_account_id(session)}:deliverystream/{firehose_name}"
+        return any(f.get('destinationArn') == destination for f in filters['subscriptionFilters'])
+    except ClientError:
+        return False
+
+def upload_firehose_jsonpaths(s3, bucket_name):
+    """Put the JSONPaths file Firehose's COPY reads into the bucket."""
+    s3.put_object(Bucket=bucket_name, Key=FIREHOSE_JSONPATHS_KEY,
+                  Body=json.dumps({'jsonpaths': list(FIREHOSE_JSONPATHS.values())}).encode('utf-8'))
+
+def firehose_copy_command(bucket_name, redshift_table_name):
+    """The COPY Firehose runs for each batch, mapping notification fields to columns via FIREHOSE_JSONPATHS."""
+    return {
+        'DataTableName': redshift_table_name,
+        'DataTableColumns': ','.join(FIREHOSE_JSONPATHS),
+        'CopyOptions': f"JSON 's3://{bucket_name}/{FIREHOSE_JSONPATHS_KEY}' TIMEFORMAT 'auto'"
+    }
+
+def create_firehose_delivery_stream(session, region, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password, bucket_name):
+    """Create a Kinesis Data Firehose delivery stream, uploading the JSONPaths file its COPY uses."""
+    firehose = get_client(session, 'firehose', region)
+    try:
+        upload_firehose_jsonpaths(get_client(session, 's3'), bucket_name)
         response = firehose.create_delivery_stream(
             DeliveryStreamName=firehose_name,
             DeliveryStreamType='DirectPut',
             RedshiftDestinationConfiguration={
-                'RoleARN': f'arn:aws:iam::{session.client("sts").get_caller_identity()["Account"]}:role/firehose_delivery_role',
+                'RoleARN': f'arn:aws:iam::{get_account_id(session)}:role/firehose_delivery_role',
                 'ClusterJDBCURL': redshift_cluster_jdbc_url,
-                'CopyCommand': {
-                    'DataTableName': redshift_table_name,
-                    'CopyOptions': "JSON 'auto'"
-                },
+                'CopyCommand': firehose_copy_command(bucket_name, redshift_table_name),
                 'Username': redshift_username,
                 'Password': redshift_password
             }
         )
-        print(f"Kinesis Data Firehose delivery stream created: {firehose_name}")
+        logger.info("Kinesis Data Firehose delivery stream created: %s", firehose_name)
         return response['DeliveryStreamARN']
     except ClientError as e:
-        print(f"Error creating Kinesis Data Firehose delivery stream: {e}")
+        logger.error("Error creating Kinesis Data Firehose delivery stream: %s", e)
         return None
 
-def get_database_schema():
-    return """
-    CREATE TABLE aws_config_resources (
-        resource_id VARCHAR(255),
-        resource_type VARCHAR(50),
-        region VARCHAR(20),
-        configuration JSON,
-        tags JSON,
-        capture_time TIMESTAMP
-    );
-
-    CREATE TABLE cloudwatch_logs (
-        log_group VARCHAR(255),
-        log_stream VARCHAR(255),
-        timestamp TIMESTAMP,
-        message TEXT
-    );
-
-    CREATE TABLE ami_details (
-        ami_id VARCHAR(255),
-        name VARCHAR(255),
-        description TEXT,
-        creation_date TIMESTAMP,
-        owner_id VARCHAR(255)
-    );
-
-    CREATE TABLE quota_details (
-        service VARCHAR(255),
-        quota_name VARCHAR(255),
-        quota_value FLOAT,
-        used FLOAT,
-        unit VARCHAR(50)
-    );
-
-    CREATE TABLE service_limits (
-        service VARCHAR(255),
-        limit_name VARCHAR(255),
-        limit_value FLOAT,
-        unit VARCHAR(50)
-    );
-
-    CREATE TABLE cost_usage_reports (
-        time_period VARCHAR(50),
-        service VARCHAR(255),
-        cost FLOAT,
-        usage FLOAT,
-        unit VARCHAR(50)
-    );
-    """
+def describe_firehose_delivery_stream(session, region, firehose_name):
+    """Return the delivery stream's ARN if it exists and is usable, else None."""
+    firehose = get_client(session, 'firehose', region)
+    try:
+        description = firehose.describe_delivery_stream(DeliveryStreamName=firehose_name)['DeliveryStreamDescription']
+    except ClientError:
+        return None
+    if description['DeliveryStreamStatus'] not in ('ACTIVE', 'CREATING'):
+        return None
+    return description['DeliveryStreamARN']
+
+def get_database_schema(dialect=None):
+    """Table DDL with the physical design for the query backend's dialect (Redshift by default)."""
+    dialect = dialect or get_query_backend().dialect
+    schemas = define_extended_schema()
+    tables = generate_create_table_sql(schemas, dialect, if_not_exists=True)
+    indexes = create_index_sql(schemas, dialect)
+    return "".join(tables.values()) + "\n".join(sql for sql in indexes.values() if sql)
 
 def setup_cloudwatch_logs_subscription(session, region, log_group_name, firehose_name):
     """Set up CloudWatch Logs subscription filter to stream logs to Kinesis Data Firehose."""
-    logs = session.client('logs', region_name=region)
+    logs = get_client(session, 'logs', region)
     try:
         logs.put_subscription_filter(
             logGroupName=log_group_name,
             filterName='FirehoseSubscription',
             filterPattern='',  # Empty string means all log events
-            destinationArn=f"arn:aws:firehose:{region}:{session.client('sts').get_caller_identity()['Account']}:deliverystream/{firehose_name}"
+            destinationArn=f"arn:aws:firehose:{region}:{get_account_id(session)}:deliverystream/{firehose_name}"
         )
-        print(f"CloudWatch Logs subscription filter created for {log_group_name}")
+        logger.info("CloudWatch Logs subscription filter created for %s in region %s", log_group_name, region)
+        return True
     except ClientError as e:
-        print(f"Error creating CloudWatch Logs subscription filter: {e}")
+        logger.error("Error creating CloudWatch Logs subscription filter in region %s: %s", region, e)
+        return False
 
 def collect_ami_details(session, region):
     """Collect AMI details using AWS Systems Manager."""
-    ssm = session.client('ssm', region_name=region)
+    ssm = get_client(session, 'ssm', region)
     try:
         response = ssm.get_parameter(Name='/aws/service/ami-amazon-linux-latest/amzn2-ami-hvm-x86_64-gp2')
         ami_id = response['Parameter']['Value']
-        ec2 = session.client('ec2', region_name=region)
+        ec2 = get_client(session, 'ec2', region)
         ami_details = ec2.describe_images(ImageIds=[ami_id])
-        print(f"Collected AMI details for {ami_id}")
+        logger.info("Collected AMI details for %s", ami_id)
         return ami_details
     except ClientError as e:
-        print(f"Error collecting AMI details: {e}")
+        logger.error("Error collecting AMI details: %s", e)
         return None
 
-def gather_service_quotas(session, region):
-    """Gather service quota information."""
-    quotas = session.client('service-quotas', region_name=region)
+def gather_service_quotas(session, region, service_code='ec2'):
+    """Gather every page of service quota information for one service."""
+    quotas = get_client(session, 'service-quotas', region)
     try:
-        response = quotas.list_service_quotas(ServiceCode='ec2')
-        print("Gathered service quota information")
-        return response['Quotas']
+        paginator = quotas.get_paginator('list_service_quotas')
+        service_quotas = [quota for page in paginator.paginate(ServiceCode=service_code) for quota in page['Quotas']]
+        logger.info("Gathered %s %s service quotas in region %s", len(service_quotas), service_code, region)
+        return service_quotas
     except ClientError as e:
-        print(f"Error gathering service quota information: {e}")
+        logger.error("Error gathering service quota information: %s", e)
         return None
 
 def setup_cost_usage_reports(session, bucket_name):
     """Set up AWS Cost and Usage Reports to deliver data to S3."""
-    cur = session.client('cur')
+    cur = get_client(session, 'cur')
     try:
         cur.put_report_definition(
             ReportDefinition={
@@ -174,13 +212,24 @@ def setup_cost_usage_reports(session, bucket_name):
                 'ReportVersioning': 'OVERWRITE_REPORT'
             }
         )
-        print("Set up AWS Cost and Usage Reports")
+        logger.info("Set up AWS Cost and Usage Reports")
+        return True
     except ClientError as e:
-        print(f"Error setting up AWS Cost and Usage Reports: {e}")
+        logger.error("Error setting up AWS Cost and Usage Reports: %s", e)
+        return False
+
+def cost_usage_report_converged(session, bucket_name):
+    """Check that the CUR definition exists and still delivers to the bucket."""
+    cur = get_client(session, 'cur')
+    try:
+        definitions = cur.describe_report_definitions()['ReportDefinitions']
+    except ClientError:
+        return False
+    return any(d['ReportName'] == 'CostUsageReport' and d['S3Bucket'] == bucket_name for d in definitions)
 
 def create_redshift_copy_command(session, bucket_name, redshift_table_name):
     """Create a Redshift COPY command to load CUR data from S3."""
-    account_id = session.client('sts').get_caller_identity()['Account']
+    account_id = get_account_id(session)
     region = session.region_name
     copy_command = f"""
     COPY {redshift_table_name}
@@ -190,40 +239,201 @@ def create_redshift_copy_command(session, bucket_name, redshift_table_name):
     """
     return copy_command
 
-def setup_aws_config_pipeline(regions, bucket_name, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password):
-    """Set up the complete AWS Config to Database pipeline."""
-    session = boto3.Session()
-    schema = get_database_schema()
-    execute_sql_query(schema)
-
-    for region in regions:
-        enable_aws_config(session, region)
-        create_streaming_delivery_channel(session, region, bucket_name, firehose_name)
-        
-        # Set up CloudWatch Logs subscription
-        setup_cloudwatch_logs_subscription(session, region, '/aws/lambda/example-function', firehose_name)
-        
+def create_database_tables(schema):
+    """Run the schema DDL against the database."""
+    backend = get_query_backend()
+    try:
+        backend.execute_script(schema)
+        logger.info("Database tables created")
+        return True
+    except backend.Error as e:
+        logger.error("Error creating database tables: %s", e)
+        return False
+
+def database_tables_exist():
+    """Check that every schema table can be read, without scanning any rows."""
+    backend = get_query_backend()
+    try:
+        for table in define_extended_schema():
+            backend.execute(f"SELECT * FROM {table} LIMIT 0", maintenance=True)
+        return True
+    except backend.Error:
+        return False
+
+def setup_region(session, region, bucket_name, firehose_name, log_group_name='/aws/lambda/example-function', state=None):
+    """Run the per-region setup steps and return a report of what succeeded.
+
+    With a SetupState, a region whose desired state was already applied (and still describes as
+    such) skips the put calls.
+    """
+    started = time.perf_counter()
+    report = {'region': region, 'steps': {}, 'error': None, 'skipped': False}
+    fingerprint = desired_state_fingerprint(step='region', region=region, bucket_name=bucket_name,
+                                            firehose_name=firehose_name, log_group_name=log_group_name)
+    try:
+        if state is not None and state.is_converged(region, fingerprint, lambda: aws_config_converged(
+                session, region, firehose_name, log_group_name)):
+            report['skipped'] = True
+            logger.info("AWS Config already set up in region %s", region)
+        else:
+            report['steps']['enable_aws_config'] = enable_aws_config(session, region)
+            report['steps']['create_streaming_delivery_channel'] = create_streaming_delivery_channel(session, region, bucket_name, firehose_name)
+
+            # Set up CloudWatch Logs subscription
+            report['steps']['setup_cloudwatch_logs_subscription'] = setup_cloudwatch_logs_subscription(session, region, log_group_name, firehose_name)
+            if state is not None and all(report['steps'].values()):
+                state.record(region, fingerprint)
+
         # Collect AMI details
-        ami_details = collect_ami_details(session, region)
-        
-        # Gather service quotas
-        service_quotas = gather_service_quotas(session, region)
+        report['ami_details'] = collect_ami_details(session, region)
+        report['steps']['collect_ami_details'] = report['ami_details'] is not None
+    except Exception as e:
+        # Anything other than a ClientError (e.g. missing credentials) must not take down the other regions.
+        report['error'] = str(e)
+        logger.error("Error setting up region %s: %s", region, e)
+    report['ok'] = report['error'] is None and all(report['steps'].values())
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+def load_collected_data(session, bucket_name, regions, region_reports, pull_logs_and_config=False,
+                        log_group_name='/aws/lambda/example-function'):
+    """Incrementally bulk-load AMI details and service quotas, staging COPY chunks in the bucket.
+
+    Each collector keeps a per-region watermark, so a run with nothing new performs no writes.
+    Deployments without Firehose streaming can also pull CloudWatch log events and Config items.
+    New Config captures are then merged into aws_config_resources_latest.
+    """
+    s3 = get_client(session, 's3')
+    iam_role = f'arn:aws:iam::{get_account_id(session)}:role/RedshiftCopyRole'
+    store = get_watermark_store()
+    database_error = get_query_backend().Error
+    stats = {}
+    try:
+        ami_loader = create_bulk_loader('ami_details', AMI_COLUMNS, s3, bucket_name, iam_role)
+        for region_report in region_reports:
+            region = region_report['region']
+            latest_images = (region_report.get('ami_details') or {}).get('Images', [])
+            load_new_images(latest_images, region, ami_loader, store, 'ami_details:latest-amazon-linux')
+            collect_new_owned_amis(session, region, ami_loader, store)
+        stats['ami_details'] = ami_loader.stats()
 
-    # Create Firehose delivery stream in a single region (e.g., the first region in the list)
-    firehose_arn = create_firehose_delivery_stream(session, regions[0], firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password)
+        quota_loader = create_bulk_loader('quota_details', QUOTA_COLUMNS, s3, bucket_name, iam_role)
+        stats['quota_details'] = collect_service_quotas(session, regions, sink=quota_loader.load, store=store)
+
+        if pull_logs_and_config:
+            log_loader = create_bulk_loader('cloudwatch_logs', LOG_COLUMNS, s3, bucket_name, iam_role)
+            config_loader = create_bulk_loader('aws_config_resources', CONFIG_COLUMNS, s3, bucket_name, iam_role)
+            for region in regions:
+                collect_new_log_events(session, region, log_group_name, log_loader, store)
+                collect_new_config_items(session, region, config_loader, store)
+            stats['cloudwatch_logs'] = log_loader.stats()
+            stats['aws_config_resources'] = config_loader.stats()
+
+        # Fold captures delivered since the last run (pulled above or streamed by Firehose) into the latest-state table
+        stats['aws_config_resources_latest'] = refresh_latest_resources(store)
+    except (ClientError, psycopg2.Error, database_error) as e:
+        logger.error("Error loading collected data: %s", e)
+        stats['error'] = str(e)
+    return stats
+
+def setup_aws_config_pipeline(regions, bucket_name, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password, session=None, max_workers=DEFAULT_SETUP_CONCURRENCY, force=None):
+    """Set up the complete AWS Config to Database pipeline, configuring regions in parallel.
+
+    Steps whose desired state was already applied for this account are skipped after a cheap
+    describe check; pass force=True (or set PIPELINE_FORCE_SETUP=1) to re-apply everything.
+    """
+    started = time.perf_counter()
+    session = session or boto3.Session()
+    # Resolve the account ID once before fanning out so workers share the memoized value.
+    state = SetupState(get_account_id(session), store=get_watermark_store(), force=force)
+    skipped = []
+
+    schema = get_database_schema()
+    backend = get_query_backend()
+    schema_fingerprint = desired_state_fingerprint(step='database', backend=backend.name, schema=schema)
+    if state.is_converged('database', schema_fingerprint, database_tables_exist):
+        tables_created = True
+        skipped.append('database')
+    else:
+        tables_created = create_database_tables(schema)
+        if tables_created:
+            state.record('database', schema_fingerprint)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(regions)))) as executor:
+        region_reports = list(executor.map(
+            lambda region: setup_region(session, region, bucket_name, firehose_name, state=state),
+            regions,
+        ))
+    skipped.extend(region_report['region'] for region_report in region_reports if region_report['skipped'])
+
+    # Bulk-load the collected AMI details and every service's quotas for all regions
+    load_stats = load_collected_data(session, bucket_name, regions, region_reports)
+
+    # Create Firehose delivery stream in a single region (e.g., the first region in the list).
+    # The password stays out of the fingerprint; after rotating it, run with PIPELINE_FORCE_SETUP=1.
+    firehose_scope = f'firehose:{regions[0]}'
+    firehose_fingerprint = desired_state_fingerprint(
+        step='firehose', region=regions[0], firehose_name=firehose_name, jdbc_url=redshift_cluster_jdbc_url,
+        table=redshift_table_name, copy_command=firehose_copy_command(bucket_name, redshift_table_name),
+        username=redshift_username)
+    if state.is_converged(firehose_scope, firehose_fingerprint,
+                          lambda: describe_firehose_delivery_stream(session, regions[0], firehose_name)):
+        firehose_arn = f"arn:aws:firehose:{regions[0]}:{state.account_id}:deliverystream/{firehose_name}"
+        skipped.append(firehose_scope)
+    else:
+        firehose_arn = create_firehose_delivery_stream(session, regions[0], firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password, bucket_name)
+        if firehose_arn:
+            state.record(firehose_scope, firehose_fingerprint)
 
     # Set up Cost and Usage Reports
-    setup_cost_usage_reports(session, bucket_name)
+    cur_fingerprint = desired_state_fingerprint(step='cost_usage_reports', bucket_name=bucket_name, region=session.region_name)
+    if state.is_converged('cost_usage_reports', cur_fingerprint, lambda: cost_usage_report_converged(session, bucket_name)):
+        skipped.append('cost_usage_reports')
+    elif setup_cost_usage_reports(session, bucket_name):
+        state.record('cost_usage_reports', cur_fingerprint)
 
     # Create Redshift COPY command for CUR data
     copy_command = create_redshift_copy_command(session, bucket_name, 'cost_usage_reports')
-    print("Redshift COPY command for CUR data:")
-    print(copy_command)
+    logger.info("Redshift COPY command for CUR data:\n%s", copy_command)
+
+    report = {
+        'tables_created': tables_created,
+        'firehose_arn': firehose_arn,
+        'loads': load_stats,
+        'regions': {region_report['region']: region_report for region_report in region_reports},
+        'failed_regions': [region_report['region'] for region_report in region_reports if not region_report['ok']],
+        'skipped': skipped,
+        'seconds': time.perf_counter() - started,
+    }
 
     if firehose_arn:
-        print("AWS Config to Database pipeline setup completed successfully.")
+        logger.info("AWS Config to Database pipeline setup completed successfully.")
     else:
-        print("Failed to set up AWS Config to Database pipeline.")
+        logger.error("Failed to set up AWS Config to Database pipeline.")
+    if report['failed_regions']:
+        logger.info("Regions with failed steps: %s", ', '.join(report['failed_regions']))
+    if skipped:
+        logger.info("Already converged, skipped: %s", ', '.join(skipped))
+    return report
+
+def start_pipeline_setup(*args, **kwargs):
+    """Run setup_aws_config_pipeline in a background thread and return a Future for its report.
+
+    The thread is a daemon so quitting does not wait for it; an interrupted setup records no
+    fingerprints and simply runs again on the next start.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(setup_aws_config_pipeline(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='pipeline-setup', daemon=True).start()
+    return future
 
 if __name__ == "__main__":
     # Replace these with your actual values
@@ -235,4 +445,5 @@ if __name__ == "__main__":
     redshift_username = 'your_redshift_username'
     redshift_password = 'your_redshift_password'
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     setup_aws_config_pipeline(regions, bucket_name, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password)
\ No newline at end of file
@@ -1,75 +1,236 @@
+import sys
+
+# Hot paths inside the JSON columns of the Config tables, copied into typed sidecar columns at
+# load time so common filters need no per-row JSON parsing. Add an entry to expose another one.
+HOT_JSON_PATHS = {
+    "instance_type": {"source": "configuration", "path": ["instanceType"], "type": "VARCHAR(50)", "description": "EC2 instance type (configuration.instanceType), e.g. t3.large.", "cardinality": "low"},
+    "instance_state": {"source": "configuration", "path": ["state", "name"], "type": "VARCHAR(20)", "description": "Instance state (configuration.state.name), e.g. running or stopped.", "cardinality": "low"},
+    "vpc_id": {"source": "configuration", "path": ["vpcId"], "type": "VARCHAR(50)", "description": "VPC the resource belongs to (configuration.vpcId)."},
+    "tag_env": {"source": "tags", "path": ["env"], "type": "VARCHAR(255)", "description": "Value of the env tag, e.g. prod.", "cardinality": "low"},
+    "tag_owner": {"source": "tags", "path": ["owner"], "type": "VARCHAR(255)", "description": "Value of the owner tag."},
+    "tag_team": {"source": "tags", "path": ["team"], "type": "VARCHAR(255)", "description": "Value of the team tag.", "cardinality": "low"},
+}
+HOT_JSON_TABLES = ("aws_config_resources_latest", "aws_config_resources")
+# Tables whose rows are replaced in place (latest_state's merge, quota slices replaced per run)
+# rather than only appended.
+MERGED_TABLES = ("aws_config_resources_latest", "quota_details")
+
+def hot_path_columns():
+    return [
+        {"name": name, "type": spec["type"], "description": spec["description"], **({"cardinality": spec["cardinality"]} if "cardinality" in spec else {})}
+        for name, spec in HOT_JSON_PATHS.items()
+    ]
+
+def json_path_sql(source, path, dialect="redshift"):
+    """SQL extracting the text at a nested JSON path; DuckDB takes one JSONPath instead of path elements."""
+    if dialect == "duckdb":
+        return f"JSON_EXTRACT_STRING({source}, '$.{'.'.join(path)}')"
+    path_elements = ", ".join(f"'{key}'" for key in path)
+    return f"JSON_EXTRACT_PATH_TEXT({source}, {path_elements})"
+
+def hot_path_backfill_sql(table_name, condition, dialect="redshift"):
+    """UPDATE filling the sidecar columns of rows matching condition from their JSON columns.
+
+    Covers rows loaded without extraction, such as those delivered by Firehose. Redshift returns
+    '' rather than NULL for a missing path, hence the NULLIF.
+    """
+    assignments = []
+    for name, spec in HOT_JSON_PATHS.items():
+        value = f"NULLIF({json_path_sql(spec['source'], spec['path'], dialect)}, '')"
+        if not spec["type"].upper().startswith("VARCHAR"):
+            value = f"CAST({value} AS {spec['type']})"
+        assignments.append(f"{name} = {value}")
+    return f"UPDATE {table_name} SET {', '.join(assignments)} WHERE {condition}"
+
+def hot_path_unextracted_sql(dialect="redshift"):
+    """Condition matching rows whose sidecar columns were never filled: all NULL, yet a hot path is present.
+
+    Rows whose documents contain none of the paths are left all NULL by a backfill, so they stop matching.
+    """
+    unfilled = " AND ".join(f"{name} IS NULL" for name in HOT_JSON_PATHS)
+    present = ", ".join(f"NULLIF({json_path_sql(spec['source'], spec['path'], dialect)}, '')"
+                        for spec in HOT_JSON_PATHS.values())
+    return f"{unfilled} AND COALESCE({present}) IS NOT NULL"
+
+# Besides name/type/description, columns declare how questions access them; the physical
+# design below is derived from these:
+#   "filter": "range"     - filtered by time windows / ranges (leads the sort key)
+#   "filter": "equality"  - filtered with = / IN (follows in the sort key)
+#   "distribute": True    - join/co-location key, used as the DISTKEY
+#   "cardinality": "low"  - few distinct values, dictionary-encoded
 def define_extended_schema():
     schemas = {
+        "aws_config_resources_latest": [
+            {"name": "resource_id", "type": "VARCHAR(255)", "description": "Unique identifier for the resource.", "distribute": True},
+            {"name": "resource_type", "type": "VARCHAR(50)", "description": "Type of AWS resource (e.g., EC2, S3).", "filter": "equality", "cardinality": "low"},
+            {"name": "region", "type": "VARCHAR(20)", "description": "AWS region where the resource is located.", "filter": "equality", "cardinality": "low"},
+            {"name": "configuration", "type": "JSON", "description": "AWS Config resource configuration."},
+            {"name": "tags", "type": "JSON", "description": "Tags applied to the resource."},
+            {"name": "capture_time", "type": "TIMESTAMP", "description": "Time the current configuration was captured."}
+        ],
         "aws_config_resources": [
-            {"name": "resource_id", "type": "VARCHAR(255)", "description": "Unique identifier for the resource."},
-            {"name": "resource_type", "type": "VARCHAR(50)", "description": "Type of AWS resource (e.g., EC2, S3)."},
-            {"name": "region", "type": "VARCHAR(20)", "description": "AWS region where the resource is located."},
+            {"name": "resource_id", "type": "VARCHAR(255)", "description": "Unique identifier for the resource.", "distribute": True},
+            {"name": "resource_type", "type": "VARCHAR(50)", "description": "Type of AWS resource (e.g., EC2, S3).", "filter": "equality", "cardinality": "low"},
+            {"name": "region", "type": "VARCHAR(20)", "description": "AWS region where the resource is located.", "filter": "equality", "cardinality": "low"},
             {"name": "configuration", "type": "JSON", "description": "AWS Config resource configuration."},
             {"name": "tags", "type": "JSON", "description": "Tags applied to the resource."},
-            {"name": "capture_time", "type": "TIMESTAMP", "description": "Time when the configuration was captured."}
+            {"name": "capture_time", "type": "TIMESTAMP", "description": "Time when the configuration was captured.", "filter": "range"},
+            {"name": "status", "type": "VARCHAR(30)", "description": "AWS Config item status, e.g. OK or ResourceDeleted.", "cardinality": "low"}
         ],
         "cloudwatch_logs": [
-            {"name": "log_group", "type": "VARCHAR(255)", "description": "Name of the CloudWatch log group."},
+            {"name": "log_group", "type": "VARCHAR(255)", "description": "Name of the CloudWatch log group.", "filter": "equality"},
             {"name": "log_stream", "type": "VARCHAR(255)", "description": "Name of the CloudWatch log stream."},
-            {"name": "timestamp", "type": "TIMESTAMP", "description": "Timestamp of the log event."},
+            {"name": "timestamp", "type": "TIMESTAMP", "description": "Timestamp of the log event.", "filter": "range"},
             {"name": "message", "type": "TEXT", "description": "Log message content."}
         ],
         "ami_details": [
             {"name": "ami_id", "type": "VARCHAR(255)", "description": "Unique identifier for the AMI."},
             {"name": "name", "type": "VARCHAR(255)", "description": "Name of the AMI."},
             {"name": "description", "type": "TEXT", "description": "Description of the AMI."},
-            {"name": "creation_date", "type": "TIMESTAMP", "description": "Creation date of the AMI."},
-            {"name": "owner_id", "type": "VARCHAR(255)", "description": "Owner ID of the AMI."}
+            {"name": "creation_date", "type": "TIMESTAMP", "description": "Creation date of the AMI.", "filter": "range"},
+            {"name": "owner_id", "type": "VARCHAR(255)", "description": "Owner ID of the AMI.", "filter": "equality"},
+            {"name": "region", "type": "VARCHAR(20)", "description": "AWS region where the AMI is registered.", "filter": "equality", "cardinality": "low"}
         ],
         "quota_details": [
-            {"name": "service", "type": "VARCHAR(255)", "description": "Name of the AWS service."},
+            {"name": "service", "type": "VARCHAR(255)", "description": "Name of the AWS service.", "filter": "equality", "cardinality": "low"},
             {"name": "quota_name", "type": "VARCHAR(255)", "description": "Name of the quota."},
             {"name": "quota_value", "type": "FLOAT", "description": "Value of the quota."},
             {"name": "used", "type": "FLOAT", "description": "Used value of the quota."},
-            {"name": "unit", "type": "VARCHAR(50)", "description": "Unit of the quota."}
+            {"name": "unit", "type": "VARCHAR(50)", "description": "Unit of the quota.", "cardinality": "low"},
+            {"name": "region", "type": "VARCHAR(20)", "description": "AWS region the quota applies to.", "filter": "equality", "cardinality": "low"}
         ],
         "service_limits": [
-            {"name": "service", "type": "VARCHAR(255)", "description": "Name of the AWS service."},
+            {"name": "service", "type": "VARCHAR(255)", "description": "Name of the AWS service.", "filter": "equality", "cardinality": "low"},
             {"name": "limit_name", "type": "VARCHAR(255)", "description": "Name of the service limit."},
             {"name": "limit_value", "type": "FLOAT", "description": "Value of the service limit."},
-            {"name": "unit", "type": "VARCHAR(50)", "description": "Unit of the service limit."}
+            {"name": "unit", "type": "VARCHAR(50)", "description": "Unit of the service limit.", "cardinality": "low"}
         ],
         "cost_usage_reports": [
-            {"name": "time_period", "type": "VARCHAR(50)", "description": "Time period for the cost report."},
-            {"name": "service", "type": "VARCHAR(255)", "description": "Name of the AWS service."},
+            {"name": "time_period", "type": "VARCHAR(50)", "description": "Time period for the cost report.", "filter": "range"},
+            {"name": "service", "type": "VARCHAR(255)", "description": "Name of the AWS service.", "filter": "equality", "cardinality": "low"},
             {"name": "cost", "type": "FLOAT", "description": "Cost incurred for the service."},
             {"name": "usage", "type": "FLOAT", "description": "Usage amount for the service."},
-            {"name": "unit", "type": "VARCHAR(50)", "description": "Unit of the usage."}
+            {"name": "unit", "type": "VARCHAR(50)", "description": "Unit of the usage.", "cardinality": "low"}
         ]
     }
+    for table_name in HOT_JSON_TABLES:
+        schemas[table_name].extend(hot_path_columns())
     return schemas
 
-def generate_create_table_sql(schemas):
+LATEST_TABLE_GUIDANCE = (
+    "aws_config_resources_latest holds exactly one row per resource_id with its newest configuration, and no "
+    "deleted resources. Use it for questions about what exists now or the current state. Use "
+    "aws_config_resources only for history, changes over time or resources as of a past date."
+)
+
+def schema_guidance(schema):
+    """Prompt hints for the tables and columns present in the (possibly pruned) schema DDL."""
+    hints = []
+    if "aws_config_resources_latest" in schema:
+        hints.append(LATEST_TABLE_GUIDANCE)
+    hot_columns = [name for name in HOT_JSON_PATHS if name in schema]
+    if hot_columns:
+        hints.append(
+            f"{', '.join(hot_columns)} are typed copies of values inside configuration and tags; "
+            "filter and group on them instead of parsing the JSON."
+        )
+    return "\n    ".join(hints)
+
+DIALECTS = ("redshift", "postgres", "duckdb", "sqlite")
+
+# Redshift has no JSON type and silently turns TEXT into VARCHAR(256).
+REDSHIFT_TYPES = {"JSON": "VARCHAR(65535)", "TEXT": "VARCHAR(65535)"}
+AZ64_TYPES = ("SMALLINT", "INTEGER", "INT", "BIGINT", "DECIMAL", "NUMERIC", "DATE", "TIMESTAMP", "TIMESTAMPTZ")
+
+def physical_design(columns, merged=False):
+    """Derive the Redshift distribution, sort key and column encodings from declared access patterns.
+
+    merged tables, which receive deletes and re-inserts, always get a compound sort key.
+    """
+    distkey = next((col['name'] for col in columns if col.get('distribute')), None)
+    range_columns = [col['name'] for col in columns if col.get('filter') == 'range']
+    equality_columns = [col['name'] for col in columns if col.get('filter') == 'equality']
+    sortkey = range_columns + equality_columns
+    # A leading time column serves most questions, so compound; with only equality filters
+    # and no dominant column, interleaving weighs each of them equally. Merged tables stay
+    # compound: an interleaved key degrades with every merge until a VACUUM REINDEX.
+    sortkey_style = "INTERLEAVED" if not merged and not range_columns and len(equality_columns) > 1 else "COMPOUND"
+
+    encodings = {}
+    for col in columns:
+        base_type = col['type'].split('(')[0].upper()
+        if sortkey and col['name'] == sortkey[0]:
+            # Compressing the leading sort key column makes zone-map range checks scan more blocks.
+            encodings[col['name']] = "RAW"
+        elif col.get('cardinality') == 'low':
+            encodings[col['name']] = "BYTEDICT"
+        elif base_type in AZ64_TYPES:
+            encodings[col['name']] = "AZ64"
+        else:
+            encodings[col['name']] = "ZSTD"
+
+    return {
+        "diststyle": "KEY" if distkey else "AUTO",
+        "distkey": distkey,
+        "sortkey": sortkey,
+        "sortkey_style": sortkey_style,
+        "encodings": encodings,
+    }
+
+def generate_create_table_sql(schemas, dialect=None, if_not_exists=False):
+    """CREATE TABLE statements per table; dialect="redshift" adds DISTSTYLE, SORTKEY and ENCODE."""
+    if dialect is not None and dialect not in DIALECTS:
+        raise ValueError(f"Unknown dialect {dialect!r}; expected one of {DIALECTS}")
     sql_statements = {}
     for table_name, columns in schemas.items():
-        column_definitions = ",\n    ".join([f"{col['name']} {col['type']}" for col in columns])
+        if dialect == "redshift":
+            design = physical_design(columns, merged=table_name in MERGED_TABLES)
+            column_definitions = ",\n        ".join([
+                f"{col['name']} {REDSHIFT_TYPES.get(col['type'].upper(), col['type'])} ENCODE {design['encodings'][col['name']]}"
+                for col in columns
+            ])
+            table_attributes = f"DISTSTYLE {design['diststyle']}"
+            if design['distkey']:
+                table_attributes += f" DISTKEY ({design['distkey']})"
+            if design['sortkey']:
+                table_attributes += f" {design['sortkey_style']} SORTKEY ({', '.join(design['sortkey'])})"
+        else:
+            column_definitions = ",\n    ".join([f"{col['name']} {col['type']}" for col in columns])
+            table_attributes = ""
         create_table_sql = f"""
-    CREATE TABLE {table_name} (
+    CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{table_name} (
         {column_definitions}
-    );
+    ){' ' + table_attributes if table_attributes else ''};
     """
         sql_statements[table_name] = create_table_sql
     return sql_statements
 
-def create_index_sql(schemas):
+def create_index_sql(schemas, dialect="postgres"):
+    """Indexes on the declared filter columns for local Postgres/DuckDB/SQLite stand-ins.
+
+    Redshift has no CREATE INDEX; its sort keys and zone maps play that role, so the
+    redshift dialect returns no statements.
+    """
+    if dialect not in DIALECTS:
+        raise ValueError(f"Unknown dialect {dialect!r}; expected one of {DIALECTS}")
     index_statements = {}
     for table_name, columns in schemas.items():
         indexes = []
-        for col in columns:
-            if col['type'].startswith('VARCHAR') or col['type'] == 'TIMESTAMP':
-                indexes.append(f"CREATE INDEX idx_{table_name}_{col['name']} ON {table_name} ({col['name']});")
+        if dialect != "redshift":
+            for col in columns:
+                if col.get('filter') == 'range' and dialect == "postgres":
+                    # Rows arrive roughly in time order, so a tiny BRIN index prunes time windows.
+                    indexes.append(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{col['name']} ON {table_name} USING BRIN ({col['name']});")
+                elif col.get('filter'):
+                    indexes.append(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{col['name']} ON {table_name} ({col['name']});")
         index_statements[table_name] = "\n    ".join(indexes)
     return index_statements
 
 def main():
+    dialect = sys.argv[1] if len(sys.argv) > 1 else "redshift"
     schemas = define_extended_schema()
-    create_table_sql = generate_create_table_sql(schemas)
-    index_sql = create_index_sql(schemas)
+    create_table_sql = generate_create_table_sql(schemas, dialect)
+    index_sql = create_index_sql(schemas, dialect)
     
     print("SQL to create the tables:")
     for table_name, sql in create_table_sql.items():
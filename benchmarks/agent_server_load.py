@@ -0,0 +1,121 @@
+"""Sustained load against the agent server: queries/sec, latency percentiles, coalescing and 503s.
+
+By default starts agent_server in-process over a synthetic DuckDB inventory with the stub model
+(see benchmarks.end_to_end), then runs closed-loop clients for a fixed duration. Point it at a
+running server with --url instead. Run from the repository root:
+
+    python -m benchmarks.agent_server_load --clients 64 --duration 20 --llm-latency 0.5
+    python -m benchmarks.agent_server_load --url http://127.0.0.1:8080 --clients 32
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.end_to_end import SCENARIOS, summarize
+
+
+def start_local_server(args):
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:", TRANSLATION_CACHE_ENABLED="0",
+                      ANSWER_CACHE_ENABLED="0", SQL_EXAMPLES_ENABLED="0")
+    from agent_server import QueryService, create_server, warm_up
+    from benchmarks import stub_llm
+    from benchmarks.end_to_end import load_inventory
+    from query_backends import get_query_backend
+
+    load_inventory(get_query_backend(), args.scale)
+    stub = stub_llm.install({question: sql for question, sql in SCENARIOS.values()}, latency=args.llm_latency)
+    warm_up()
+    server = create_server(port=0, service=QueryService(args.workers, args.queue_size))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stub
+
+
+def client_loop(base_url, questions, unique_share, deadline, results, seed):
+    """Closed loop: send a question, wait for the answer, repeat until the deadline."""
+    rng = random.Random(seed)
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=300)
+    n = 0
+    while time.monotonic() < deadline:
+        question = rng.choice(questions)
+        if rng.random() < unique_share:
+            n += 1
+            question = f"{question} (variant {seed}-{n})"
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/query", json.dumps({"question": question}), {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            body = json.loads(response.read())
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=300)
+            status, body = "connection error", {}
+        elapsed = time.perf_counter() - started
+        results.append((status, elapsed, body.get("coalesced", False)))
+        if status == 503:
+            # Honour backpressure instead of hammering a full queue.
+            time.sleep(0.05)
+
+
+def fetch_health(base_url):
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    conn.request("GET", "/health")
+    return json.loads(conn.getresponse().read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="existing server to load instead of starting one")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--unique-share", type=float, default=0.2,
+                        help="share of requests made unique, so they cannot be coalesced")
+    parser.add_argument("--scale", type=int, default=10_000)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=16)
+    args = parser.parse_args()
+
+    server = stub = None
+    base_url = args.url
+    if base_url is None:
+        server, base_url, stub = start_local_server(args)
+
+    questions = [question for question, _sql in SCENARIOS.values()]
+    results = []
+    deadline = time.monotonic() + args.duration
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client_loop, args=(base_url, questions, args.unique_share, deadline, results, i))
+               for i in range(args.clients)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _elapsed, _coalesced in results)
+    answered = [elapsed for status, elapsed, _coalesced in results if status == 200]
+    coalesced = sum(1 for status, _elapsed, was_coalesced in results if status == 200 and was_coalesced)
+    print(f"\n{args.clients} clients for {elapsed:.1f}s against {base_url}")
+    print(f"requests:        {len(results)}  {dict(statuses)}")
+    print(f"sustained QPS:   {len(answered) / elapsed:.1f} answered/s")
+    if answered:
+        latency = summarize(answered)
+        print(f"latency:         p50 {latency['p50']:.0f}ms  p95 {latency['p95']:.0f}ms  p99 {latency['p99']:.0f}ms")
+    print(f"coalesced:       {coalesced} of {len(answered)} answers shared another caller's run")
+    print(f"server:          {fetch_health(base_url)}")
+    if stub is not None:
+        print(f"LLM calls:       {stub.calls} for {len(answered)} answers")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare the sequential main.py loop with the async batch API using stubbed backends.
+
+Run from the repository root:
+
+    python -m benchmarks.async_throughput --questions 50 --llm-latency 0.8 --db-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import natural_language_query_agent as agent
+
+
+def install_stubs(llm_latency, db_latency):
+    """Replace the LLM and database calls with fixed-latency sleeps."""
+    # The guardrail's EXPLAIN would need a real warehouse.
+    os.environ["SQL_EXPLAIN_ENABLED"] = "0"
+    # Every question pays for both model calls, as it did before answers could skip the model.
+    os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    # Stub SQL must not end up in the few-shot example store as verified.
+    os.environ["SQL_EXAMPLES_ENABLED"] = "0"
+    agent.LOCAL_ANSWERS_ENABLED = False
+
+    def generate_sql_query(user_query, schema):
+        time.sleep(llm_latency)
+        return "SELECT resource_id, region FROM aws_config_resources"
+
+    def stream_query(sql_query, **kwargs):
+        time.sleep(db_latency)
+        return [("i-0123456789abcdef0", "us-west-2"), ("i-0fedcba9876543210", "us-east-1")]
+
+    def query_gemini(gemini_prompt):
+        time.sleep(llm_latency)
+        return "There are 2 instances."
+
+    agent.generate_sql_query = generate_sql_query
+    agent.stream_query = stream_query
+    agent.query_gemini = query_gemini
+
+
+def run_sequential(questions):
+    started = time.perf_counter()
+    for question in questions:
+        agent.process_user_query(question)
+    return time.perf_counter() - started
+
+
+async def run_batch(questions, llm_concurrency, db_concurrency):
+    started = time.perf_counter()
+    async for _question, answer in agent.process_user_queries(questions, llm_concurrency, db_concurrency):
+        if isinstance(answer, Exception):
+            raise answer
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=24)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--db-latency", type=float, default=0.2)
+    parser.add_argument("--llm-concurrency", type=int, default=agent.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--db-concurrency", type=int, default=agent.DB_MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    install_stubs(args.llm_latency, args.db_latency)
+    questions = [f"How many EC2 instances are running in region #{i}?" for i in range(args.questions)]
+
+    sequential = run_sequential(questions)
+    batched = asyncio.run(run_batch(questions, args.llm_concurrency, args.db_concurrency))
+
+    print(f"questions:  {args.questions}")
+    print(f"sequential: {sequential:.2f}s ({args.questions / sequential:.2f} q/s)")
+    print(f"async:      {batched:.2f}s ({args.questions / batched:.2f} q/s)")
+    print(f"speed-up:   {sequential / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare rows/sec of BulkLoader (COPY FROM STDIN) with row-at-a-time INSERTs on a local Postgres.
+
+Point the REDSHIFT_* environment variables at a scratch Postgres database, then run from the
+repository root:
+
+    python -m benchmarks.bulk_load --rows 50000 --batch-size 5000
+"""
+import argparse
+import random
+import time
+
+from bulk_loader import BulkLoader
+from db_pool import close_connection_pool, pooled_connection
+from service_quota_collector import QUOTA_COLUMNS
+
+TABLE = "bench_quota_details"
+
+
+def synthetic_quota_rows(count):
+    services = ["ec2", "s3", "lambda", "rds", "dynamodb", "elasticloadbalancing", "ebs", "vpc"]
+    regions = ["us-east-1", "us-west-2", "eu-west-1", "ap-southeast-2"]
+    for i in range(count):
+        yield (
+            random.choice(services),
+            f"Quota number {i} for running resources",
+            float(random.randint(1, 10000)),
+            None,
+            "None",
+            random.choice(regions),
+        )
+
+
+def reset_table():
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cur.execute(
+                f"CREATE TABLE {TABLE} (service VARCHAR(255), quota_name VARCHAR(255), quota_value FLOAT, "
+                "used FLOAT, unit VARCHAR(50), region VARCHAR(20))"
+            )
+
+
+def row_at_a_time(rows):
+    placeholders = ", ".join(["%s"] * len(QUOTA_COLUMNS))
+    started = time.perf_counter()
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            for row in rows:
+                cur.execute(f"INSERT INTO {TABLE} ({', '.join(QUOTA_COLUMNS)}) VALUES ({placeholders})", row)
+    return time.perf_counter() - started
+
+
+def bulk(rows, batch_size):
+    started = time.perf_counter()
+    with BulkLoader(TABLE, QUOTA_COLUMNS, mode="postgres", batch_size=batch_size) as loader:
+        loader.add_many(rows)
+    return time.perf_counter() - started, loader.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    rows = list(synthetic_quota_rows(args.rows))
+    try:
+        reset_table()
+        single_seconds = row_at_a_time(rows)
+        reset_table()
+        bulk_seconds, stats = bulk(rows, args.batch_size)
+    finally:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        close_connection_pool()
+
+    print(f"rows:           {args.rows}")
+    print(f"row-at-a-time:  {single_seconds:.2f}s ({args.rows / single_seconds:,.0f} rows/s)")
+    print(f"bulk COPY:      {bulk_seconds:.2f}s ({args.rows / bulk_seconds:,.0f} rows/s, {stats['batches']} batches)")
+    print(f"speed-up:       {single_seconds / bulk_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""End-to-end latency and throughput of process_user_query against a synthetic inventory.
+
+Generates every table in an embedded DuckDB database (see benchmarks.synthetic_data), replaces
+the model with benchmarks.stub_llm, and drives a fixed set of question scenarios through the
+agent: first one at a time for p50/p95/p99 per stage, then as a concurrent batch for
+queries/sec. Results can be saved as JSON and compared with an earlier run:
+
+    python -m benchmarks.end_to_end --scale 1000000 --llm-latency 0.3 --output before.json
+    python -m benchmarks.end_to_end --scale 1000000 --llm-latency 0.3 --compare before.json
+
+--compare exits non-zero when a tracked number regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import datetime
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import duckdb
+
+from benchmarks import stub_llm
+from benchmarks.synthetic_data import populate
+
+# Each scenario is a question and the SQL the stub model answers it with.
+SCENARIOS = {
+    "running_instances_per_region": (
+        "How many EC2 instances are running in each region?",
+        "SELECT region, COUNT(*) AS instances FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' AND instance_state = 'running' GROUP BY region ORDER BY region",
+    ),
+    "prod_t3_large": (
+        "Which t3.large instances are tagged env=prod?",
+        "SELECT resource_id, region, tag_team FROM aws_config_resources_latest "
+        "WHERE instance_type = 't3.large' AND tag_env = 'prod'",
+    ),
+    "security_group_changes": (
+        "What changed in security groups during the last week of captures?",
+        "SELECT resource_id, region, capture_time FROM aws_config_resources "
+        "WHERE resource_type = 'AWS::EC2::SecurityGroup' "
+        "AND capture_time >= (SELECT MAX(capture_time) FROM aws_config_resources) - INTERVAL 7 DAY "
+        "ORDER BY capture_time DESC",
+    ),
+    "payment_timeouts": (
+        "Show timeout errors in the payments Lambda logs",
+        "SELECT log_stream, timestamp, message FROM cloudwatch_logs "
+        "WHERE log_group = '/aws/lambda/payments' AND message LIKE '%timed out%' ORDER BY timestamp DESC",
+    ),
+    "cost_per_service": (
+        "What did we spend per service in August?",
+        "SELECT service, SUM(cost) AS total_cost FROM cost_usage_reports "
+        "WHERE time_period LIKE '2026-08%' GROUP BY service ORDER BY total_cost DESC",
+    ),
+    "quotas_near_limit": (
+        "Which quotas are above 80% utilization?",
+        "SELECT service, quota_name, region, used / quota_value AS utilization FROM quota_details "
+        "WHERE quota_value > 0 AND used / quota_value > 0.8 ORDER BY utilization DESC",
+    ),
+    "oldest_amis": (
+        "List the 10 oldest AMIs",
+        "SELECT ami_id, name, creation_date FROM ami_details ORDER BY creation_date LIMIT 10",
+    ),
+    "instance_inventory": (
+        "Show the full configuration of every EC2 instance",
+        "SELECT * FROM aws_config_resources_latest WHERE resource_type = 'AWS::EC2::Instance'",
+    ),
+}
+
+# (stage, agent function) in pipeline order; the database query runs lazily inside encoding.
+# Answers rendered locally or from the answer cache skip the last two.
+STAGES = [
+    ("schema", "get_prompt_schema"),
+    ("sql_generation", "generate_sql_query"),
+    ("guardrail", "check_generated_sql"),
+    ("query_and_encode", "format_data_for_gemini"),
+    ("local_answer", "answer_without_model"),
+    ("answer_prompt", "generate_gemini_prompt"),
+    ("answer_generation", "query_gemini"),
+]
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples, pct):
+    """Linearly interpolated percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    summary = {f"p{pct}": round(percentile(samples, pct) * 1000, 3) for pct in PERCENTILES}
+    summary["mean"] = round(sum(samples) / len(samples) * 1000, 3)
+    summary["count"] = len(samples)
+    return summary
+
+
+class StageTimer:
+    """Wraps the agent's stage functions and records their durations under the current label."""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.label = None
+        self.samples = {}
+
+    def record(self, stage, seconds):
+        self.samples.setdefault(self.label, {}).setdefault(stage, []).append(seconds)
+
+    def _wrap(self, stage, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+    def install(self):
+        for stage, name in STAGES:
+            setattr(self.agent, name, self._wrap(stage, getattr(self.agent, name)))
+
+
+def configure_environment(args):
+    """Point the agent at an embedded DuckDB database before anything opens a backend."""
+    os.environ["QUERY_BACKEND"] = "duckdb"
+    os.environ["LOCAL_DB_PATH"] = args.db
+    os.environ.pop("CUR_PARQUET_PATH", None)
+    # Stub SQL must not end up in the few-shot example store as verified.
+    os.environ["SQL_EXAMPLES_ENABLED"] = "0"
+    if args.cache:
+        cache_dir = tempfile.mkdtemp()
+        os.environ["TRANSLATION_CACHE_PATH"] = os.path.join(cache_dir, "translation_cache.sqlite3")
+        os.environ["ANSWER_CACHE_PATH"] = os.path.join(cache_dir, "answer_cache.sqlite3")
+    else:
+        os.environ["TRANSLATION_CACHE_ENABLED"] = "0"
+        os.environ["ANSWER_CACHE_ENABLED"] = "0"
+
+
+def load_inventory(backend, scale):
+    """Populate the backend with synthetic data unless the database already holds some."""
+    with backend.maintenance_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM aws_config_resources")
+            if cur.fetchone()[0]:
+                print("Reusing existing data in the database")
+                return {}
+            started = time.perf_counter()
+            timings = populate(cur, scale)
+    print(f"Generated scale {scale:,} inventory in {time.perf_counter() - started:.1f}s")
+    return {table: round(seconds, 3) for table, seconds in timings.items()}
+
+
+def run_sequential(agent, timer, iterations):
+    for name, (question, _sql) in SCENARIOS.items():
+        timer.label = name
+        for _ in range(iterations):
+            started = time.perf_counter()
+            agent.process_user_query(question)
+            timer.record("total", time.perf_counter() - started)
+
+
+def run_concurrent(agent, timer, questions, llm_concurrency, db_concurrency):
+    """Answer questions as one async batch; returns (queries/sec, per-query latencies)."""
+    timer.label = "concurrent"
+    latencies = []
+    process_one = agent.process_user_query_async
+
+    async def timed_query(user_query, limits=None):
+        started = time.perf_counter()
+        try:
+            return await process_one(user_query, limits)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    async def run_batch():
+        async for question, answer in agent.process_user_queries(questions, llm_concurrency, db_concurrency):
+            if isinstance(answer, Exception):
+                raise RuntimeError(f"{question!r} failed: {answer}")
+
+    agent.process_user_query_async = timed_query
+    try:
+        started = time.perf_counter()
+        asyncio.run(run_batch())
+        elapsed = time.perf_counter() - started
+    finally:
+        agent.process_user_query_async = process_one
+    return len(questions) / elapsed, latencies
+
+
+def run_benchmark(args):
+    configure_environment(args)
+    # Imported after the environment is set so module-level settings see it.
+    import natural_language_query_agent as agent
+    from query_backends import get_query_backend
+
+    backend = get_query_backend()
+    populate_seconds = load_inventory(backend, args.scale)
+    stub = stub_llm.install({question: sql for question, sql in SCENARIOS.values()},
+                            latency=args.llm_latency, jitter=args.llm_jitter)
+    timer = StageTimer(agent)
+    timer.install()
+
+    # Warm up each scenario once; the first run pays for plan and import caches.
+    for question, _sql in SCENARIOS.values():
+        agent.process_user_query(question)
+    timer.samples.clear()
+
+    run_sequential(agent, timer, args.iterations)
+    questions = [question for question, _sql in SCENARIOS.values()] * args.concurrent_rounds
+    sequential_seconds = sum(sum(stages["total"]) for stages in timer.samples.values())
+    concurrent_qps, latencies = run_concurrent(agent, timer, questions, args.llm_concurrency, args.db_concurrency)
+
+    scenario_stats = {
+        name: {stage: summarize(samples) for stage, samples in stages.items()}
+        for name, stages in timer.samples.items() if name in SCENARIOS
+    }
+    overall = {}
+    for name in SCENARIOS:
+        for stage, samples in timer.samples[name].items():
+            overall.setdefault(stage, []).extend(samples)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "backend": backend.name,
+            "duckdb": duckdb.__version__,
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "llm_calls": stub.calls,
+            "translation_cache": args.cache,
+            "populate_seconds": populate_seconds,
+        },
+        "scenarios": scenario_stats,
+        "overall": {stage: summarize(samples) for stage, samples in overall.items()},
+        "throughput": {
+            "sequential_qps": round(len(SCENARIOS) * args.iterations / sequential_seconds, 3),
+            "concurrent_qps": round(concurrent_qps, 3),
+            "concurrent_questions": len(questions),
+            "concurrent_latency": summarize(latencies),
+        },
+    }
+
+
+def print_report(results):
+    columns = [stage for stage, _name in STAGES] + ["total"]
+    print(f"\np50 / p95 ms per stage ({results['meta']['iterations']} runs per scenario)")
+    print(f"{'scenario':<30}" + "".join(f"{column:>20}" for column in columns))
+    rows = list(results["scenarios"].items()) + [("overall", results["overall"])]
+    for name, stages in rows:
+        # Stages a scenario never reached, e.g. the answer model for a locally rendered answer, show as "-".
+        cells = "".join(f"{stages[column]['p50']:>10.1f} /{stages[column]['p95']:>7.1f}" if column in stages
+                        else f"{'-':>20}" for column in columns)
+        print(f"{name:<30}{cells}")
+    throughput = results["throughput"]
+    print(f"\nsequential: {throughput['sequential_qps']:.2f} queries/s")
+    print(f"concurrent: {throughput['concurrent_qps']:.2f} queries/s over {throughput['concurrent_questions']} questions, "
+          f"p50 {throughput['concurrent_latency']['p50']:.1f}ms p99 {throughput['concurrent_latency']['p99']:.1f}ms")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Print tracked numbers that moved against the baseline; returns the regressions."""
+    tracked = []
+    for name, stages in results["scenarios"].items():
+        for stage, summary in stages.items():
+            previous = baseline.get("scenarios", {}).get(name, {}).get(stage)
+            if previous:
+                for key in ("p50", "p95"):
+                    tracked.append((f"{name}.{stage}.{key}", previous[key], summary[key], True))
+    for key in ("sequential_qps", "concurrent_qps"):
+        if key in baseline.get("throughput", {}):
+            tracked.append((key, baseline["throughput"][key], results["throughput"][key], False))
+
+    regressions = []
+    print(f"\nCompared with the run from {baseline.get('meta', {}).get('timestamp', 'an earlier run')}:")
+    for label, before, after, lower_is_better in tracked:
+        if not before:
+            continue
+        change = (after - before) / before
+        if lower_is_better and abs(after - before) < min_delta_ms:
+            continue
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        if abs(change) > tolerance:
+            status = "REGRESSED" if worse else "changed"
+            print(f"  {status:<10}{label:<55}{before:>12.2f} -> {after:>10.2f} ({change:+.0%})")
+        if worse:
+            regressions.append(label)
+    print(f"{len(regressions)} regression(s) beyond {tolerance:.0%} out of {len(tracked)} tracked numbers")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10_000, help="aws_config_resources rows to generate")
+    parser.add_argument("--db", default=":memory:", help="DuckDB file; reused as-is if it already holds data")
+    parser.add_argument("--iterations", type=int, default=20, help="sequential runs per scenario")
+    parser.add_argument("--concurrent-rounds", type=int, default=4, help="copies of each scenario in the concurrent batch")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stub model call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="+/- fraction applied to --llm-latency")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--db-concurrency", type=int, default=4)
+    parser.add_argument("--cache", action="store_true", help="leave the translation and answer caches enabled")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, args.min_delta_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
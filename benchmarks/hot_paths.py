@@ -0,0 +1,98 @@
+"""Compare filtering on JSON functions with filtering on the typed sidecar columns.
+
+Loads synthetic aws_config_resources rows with realistic configuration/tags documents into
+DuckDB, fills the sidecar columns with the same backfill SQL the pipeline runs, checks both
+filters agree and times them. Needs duckdb. Run from the repository root:
+
+    python -m benchmarks.hot_paths --rows 1000000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+import duckdb
+
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql, hot_path_backfill_sql, json_path_sql
+
+TABLE = "aws_config_resources"
+
+QUERIES = {
+    "t3.large tagged env=prod": (
+        f"SELECT COUNT(*) FROM {TABLE} WHERE {json_path_sql('configuration', ['instanceType'], 'duckdb')} = 't3.large' "
+        f"AND {json_path_sql('tags', ['env'], 'duckdb')} = 'prod'",
+        f"SELECT COUNT(*) FROM {TABLE} WHERE instance_type = 't3.large' AND tag_env = 'prod'",
+    ),
+    "running per VPC": (
+        f"SELECT {json_path_sql('configuration', ['vpcId'], 'duckdb')} AS vpc, COUNT(*) FROM {TABLE} "
+        f"WHERE {json_path_sql('configuration', ['state', 'name'], 'duckdb')} = 'running' GROUP BY vpc ORDER BY vpc",
+        f"SELECT vpc_id, COUNT(*) FROM {TABLE} WHERE instance_state = 'running' GROUP BY vpc_id ORDER BY vpc_id",
+    ),
+    "instances per team": (
+        f"SELECT {json_path_sql('tags', ['team'], 'duckdb')} AS team, COUNT(*) FROM {TABLE} "
+        f"WHERE {json_path_sql('configuration', ['instanceType'], 'duckdb')} IS NOT NULL GROUP BY team ORDER BY team",
+        f"SELECT tag_team, COUNT(*) FROM {TABLE} WHERE instance_type IS NOT NULL GROUP BY tag_team ORDER BY tag_team",
+    ),
+}
+
+
+def load_synthetic_rows(conn, rows):
+    """Insert EC2-like configuration items with ~1KB of configuration each, sidecars left empty."""
+    conn.execute(f"""
+        INSERT INTO {TABLE} (resource_id, resource_type, region, configuration, tags, capture_time)
+        SELECT
+            'i-' || lpad(CAST(i AS VARCHAR), 17, '0'),
+            'AWS::EC2::Instance',
+            CASE i % 3 WHEN 0 THEN 'us-east-1' WHEN 1 THEN 'us-west-2' ELSE 'eu-west-1' END,
+            json_object(
+                'instanceType', CASE i % 5 WHEN 0 THEN 't3.large' WHEN 1 THEN 't3.micro' WHEN 2 THEN 'm5.xlarge'
+                                           WHEN 3 THEN 'c5.large' ELSE 'r5.2xlarge' END,
+                'state', json_object('code', 16, 'name', CASE WHEN i % 7 = 0 THEN 'stopped' ELSE 'running' END),
+                'vpcId', 'vpc-' || CAST(i % 12 AS VARCHAR),
+                'subnetId', 'subnet-' || CAST(i % 48 AS VARCHAR),
+                'imageId', 'ami-0123456789abcdef0',
+                'blockDeviceMappings', json_array(json_object('deviceName', '/dev/xvda', 'ebs',
+                    json_object('volumeId', 'vol-' || CAST(i AS VARCHAR), 'status', 'attached', 'deleteOnTermination', true))),
+                'securityGroups', json_array(json_object('groupId', 'sg-' || CAST(i % 30 AS VARCHAR), 'groupName', 'default')),
+                'privateDnsName', 'ip-10-0-' || CAST(i % 250 AS VARCHAR) || '.ec2.internal',
+                'monitoring', json_object('state', 'disabled'),
+                'architecture', 'x86_64'
+            ),
+            json_object('env', CASE i % 3 WHEN 0 THEN 'prod' WHEN 1 THEN 'staging' ELSE 'dev' END,
+                        'team', 'team-' || CAST(i % 9 AS VARCHAR), 'owner', 'user' || CAST(i % 100 AS VARCHAR)),
+            TIMESTAMP '2026-01-01' + to_seconds(CAST(i AS BIGINT))
+        FROM range({rows}) AS t(i)
+    """)
+
+
+def timed(conn, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = conn.execute(sql).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    conn.execute(generate_create_table_sql({TABLE: define_extended_schema()[TABLE]}, "duckdb")[TABLE])
+    load_synthetic_rows(conn, args.rows)
+    started = time.perf_counter()
+    conn.execute(hot_path_backfill_sql(TABLE, "instance_type IS NULL", "duckdb"))
+    print(f"backfilled {args.rows} rows in {time.perf_counter() - started:.2f}s")
+
+    print(f"{'query':<28}{'JSON functions':>16}{'typed columns':>15}{'speed-up':>10}  same result")
+    for label, (json_sql, typed_sql) in QUERIES.items():
+        json_seconds, json_result = timed(conn, json_sql, args.repeat)
+        typed_seconds, typed_result = timed(conn, typed_sql, args.repeat)
+        print(f"{label:<28}{json_seconds * 1000:>14.1f}ms{typed_seconds * 1000:>13.1f}ms"
+              f"{json_seconds / typed_seconds:>9.1f}x  {json_result == typed_result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Intent router: match rate, routing latency, and model calls saved on a realistic traffic mix.
+
+Builds the router's dictionaries from a synthetic DuckDB inventory's column statistics, routes a mix of common
+question shapes and long-tail questions, checks every templated query passes the guardrail
+and runs, then answers the mix through the agent with the stub model, router on and off:
+
+    python -m benchmarks.intent_routing --scale 20000 --repeat 200
+"""
+import argparse
+import os
+import time
+
+from benchmarks.end_to_end import SCENARIOS, percentile
+
+COMMON_QUESTIONS = [
+    "List EC2 instances in us-east-1",
+    "Which S3 buckets do we have?",
+    "list security groups in eu-west-1",
+    "Show me all lambda functions in us-west-2",
+    "How many EC2 instances are in each region?",
+    "How many IAM roles are there?",
+    "Count EBS volumes in ap-southeast-1",
+    "Cost by service for August",
+    "What did we spend per service last month?",
+    "Which services cost the most in July?",
+    "How much did we spend on EC2 in September?",
+    "S3 cost this year",
+    "Quotas for ec2",
+    "Show lambda quotas in us-east-1",
+    "What are the dynamodb service quotas?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=200, help="routing passes over the question mix")
+    args = parser.parse_args()
+
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:", TRANSLATION_CACHE_ENABLED="0",
+                      SQL_EXAMPLES_ENABLED="0", ANSWER_CACHE_ENABLED="0", LOCAL_ANSWERS_ENABLED="0")
+    import intent_router
+    import natural_language_query_agent as agent
+    from benchmarks import stub_llm
+    from benchmarks.end_to_end import load_inventory
+    from query_backends import get_query_backend
+    from schema_provider import SchemaProvider
+    from sql_guardrail import guard_sql
+
+    backend = get_query_backend()
+    load_inventory(backend, args.scale)
+    started = time.perf_counter()
+    service = intent_router.RouterService(SchemaProvider(backend))
+    service.router()
+    print(f"Introspected the schema and built the router in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    long_tail = [question for question, _sql in SCENARIOS.values()]
+    mix = COMMON_QUESTIONS + long_tail
+    timings = []
+    for _ in range(args.repeat):
+        for question in mix:
+            started = time.perf_counter()
+            service.route(question)
+            timings.append(time.perf_counter() - started)
+    stats = service.stats()
+    print(f"\nrouting latency: p50 {percentile(timings, 50) * 1e6:.0f}us  p99 {percentile(timings, 99) * 1e6:.0f}us"
+          f"  max {max(timings) * 1e6:.0f}us over {len(timings)} questions")
+    print(f"match rate:      {stats['match_rate']:.0%} ({len(COMMON_QUESTIONS)} common shapes, "
+          f"{len(long_tail)} long-tail questions)")
+
+    print(f"\n{'question':<48}{'intent':<28}{'rows':>6}")
+    for question in mix:
+        routed = service.router().route(question)
+        if routed is None:
+            print(f"{question[:46]:<48}{'(model)':<28}")
+            continue
+        rows = backend.execute(guard_sql(routed.sql, question).sql)
+        print(f"{question[:46]:<48}{routed.intent:<28}{len(rows):>6}")
+
+    stub = stub_llm.install({question: sql for question, sql in SCENARIOS.values()})
+    calls = {}
+    for enabled in ("0", "1"):
+        os.environ["INTENT_ROUTER_ENABLED"] = enabled
+        before = stub.calls
+        for question in mix:
+            agent.process_user_query(question)
+        calls[enabled] = stub.calls - before
+    print(f"\nLLM calls for {len(mix)} questions: {calls['0']} without the router, {calls['1']} with it")
+
+
+if __name__ == "__main__":
+    main()
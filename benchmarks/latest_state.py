@@ -0,0 +1,97 @@
+"""Check the incremental latest-state merge and compare current-state queries against history.
+
+Builds a synthetic aws_config_resources history in DuckDB, merges it into
+aws_config_resources_latest with the same SQL the pipeline runs, appends a second batch of
+captures (including deletions), merges incrementally, and verifies the result against a full
+dedup of the history. Needs duckdb. Run from the repository root:
+
+    python -m benchmarks.latest_state --resources 100000 --captures 20
+"""
+import argparse
+import statistics
+import time
+
+import duckdb
+
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql
+from latest_state import EPOCH, HISTORY_TABLE, LATEST_TABLE, merge_new_captures
+
+HISTORY_QUERY = f"""
+    SELECT region, COUNT(*) FROM (
+        SELECT region, resource_type, status,
+               ROW_NUMBER() OVER (PARTITION BY resource_id ORDER BY capture_time DESC) AS capture_rank
+        FROM {HISTORY_TABLE}
+    ) AS captures
+    WHERE capture_rank = 1 AND resource_type = 'AWS::EC2::Instance'
+      AND COALESCE(status, '') <> 'ResourceDeleted'
+    GROUP BY region ORDER BY region
+"""
+LATEST_QUERY = f"""
+    SELECT region, COUNT(*) FROM {LATEST_TABLE}
+    WHERE resource_type = 'AWS::EC2::Instance'
+    GROUP BY region ORDER BY region
+"""
+
+
+def append_captures(conn, resources, captures, start_day, deleted_share):
+    """Append captures per resource over the days after start_day; a share of the newest are deletions."""
+    conn.execute(f"""
+        INSERT INTO {HISTORY_TABLE} (resource_id, resource_type, region, configuration, tags, capture_time, status)
+        SELECT
+            'res-' || r AS resource_id,
+            CASE r % 4 WHEN 0 THEN 'AWS::EC2::Instance' WHEN 1 THEN 'AWS::EC2::Volume'
+                       WHEN 2 THEN 'AWS::S3::Bucket' ELSE 'AWS::IAM::Role' END AS resource_type,
+            CASE r % 3 WHEN 0 THEN 'us-east-1' WHEN 1 THEN 'us-west-2' ELSE 'eu-west-1' END AS region,
+            '{{"state": "running"}}' AS configuration,
+            '{{}}' AS tags,
+            TIMESTAMP '2026-01-01' + to_days(CAST({start_day} + c AS INTEGER)) + to_seconds(CAST(r % 86400 AS BIGINT)) AS capture_time,
+            CASE WHEN c = {captures - 1} AND hash(r, {start_day}) % 1000 < {int(deleted_share * 1000)}
+                 THEN 'ResourceDeleted' ELSE 'OK' END AS status
+        FROM range({resources}) AS rs(r), range({captures}) AS cs(c)
+    """)
+
+
+def timed(conn, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = conn.execute(sql).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resources", type=int, default=100_000)
+    parser.add_argument("--captures", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    schemas = define_extended_schema()
+    for table in (HISTORY_TABLE, LATEST_TABLE):
+        conn.execute(generate_create_table_sql({table: schemas[table]}, "duckdb")[table])
+    cur = conn.cursor()
+
+    append_captures(conn, args.resources, args.captures, start_day=0, deleted_share=0.02)
+    started = time.perf_counter()
+    merged, deleted, watermark = merge_new_captures(cur, EPOCH, "duckdb")
+    print(f"initial merge:     {merged} resources, {deleted} deleted, {time.perf_counter() - started:.2f}s")
+
+    # A second day's worth of captures for a tenth of the resources, some of them deletions.
+    append_captures(conn, args.resources // 10, 1, start_day=args.captures, deleted_share=0.1)
+    started = time.perf_counter()
+    merged, deleted, _ = merge_new_captures(cur, watermark, "duckdb")
+    print(f"incremental merge: {merged} resources, {deleted} deleted, {time.perf_counter() - started:.2f}s")
+
+    history_seconds, expected = timed(conn, HISTORY_QUERY, args.repeat)
+    latest_seconds, actual = timed(conn, LATEST_QUERY, args.repeat)
+    print(f"history rows:      {conn.execute(f'SELECT COUNT(*) FROM {HISTORY_TABLE}').fetchone()[0]}")
+    print(f"latest rows:       {conn.execute(f'SELECT COUNT(*) FROM {LATEST_TABLE}').fetchone()[0]}")
+    print(f"matches full dedup: {expected == actual}")
+    print(f"current EC2 instances per region: history {history_seconds * 1000:.1f}ms, "
+          f"latest {latest_seconds * 1000:.1f}ms ({history_seconds / latest_seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Answer-model calls and latency saved by local answer rendering and the answer cache.
+
+Answers the end-to-end scenarios plus the intent router's common shapes over a synthetic DuckDB
+inventory with the stub model, first always asking the answer model, then rendering small
+results locally, then also caching answers by (SQL, result hash) across two passes over
+unchanged data and one after a new log line arrives. Run from the repository root:
+
+    python -m benchmarks.local_answers --llm-latency 0.3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.end_to_end import SCENARIOS
+from benchmarks.intent_routing import COMMON_QUESTIONS
+
+
+def run_pass(agent, questions, answer_calls):
+    before = answer_calls[0]
+    started = time.perf_counter()
+    answers = {question: agent.process_user_query(question) for question in questions}
+    return answers, answer_calls[0] - before, (time.perf_counter() - started) / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10_000)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--show", type=int, default=3, help="print this many locally rendered answers")
+    args = parser.parse_args()
+
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:", TRANSLATION_CACHE_ENABLED="0",
+                      SQL_EXAMPLES_ENABLED="0", ANSWER_CACHE_ENABLED="0",
+                      ANSWER_CACHE_PATH=os.path.join(tempfile.mkdtemp(), "answer_cache.sqlite3"))
+    import natural_language_query_agent as agent
+    from benchmarks import stub_llm
+    from benchmarks.end_to_end import load_inventory
+    from query_backends import get_query_backend
+
+    backend = get_query_backend()
+    load_inventory(backend, args.scale)
+    stub_llm.install({question: sql for question, sql in SCENARIOS.values()}, latency=args.llm_latency)
+    answer_calls = [0]
+    query_gemini = agent.query_gemini
+
+    def counting_query_gemini(gemini_prompt):
+        answer_calls[0] += 1
+        return query_gemini(gemini_prompt)
+
+    agent.query_gemini = counting_query_gemini
+    questions = COMMON_QUESTIONS + [question for question, _sql in SCENARIOS.values()]
+
+    passes = []
+    agent.LOCAL_ANSWERS_ENABLED = False
+    passes.append(("answer model only",) + run_pass(agent, questions, answer_calls))
+    agent.LOCAL_ANSWERS_ENABLED = True
+    passes.append(("local rendering",) + run_pass(agent, questions, answer_calls))
+    os.environ["ANSWER_CACHE_ENABLED"] = "1"
+    passes.append(("+ answer cache, cold",) + run_pass(agent, questions, answer_calls))
+    passes.append(("+ answer cache, same data",) + run_pass(agent, questions, answer_calls))
+    backend.execute("INSERT INTO cloudwatch_logs VALUES ('/aws/lambda/payments', '2026/10/01/[$LATEST]new', "
+                    "TIMESTAMP '2026-10-01 00:00:00', 'ERROR Task timed out after 30.03 seconds')")
+    passes.append(("+ answer cache, new log line",) + run_pass(agent, questions, answer_calls))
+
+    print(f"\n{len(questions)} questions, {args.llm_latency:.2f}s per model call")
+    print(f"{'':<32}{'answer-model calls':>20}{'mean latency ms':>17}")
+    for label, _answers, calls, latency in passes:
+        print(f"{label:<32}{calls:>20}{latency * 1000:>17.0f}")
+
+    local_answers = passes[1][1]
+    modelled = passes[0][1]
+    shown = 0
+    for question in questions:
+        if local_answers[question] != modelled[question] and shown < args.show:
+            shown += 1
+            print(f"\n> {question}\n{local_answers[question]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Time serial versus parallel multi-region pipeline setup against a fake, fixed-latency AWS.
+
+Run from the repository root:
+
+    python -m benchmarks.parallel_setup --regions 17 --api-latency 0.2 --workers 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import aws_config_pipeline as pipeline
+from watermark_store import WatermarkStore
+
+ALL_REGIONS = [
+    "us-east-1", "us-east-2", "us-west-1", "us-west-2", "ca-central-1", "eu-west-1", "eu-west-2",
+    "eu-west-3", "eu-central-1", "eu-north-1", "ap-south-1", "ap-northeast-1", "ap-northeast-2",
+    "ap-northeast-3", "ap-southeast-1", "ap-southeast-2", "sa-east-1",
+]
+
+CANNED_RESPONSES = {
+    "get_caller_identity": {"Account": "123456789012"},
+    "get_parameter": {"Parameter": {"Value": "ami-0123456789abcdef0"}},
+    "describe_images": {"Images": []},
+    "list_service_quotas": {"Quotas": []},
+    "list_services": {"Services": []},
+    "create_delivery_stream": {"DeliveryStreamARN": "arn:aws:firehose:us-east-1:123456789012:deliverystream/bench"},
+}
+
+
+class FakeClient:
+    def __init__(self, session, service, region, latency):
+        self._session = session
+        self._service = service
+        self._region = region
+        self._latency = latency
+
+    def __getattr__(self, operation):
+        def call(**kwargs):
+            self._session.record(self._service, operation)
+            time.sleep(self._latency)
+            return CANNED_RESPONSES.get(operation, {})
+        return call
+
+    def get_paginator(self, operation):
+        return FakePaginator(getattr(self, operation))
+
+
+class FakePaginator:
+    def __init__(self, call):
+        self._call = call
+
+    def paginate(self, **kwargs):
+        yield self._call(**kwargs)
+
+
+class FakeSession:
+    """Stands in for boto3.Session; every API call sleeps for a fixed latency."""
+
+    region_name = "us-east-1"
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = Counter()
+        self.clients_created = 0
+        self._lock = threading.Lock()
+
+    def record(self, service, operation):
+        with self._lock:
+            self.calls[f"{service}.{operation}"] += 1
+
+    def client(self, service, region_name=None):
+        self.clients_created += 1
+        return FakeClient(self, service, region_name, self.latency)
+
+
+def run(regions, latency, workers):
+    session = FakeSession(latency)
+    # Fresh watermarks per run, so incremental collection does not skip work in the second run.
+    store = WatermarkStore(os.path.join(tempfile.mkdtemp(), "watermarks.sqlite3"))
+    pipeline.get_watermark_store = lambda: store
+    report = pipeline.setup_aws_config_pipeline(
+        regions, "bench-bucket", "bench-stream", "jdbc:redshift://bench:5439/dev", "aws_config_data",
+        "bench", "bench", session=session, max_workers=workers, force=True,
+    )
+    return report, session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=len(ALL_REGIONS))
+    parser.add_argument("--api-latency", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=pipeline.DEFAULT_SETUP_CONCURRENCY)
+    args = parser.parse_args()
+
+    pipeline.create_database_tables = lambda schema: True
+    regions = ALL_REGIONS[: args.regions]
+
+    serial_report, serial_session = run(regions, args.api_latency, 1)
+    parallel_report, parallel_session = run(regions, args.api_latency, args.workers)
+
+    print()
+    print(f"regions:          {len(regions)}")
+    print(f"serial:           {serial_report['seconds']:.2f}s")
+    print(f"parallel ({args.workers:>2}):    {parallel_report['seconds']:.2f}s")
+    print(f"speed-up:         {serial_report['seconds'] / parallel_report['seconds']:.1f}x")
+    print(f"sts calls:        {parallel_session.calls['sts.get_caller_identity']}")
+    print(f"clients created:  {parallel_session.clients_created}")
+    print(f"failed regions:   {parallel_report['failed_regions']}")
+
+
+if __name__ == "__main__":
+    main()
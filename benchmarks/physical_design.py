@@ -0,0 +1,88 @@
+"""Compare scan times of typical filters on a table with and without the derived physical design.
+
+Redshift prunes blocks through zone maps on its sort key. DuckDB keeps the same min/max zone
+maps per row group, so loading synthetic aws_config_resources rows in sort key order (plus the
+duckdb dialect's indexes) shows the effect locally against a copy in arrival order.
+Needs duckdb. Run from the repository root:
+
+    python -m benchmarks.physical_design --rows 2000000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+import duckdb
+
+from aws_config_schema_design import create_index_sql, define_extended_schema, generate_create_table_sql, physical_design
+
+TABLE = "aws_config_resources"
+
+QUERIES = {
+    "last 7 days": f"SELECT COUNT(*) FROM {TABLE} WHERE capture_time >= TIMESTAMP '2026-03-25'",
+    "one day": f"SELECT COUNT(*) FROM {TABLE} WHERE capture_time BETWEEN TIMESTAMP '2026-03-01' AND TIMESTAMP '2026-03-02'",
+    "region, 30 days": (f"SELECT resource_type, COUNT(*) FROM {TABLE} WHERE region = 'eu-west-1' "
+                        "AND capture_time >= TIMESTAMP '2026-03-01' GROUP BY resource_type"),
+    "type and region, 7 days": (f"SELECT COUNT(DISTINCT resource_id) FROM {TABLE} WHERE resource_type = 'AWS::EC2::Instance' "
+                                "AND region = 'us-east-1' AND capture_time >= TIMESTAMP '2026-03-25'"),
+}
+
+REGIONS = ["us-east-1", "us-east-2", "us-west-1", "us-west-2", "eu-west-1", "eu-west-2", "eu-central-1",
+           "ap-southeast-1", "ap-southeast-2", "ap-northeast-1", "sa-east-1", "ca-central-1"]
+RESOURCE_TYPES = ["AWS::EC2::Instance", "AWS::EC2::Volume", "AWS::EC2::SecurityGroup", "AWS::S3::Bucket",
+                  "AWS::IAM::Role", "AWS::Lambda::Function", "AWS::RDS::DBInstance", "AWS::EC2::NetworkInterface"]
+
+
+def load_synthetic_rows(conn, rows):
+    """Fill a staging table with rows spread over 90 days, in random (arrival-like) order."""
+    conn.execute(f"""
+        CREATE TABLE staging AS
+        SELECT
+            'res-' || (i % 200000) AS resource_id,
+            list_element({RESOURCE_TYPES}, CAST(1 + hash(i * 31) % {len(RESOURCE_TYPES)} AS INTEGER)) AS resource_type,
+            list_element({REGIONS}, CAST(1 + hash(i * 17) % {len(REGIONS)} AS INTEGER)) AS region,
+            '{{"state": "running"}}' AS configuration,
+            '{{"env": "prod"}}' AS tags,
+            TIMESTAMP '2026-01-01' + to_seconds(CAST(hash(i) % (90 * 86400) AS BIGINT)) AS capture_time
+        FROM range({rows}) AS t(i)
+        ORDER BY hash(i * 7)
+    """)
+
+
+def build(conn, name, designed):
+    columns = define_extended_schema()[TABLE]
+    conn.execute(generate_create_table_sql({name: columns}, "duckdb")[name])
+    order = f" ORDER BY {', '.join(physical_design(columns)['sortkey'])}" if designed else ""
+    conn.execute(f"INSERT INTO {name} SELECT * FROM staging{order}")
+    if designed:
+        conn.execute(create_index_sql({name: columns}, "duckdb")[name])
+
+
+def time_query(conn, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    load_synthetic_rows(conn, args.rows)
+    build(conn, "arrival_order", designed=False)
+    build(conn, "sort_key_order", designed=True)
+
+    print(f"{'query':<26}{'arrival order':>15}{'sort key order':>16}{'speed-up':>10}")
+    for label, sql in QUERIES.items():
+        baseline = time_query(conn, sql.replace(TABLE, "arrival_order"), args.repeat)
+        designed = time_query(conn, sql.replace(TABLE, "sort_key_order"), args.repeat)
+        print(f"{label:<26}{baseline * 1000:>13.1f}ms{designed * 1000:>14.1f}ms{baseline / designed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Live schema introspection: build and refresh cost, prompt coverage of filter literals, and drift.
+
+Over a synthetic DuckDB inventory, times the first snapshot and an incremental refresh, checks
+that getting the prompt schema stays fast while a refresh runs, measures how many string
+literals of the end-to-end scenarios' SQL appear in their prompt (with and without the column
+hints), and adds a column to show it reaching the prompt. Run from the repository root:
+
+    python -m benchmarks.schema_introspection --scale 200000
+"""
+import argparse
+import os
+import re
+import threading
+import time
+
+from benchmarks.end_to_end import SCENARIOS, percentile
+
+
+def literal_coverage(snapshot, with_hints):
+    """Share of the scenario SQL's quoted literals (LIKE patterns excluded) present in its prompt schema."""
+    found = total = 0
+    for question, sql in SCENARIOS.values():
+        prompt = snapshot.render(snapshot.select(question, 2), hints=with_hints)
+        for literal in re.findall(r"'([^'%]+)'", sql):
+            total += 1
+            found += f"'{literal}'" in prompt
+    return found, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=50_000)
+    parser.add_argument("--questions", type=int, default=2000, help="prompt schemas built while a refresh runs")
+    args = parser.parse_args()
+
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:")
+    from benchmarks.end_to_end import load_inventory
+    from query_backends import get_query_backend
+    from schema_provider import SchemaProvider
+
+    backend = get_query_backend()
+    load_inventory(backend, args.scale)
+    provider = SchemaProvider(backend)
+
+    started = time.perf_counter()
+    snapshot = provider.snapshot()
+    first_build = time.perf_counter() - started
+    started = time.perf_counter()
+    provider.build(snapshot)
+    unchanged_refresh = time.perf_counter() - started
+    backend.execute("INSERT INTO cloudwatch_logs VALUES ('/ecs/web', 'web-1', TIMESTAMP '2026-10-01 00:00:00', 'INFO ok')")
+    started = time.perf_counter()
+    provider.build(snapshot)
+    one_table_refresh = time.perf_counter() - started
+    print(f"\nfirst snapshot:            {first_build * 1000:.1f}ms")
+    print(f"refresh, nothing changed:  {unchanged_refresh * 1000:.1f}ms")
+    print(f"refresh, one table changed: {one_table_refresh * 1000:.1f}ms")
+
+    # Questions keep being served from the old snapshot while the next one is built.
+    provider.invalidate()
+    timings = []
+    refreshing = threading.Event()
+
+    def ask():
+        while not refreshing.is_set() or len(timings) < args.questions:
+            started = time.perf_counter()
+            current = provider.snapshot()
+            current.render(current.select("How many EC2 instances are running in each region?", 2))
+            timings.append(time.perf_counter() - started)
+            if provider.snapshot() is not snapshot:
+                refreshing.set()
+
+    ask()
+    print(f"prompt schema during refresh: p50 {percentile(timings, 50) * 1000:.2f}ms  "
+          f"max {max(timings) * 1000:.2f}ms over {len(timings)} questions")
+
+    snapshot = provider.snapshot()
+    for with_hints in (False, True):
+        found, total = literal_coverage(snapshot, with_hints)
+        print(f"scenario literals in the prompt {'with' if with_hints else 'without'} hints: {found} of {total}")
+
+    backend.execute("ALTER TABLE aws_config_resources_latest ADD COLUMN account_id VARCHAR")
+    provider.invalidate()
+    provider.snapshot()
+    while provider.snapshot() is snapshot:
+        time.sleep(0.01)
+    prompt = provider.snapshot().render()
+    print(f"new column account_id in the prompt after refresh: {'account_id' in prompt}")
+
+
+if __name__ == "__main__":
+    main()
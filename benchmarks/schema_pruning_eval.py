@@ -0,0 +1,71 @@
+"""Measure prompt-size reduction and table-selection recall of schema pruning.
+
+Run from the repository root:
+
+    python -m benchmarks.schema_pruning_eval --top-k 2
+"""
+import argparse
+
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql
+from result_formatter import estimate_tokens
+from schema_relevance import SchemaRelevanceIndex
+
+# Fixed question set with the tables a correct query needs; current-state questions need the latest table.
+EVAL_QUESTIONS = [
+    ("Show me all EC2 instances in the us-west-2 region", {"aws_config_resources_latest"}),
+    ("How many S3 buckets do we have?", {"aws_config_resources_latest"}),
+    ("Which resources are tagged env=prod?", {"aws_config_resources_latest"}),
+    ("List t3.large instances that are running", {"aws_config_resources_latest"}),
+    ("What changed in our security groups in the last day?", {"aws_config_resources"}),
+    ("How much did we spend on EC2 last month?", {"cost_usage_reports"}),
+    ("What are the top 5 most expensive services?", {"cost_usage_reports"}),
+    ("Show daily cost for Lambda this week", {"cost_usage_reports"}),
+    ("Which service quotas are close to their limit?", {"quota_details"}),
+    ("What is the EC2 quota for running on-demand instances?", {"quota_details"}),
+    ("What is the service limit for VPCs per region?", {"service_limits"}),
+    ("Show errors from the payments log group today", {"cloudwatch_logs"}),
+    ("How many timeout exceptions were logged yesterday?", {"cloudwatch_logs"}),
+    ("List our AMIs created this year", {"ami_details"}),
+    ("Which AMI images are the oldest?", {"ami_details"}),
+    ("Who owns the AMI named base-image?", {"ami_details"}),
+    ("Compare EC2 cost with the number of EC2 instances", {"cost_usage_reports", "aws_config_resources_latest"}),
+    ("Are we near the quota for EBS volumes given how many volumes exist?", {"quota_details", "aws_config_resources_latest"}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    schemas = define_extended_schema()
+    index = SchemaRelevanceIndex(schemas)
+    full_schema = "".join(generate_create_table_sql(schemas).values())
+    full_tokens = estimate_tokens(full_schema)
+
+    pruned_tokens = 0
+    expected_total = 0
+    found_total = 0
+    selected_total = 0
+    for question, expected in EVAL_QUESTIONS:
+        selected = set(index.select(question, args.top_k))
+        pruned_tokens += estimate_tokens(index.relevant_schema(question, args.top_k))
+        expected_total += len(expected)
+        found_total += len(expected & selected)
+        selected_total += len(selected)
+        if args.verbose or not expected <= selected:
+            marker = "ok  " if expected <= selected else "MISS"
+            print(f"{marker} {question!r}: selected {sorted(selected)}, expected {sorted(expected)}")
+
+    average_pruned = pruned_tokens / len(EVAL_QUESTIONS)
+    print(f"questions:             {len(EVAL_QUESTIONS)}")
+    print(f"full schema tokens:    {full_tokens}")
+    print(f"pruned schema tokens:  {average_pruned:.0f} (avg)")
+    print(f"prompt size reduction: {1 - average_pruned / full_tokens:.0%}")
+    print(f"table recall:          {found_total / expected_total:.0%}")
+    print(f"table precision:       {found_total / selected_total:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Offline eval of the SQL repair loop and the few-shot example store.
+
+Asks paraphrased questions against a synthetic DuckDB inventory with a scripted model that
+makes the mistakes real models make on this schema (Redshift functions on DuckDB, JSON paths
+instead of the typed columns, invented columns). The model corrects itself when shown the
+database error, and writes the right SQL first time when the prompt carries a verified example
+of the same query shape. Each configuration starts from an empty example store:
+
+    python -m benchmarks.sql_repair_eval --scale 5000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.stub_llm import SQL_QUESTION, StubCompletion
+
+# Query shapes: (SQL that runs, SQL the model writes without help or None, paraphrases).
+EVAL_SET = {
+    "instances_per_region": (
+        "SELECT region, COUNT(*) AS instances FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' GROUP BY region ORDER BY region",
+        "SELECT region, COUNT(instance_id) AS instances FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' GROUP BY region",
+        [
+            "How many EC2 instances are in each region?",
+            "Count EC2 instances per region",
+            "Number of EC2 instances by region",
+            "How many EC2 instances does each region have?",
+        ],
+    ),
+    "running_instances": (
+        "SELECT resource_id, region FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' AND instance_state = 'running'",
+        "SELECT resource_id, region FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' "
+        "AND JSON_EXTRACT_PATH_TEXT(configuration, 'state', 'name') = 'running'",
+        [
+            "Which EC2 instances are running?",
+            "List running EC2 instances",
+            "Show me the EC2 instances that are running right now",
+        ],
+    ),
+    "recent_log_errors": (
+        "SELECT log_group, COUNT(*) AS errors FROM cloudwatch_logs "
+        "WHERE message LIKE '%ERROR%' AND timestamp >= (SELECT MAX(timestamp) FROM cloudwatch_logs) - INTERVAL 1 DAY "
+        "GROUP BY log_group ORDER BY errors DESC",
+        "SELECT log_group, COUNT(*) AS errors FROM cloudwatch_logs "
+        "WHERE message LIKE '%ERROR%' AND timestamp >= DATEADD(day, -1, GETDATE()) "
+        "GROUP BY log_group ORDER BY errors DESC",
+        [
+            "Which log groups had the most errors in the last day?",
+            "Errors per log group over the last day",
+            "Top log groups by error count in the last 24 hours",
+        ],
+    ),
+    "monthly_cost": (
+        "SELECT service, SUM(cost) AS total_cost FROM cost_usage_reports "
+        "WHERE time_period LIKE '2026-08%' GROUP BY service ORDER BY total_cost DESC",
+        "SELECT service_name, SUM(cost) AS total_cost FROM cost_usage_reports "
+        "WHERE time_period LIKE '2026-08%' GROUP BY service_name ORDER BY total_cost DESC",
+        [
+            "What did we spend per service in August?",
+            "August cost by service",
+            "Which services cost the most in August?",
+        ],
+    ),
+    "prod_instance_owners": (
+        "SELECT resource_id, tag_team FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' AND tag_env = 'prod'",
+        "SELECT resource_id, tags->>'team' AS team FROM aws_config_resources_latest "
+        "WHERE resource_type = 'AWS::EC2::Instance' AND tags.env = 'prod'",
+        [
+            "Which team owns each prod EC2 instance?",
+            "Owner team of the EC2 instances tagged env=prod",
+            "List prod EC2 instances and their team tag",
+        ],
+    ),
+    "oldest_amis": (
+        "SELECT ami_id, name, creation_date FROM ami_details ORDER BY creation_date LIMIT 10",
+        None,
+        [
+            "List the 10 oldest AMIs",
+            "What are the oldest AMIs?",
+        ],
+    ),
+}
+
+
+class ScriptedModel(StubCompletion):
+    """Writes each shape's faulty SQL unless the prompt shows it the fix, via an error or an example."""
+
+    def __init__(self):
+        self.shapes = {}
+        for name, (good_sql, bad_sql, questions) in EVAL_SET.items():
+            for question in questions:
+                self.shapes[question] = (good_sql, bad_sql)
+        super().__init__({})
+        self.counts = {"generate": 0, "generate_failed": 0, "repair": 0, "answer": 0}
+
+    def completion_text(self, prompt):
+        match = SQL_QUESTION.search(prompt)
+        if match is None:
+            self.counts["answer"] += 1
+            return super().completion_text(prompt)
+        good_sql, bad_sql = self.shapes[match.group(1).strip()]
+        if "Error:" in prompt:
+            self.counts["repair"] += 1
+            return good_sql
+        self.counts["generate"] += 1
+        if bad_sql is None or f"SQL: {good_sql}" in prompt:
+            return good_sql
+        self.counts["generate_failed"] += 1
+        return bad_sql
+
+
+def evaluate(agent, repair_attempts, examples_store):
+    """Ask every question once and return the model's call counts plus answered/failed totals."""
+    model = ScriptedModel()
+    agent.openai.Completion = model
+    agent.SQL_REPAIR_ATTEMPTS = repair_attempts
+    agent.get_example_store = lambda: examples_store
+    answered = failed = 0
+    questions = [question for _good, _bad, paraphrases in EVAL_SET.values() for question in paraphrases]
+    # Interleave shapes so examples are looked up among unrelated ones, not just their own shape.
+    questions.sort(key=lambda question: next(
+        paraphrases.index(question) for _good, _bad, paraphrases in EVAL_SET.values() if question in paraphrases))
+    for question in questions:
+        try:
+            agent.process_user_query(question)
+            answered += 1
+        except Exception:
+            failed += 1
+    return dict(model.counts, answered=answered, failed=failed, llm_calls=model.calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=5_000)
+    parser.add_argument("--repair-attempts", type=int, default=2)
+    args = parser.parse_args()
+
+    # Every question goes to the model, so templates answering the common shapes stay out of the way.
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:", TRANSLATION_CACHE_ENABLED="0",
+                      INTENT_ROUTER_ENABLED="0", ANSWER_CACHE_ENABLED="0")
+    import natural_language_query_agent as agent
+    from benchmarks.end_to_end import load_inventory
+    from query_backends import get_query_backend
+    from sql_examples import ExampleStore
+
+    load_inventory(get_query_backend(), args.scale)
+    workdir = tempfile.mkdtemp()
+    configurations = {
+        "no repair, no examples": (0, None),
+        "repair": (args.repair_attempts, None),
+        "repair + examples": (args.repair_attempts, ExampleStore(os.path.join(workdir, "repair.sqlite3"))),
+    }
+
+    print(f"\n{'configuration':<25}{'answered':>10}{'failed gen':>12}{'repairs':>9}{'LLM calls':>11}{'calls/answer':>14}")
+    for label, (attempts, store) in configurations.items():
+        result = evaluate(agent, attempts, store)
+        per_answer = result["llm_calls"] / result["answered"] if result["answered"] else float("inf")
+        total = result["answered"] + result["failed"]
+        print(f"{label:<25}{result['answered']:>5} / {total:<3}"
+              f"{result['generate_failed']:>7} / {result['generate']:<3}"
+              f"{result['repair']:>9}{result['llm_calls']:>11}{per_answer:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
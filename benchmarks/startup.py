@@ -0,0 +1,94 @@
+"""Startup cost of pipeline setup: first run, converged re-run, and background setup.
+
+Uses the fixed-latency fake AWS from benchmarks.parallel_setup, extended so describe calls
+report the state the put calls created, and an embedded DuckDB database. Run from the
+repository root:
+
+    python -m benchmarks.startup --regions 17 --api-latency 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.parallel_setup import ALL_REGIONS, CANNED_RESPONSES, FakeClient, FakeSession
+from watermark_store import WatermarkStore
+
+BUCKET = "bench-bucket"
+FIREHOSE = "bench-stream"
+LOG_GROUP = "/aws/lambda/example-function"
+
+
+class ConvergedClient(FakeClient):
+    """Fake client whose describe calls show every setup step already applied."""
+
+    def __getattr__(self, operation):
+        responses = {
+            "describe_configuration_recorder_status": {"ConfigurationRecordersStatus": [{"name": "default", "recording": True}]},
+            "describe_subscription_filters": {"subscriptionFilters": [{
+                "filterName": "FirehoseSubscription",
+                "destinationArn": f"arn:aws:firehose:{self._region}:123456789012:deliverystream/{FIREHOSE}",
+            }]},
+            "describe_delivery_stream": {"DeliveryStreamDescription": {
+                "DeliveryStreamStatus": "ACTIVE",
+                "DeliveryStreamARN": f"arn:aws:firehose:{self._region}:123456789012:deliverystream/{FIREHOSE}",
+            }},
+            "describe_report_definitions": {"ReportDefinitions": [{"ReportName": "CostUsageReport", "S3Bucket": BUCKET}]},
+        }
+
+        def call(**kwargs):
+            self._session.record(self._service, operation)
+            time.sleep(self._latency)
+            return responses.get(operation) or CANNED_RESPONSES.get(operation, {})
+        return call
+
+
+class ConvergedSession(FakeSession):
+    def client(self, service, region_name=None):
+        self.clients_created += 1
+        return ConvergedClient(self, service, region_name, self.latency)
+
+
+def setup_calls(session):
+    """API calls made by setup itself, leaving out data collection and loading."""
+    setup_services = ("config", "logs", "firehose", "cur")
+    return sum(count for name, count in session.calls.items() if name.split(".")[0] in setup_services)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=len(ALL_REGIONS))
+    parser.add_argument("--api-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:", BULK_LOAD_MODE="local")
+    import aws_config_pipeline as pipeline
+
+    store = WatermarkStore(os.path.join(tempfile.mkdtemp(), "watermarks.sqlite3"))
+    pipeline.get_watermark_store = lambda: store
+    regions = ALL_REGIONS[: args.regions]
+    setup_args = (regions, BUCKET, FIREHOSE, "jdbc:redshift://bench:5439/dev", "aws_config_data", "bench", "bench")
+
+    results = {}
+    for label in ("first run", "converged re-run"):
+        session = ConvergedSession(args.api_latency)
+        report = pipeline.setup_aws_config_pipeline(*setup_args, session=session)
+        slowest_region = max(region["seconds"] for region in report["regions"].values())
+        results[label] = (report["seconds"], slowest_region, setup_calls(session), len(report["skipped"]))
+
+    session = ConvergedSession(args.api_latency)
+    started = time.perf_counter()
+    future = pipeline.start_pipeline_setup(*setup_args, session=session)
+    ready = time.perf_counter() - started
+    future.result()
+    background_total = time.perf_counter() - started
+
+    print()
+    print(f"{'':<20}{'total s':>10}{'slowest region s':>18}{'setup API calls':>17}{'skipped':>9}")
+    for label, (seconds, slowest_region, calls, skipped) in results.items():
+        print(f"{label:<20}{seconds:>10.2f}{slowest_region:>18.2f}{calls:>17}{skipped:>9}")
+    print(f"background setup: REPL ready after {ready * 1000:.1f}ms, setup finished after {background_total:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Time-to-first-token of the streaming answer path against the blocking one.
+
+Starts benchmarks.stub_llm's fake completions endpoint, points the openai client at it and runs
+the end-to-end scenarios over a small synthetic DuckDB inventory, once through
+process_user_query and once through process_user_query_stream. Also checks that abandoning a
+stream half way closes the HTTP request. Run from the repository root:
+
+    python -m benchmarks.streaming_answer --latency 0.3 --token-latency 0.03
+"""
+import argparse
+import os
+import statistics
+import time
+
+import openai
+
+from benchmarks.end_to_end import SCENARIOS
+from benchmarks.stub_llm import FakeCompletionServer, StubCompletion
+
+
+def time_blocking(agent, question):
+    started = time.perf_counter()
+    agent.process_user_query(question)
+    elapsed = time.perf_counter() - started
+    # Nothing reaches the user before the whole answer does.
+    return elapsed, elapsed
+
+
+def time_streaming(agent, question):
+    started = time.perf_counter()
+    first_token = None
+    for _text in agent.process_user_query_stream(question):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+    return first_token, time.perf_counter() - started
+
+
+def check_cancellation(agent, server, question):
+    """Read two chunks, abandon the stream, and confirm the server saw the client go away."""
+    stream = agent.process_user_query_stream(question)
+    next(stream)
+    next(stream)
+    stream.close()
+    deadline = time.monotonic() + 5
+    while server.cancelled == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return server.cancelled > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the model's first chunk")
+    parser.add_argument("--token-latency", type=float, default=0.03, help="seconds between chunks")
+    parser.add_argument("--scale", type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Every answer comes from the model, so both paths pay for the same generation.
+    os.environ.update(QUERY_BACKEND="duckdb", LOCAL_DB_PATH=":memory:", TRANSLATION_CACHE_ENABLED="0",
+                      ANSWER_CACHE_ENABLED="0", LOCAL_ANSWERS_ENABLED="0", SQL_EXAMPLES_ENABLED="0")
+    import natural_language_query_agent as agent
+    from benchmarks.end_to_end import load_inventory
+    from query_backends import get_query_backend
+
+    load_inventory(get_query_backend(), args.scale)
+    stub = StubCompletion({question: sql for question, sql in SCENARIOS.values()},
+                          latency=args.latency, token_latency=args.token_latency)
+    server = FakeCompletionServer(stub).start()
+    openai.api_base = server.api_base
+    openai.api_key = "fake"
+
+    print(f"{'scenario':<30}{'blocking':>20}{'streaming':>20}")
+    print(f"{'':<30}{'first / full (ms)':>20}{'first / full (ms)':>20}")
+    first_tokens = {"blocking": [], "streaming": []}
+    for name, (question, _sql) in SCENARIOS.items():
+        blocking = time_blocking(agent, question)
+        streaming = time_streaming(agent, question)
+        first_tokens["blocking"].append(blocking[0])
+        first_tokens["streaming"].append(streaming[0])
+        print(f"{name:<30}{blocking[0] * 1000:>10.0f} /{blocking[1] * 1000:>7.0f}"
+              f"{streaming[0] * 1000:>11.0f} /{streaming[1] * 1000:>7.0f}")
+    blocking_ttft = statistics.median(first_tokens["blocking"])
+    streaming_ttft = statistics.median(first_tokens["streaming"])
+    print(f"\nmedian time to first token: blocking {blocking_ttft * 1000:.0f}ms, "
+          f"streaming {streaming_ttft * 1000:.0f}ms ({blocking_ttft / streaming_ttft:.1f}x sooner)")
+    print(f"abandoned stream closed the request: {check_cancellation(agent, server, SCENARIOS['oldest_amis'][0])}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Stand-in for the OpenAI Completion endpoint with configurable latency and canned SQL.
+
+install() swaps openai.Completion so the agent's real prompt building, guardrail, database
+and formatting code runs unchanged while the model round trips cost a controlled amount of time.
+FakeCompletionServer serves the same answers over HTTP, streamed as server-sent events like the
+real API, so the openai client's own streaming and cancellation paths can be exercised:
+
+    python -m benchmarks.stub_llm --port 8765 --latency 0.5 --token-latency 0.05
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 python main.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import openai
+
+SQL_QUESTION = re.compile(r"^\s*User query: (.*)$", re.MULTILINE)
+ANSWER_QUESTION = re.compile(r"^\s*User Query: (.*)$", re.MULTILINE)
+DEFAULT_SQL = "SELECT COUNT(*) FROM aws_config_resources_latest"
+
+
+class StubCompletion:
+    """Answers SQL prompts from a question -> SQL table and answer prompts with a short summary."""
+
+    def __init__(self, canned_sql, latency=0.0, jitter=0.0, seed=0, token_latency=0.0):
+        self.canned_sql = canned_sql
+        self.latency = latency
+        self.jitter = jitter
+        # Delay between streamed chunks; latency is the wait for the first one.
+        self.token_latency = token_latency
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+
+    def completion_text(self, prompt):
+        match = SQL_QUESTION.search(prompt)
+        if match:
+            return self.canned_sql.get(match.group(1).strip(), DEFAULT_SQL)
+        match = ANSWER_QUESTION.search(prompt)
+        question = match.group(1).strip() if match else "the question"
+        data_lines = prompt.count("\n") - 8
+        return f"Answer to {question!r} based on {max(data_lines, 0)} lines of retrieved data."
+
+    def stream_pieces(self, text):
+        """Yield text in word-sized chunks, sleeping token_latency between them."""
+        for i, piece in enumerate(re.findall(r"\s*\S+", text)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield piece
+
+    def generate_all(self, text):
+        """Sleep as long as streaming text would take; a blocking call returns only after the last chunk."""
+        pieces = len(re.findall(r"\s*\S+", text))
+        if pieces > 1 and self.token_latency:
+            time.sleep((pieces - 1) * self.token_latency)
+
+    def create(self, prompt, stream=False, **kwargs):
+        self._sleep()
+        text = self.completion_text(prompt)
+        if stream:
+            return (SimpleNamespace(choices=[SimpleNamespace(text=piece)]) for piece in self.stream_pieces(text))
+        self.generate_all(text)
+        return SimpleNamespace(choices=[SimpleNamespace(text=text)])
+
+
+def install(canned_sql, latency=0.0, jitter=0.0, seed=0, token_latency=0.0):
+    """Route openai.Completion through a StubCompletion and return it."""
+    stub = StubCompletion(canned_sql, latency=latency, jitter=jitter, seed=seed, token_latency=token_latency)
+    openai.Completion = stub
+    return stub
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    stub = None
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = request.get("prompt", "")
+        self.stub._sleep()
+        text = self.stub.completion_text(prompt)
+        completion_id = f"cmpl-{uuid.uuid4().hex[:24]}"
+        if not request.get("stream"):
+            self.stub.generate_all(text)
+            body = json.dumps({
+                "id": completion_id, "object": "text_completion", "model": request.get("model", "stub"),
+                "choices": [{"text": text, "index": 0, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # Chunked like the real API, so the client sees each event as soon as it is written.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for piece in self.stub.stream_pieces(text):
+                event = {"id": completion_id, "object": "text_completion",
+                         "choices": [{"text": piece, "index": 0, "finish_reason": None}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled mid-answer.
+            self.server.cancelled += 1
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCompletionServer(ThreadingHTTPServer):
+    """Local HTTP endpoint speaking the OpenAI completions API, streaming included."""
+
+    daemon_threads = True
+
+    def __init__(self, stub, host="127.0.0.1", port=0):
+        handler = type("CompletionHandler", (_CompletionHandler,), {"stub": stub})
+        super().__init__((host, port), handler)
+        self.cancelled = 0
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="fake-completions", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned completions on a local OpenAI-compatible endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first chunk")
+    parser.add_argument("--token-latency", type=float, default=0.05, help="seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = FakeCompletionServer(StubCompletion({}, latency=args.latency, token_latency=args.token_latency),
+                                  port=args.port)
+    print(f"Serving fake completions; set OPENAI_API_BASE={server.api_base}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
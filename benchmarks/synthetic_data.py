@@ -0,0 +1,188 @@
+"""Synthetic AWS inventory for benchmarks: every schema table, generated inside DuckDB.
+
+Scale is the number of aws_config_resources captures; the other tables are sized from it
+(logs = scale, CUR lines = scale / 2, AMIs = scale / 100). Generation is set-based SQL, so
+10k rows take well under a second and 100M rows are bound by disk rather than Python.
+Populate a database file for other tools with:
+
+    python -m benchmarks.synthetic_data --scale 1000000 --db /tmp/inventory.duckdb
+"""
+import argparse
+import time
+
+import duckdb
+
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql, hot_path_backfill_sql
+from latest_state import EPOCH, merge_new_captures
+
+REGIONS = ["us-east-1", "us-east-2", "us-west-1", "us-west-2", "eu-west-1", "eu-central-1",
+           "ap-southeast-1", "ap-southeast-2", "ap-northeast-1", "sa-east-1"]
+RESOURCE_TYPES = ["AWS::EC2::Instance", "AWS::EC2::Volume", "AWS::EC2::SecurityGroup", "AWS::S3::Bucket",
+                  "AWS::IAM::Role", "AWS::Lambda::Function", "AWS::RDS::DBInstance", "AWS::EC2::VPC"]
+INSTANCE_TYPES = ["t3.micro", "t3.large", "m5.xlarge", "c5.2xlarge", "r5.large", "t4g.medium"]
+SERVICES = ["AmazonEC2", "AmazonS3", "AWSLambda", "AmazonRDS", "AmazonDynamoDB", "AmazonCloudWatch",
+            "AmazonVPC", "AWSDataTransfer"]
+LOG_GROUPS = ["/aws/lambda/payments", "/aws/lambda/orders", "/aws/lambda/auth", "/ecs/web", "/ecs/worker"]
+LOG_MESSAGES = [
+    "INFO request completed in 35 ms",
+    "INFO cache hit for customer profile",
+    "WARN retrying call to downstream service",
+    "ERROR Task timed out after 30.03 seconds",
+    "ERROR TimeoutError: connection to db-primary timed out",
+    "ERROR AccessDenied: not authorized to perform s3:GetObject",
+]
+START = "2026-06-01"
+DAYS = 120
+
+
+def _sql_list(values):
+    return "[" + ", ".join(f"'{value}'" for value in values) + "]"
+
+
+def _pick(values, seed_expr):
+    """SQL choosing one of values deterministically from an integer expression."""
+    return f"list_element({_sql_list(values)}, CAST(1 + hash({seed_expr}) % {len(values)} AS INTEGER))"
+
+
+CONFIGURATION_SQL = f"""
+    CASE resource_type
+        WHEN 'AWS::EC2::Instance' THEN json_object(
+            'instanceId', resource_id,
+            'instanceType', {_pick(INSTANCE_TYPES, 'r * 3')},
+            'state', json_object('code', 16, 'name', CASE WHEN hash(r, c) % 10 = 0 THEN 'stopped' ELSE 'running' END),
+            'vpcId', 'vpc-' || CAST(r % 40 AS VARCHAR),
+            'subnetId', 'subnet-' || CAST(r % 160 AS VARCHAR),
+            'imageId', 'ami-' || lpad(CAST(r % 500 AS VARCHAR), 17, '0'),
+            'launchTime', CAST(capture_time AS VARCHAR),
+            'blockDeviceMappings', json_array(json_object('deviceName', '/dev/xvda',
+                'ebs', json_object('volumeId', 'vol-' || CAST(r AS VARCHAR), 'status', 'attached', 'deleteOnTermination', true))),
+            'securityGroups', json_array(json_object('groupId', 'sg-' || CAST(r % 90 AS VARCHAR), 'groupName', 'app')),
+            'monitoring', json_object('state', 'disabled'),
+            'architecture', CASE WHEN r % 6 = 5 THEN 'arm64' ELSE 'x86_64' END)
+        WHEN 'AWS::EC2::Volume' THEN json_object(
+            'volumeId', resource_id, 'size', 8 + r % 500, 'volumeType', CASE WHEN r % 3 = 0 THEN 'gp3' ELSE 'gp2' END,
+            'encrypted', r % 4 <> 0, 'state', json_object('name', 'in-use'))
+        WHEN 'AWS::S3::Bucket' THEN json_object(
+            'name', 'bucket-' || CAST(r AS VARCHAR), 'versioningConfiguration', json_object('status', 'Enabled'),
+            'publicAccessBlockConfiguration', json_object('blockPublicAcls', r % 9 <> 0))
+        ELSE json_object('arn', 'arn:aws:' || lower(split_part(resource_type, '::', 2)) || ':::' || resource_id)
+    END
+"""
+
+
+def create_tables(conn):
+    schemas = define_extended_schema()
+    conn.execute("".join(generate_create_table_sql(schemas, "duckdb", if_not_exists=True).values()))
+
+
+def populate_config(conn, scale, captures_per_resource=5):
+    resources = max(1, scale // captures_per_resource)
+    conn.execute(f"""
+        INSERT INTO aws_config_resources (resource_id, resource_type, region, configuration, tags, capture_time, status)
+        SELECT resource_id, resource_type, region,
+               CASE WHEN c = {captures_per_resource - 1} AND hash(r) % 50 = 0
+                    THEN json_object() ELSE {CONFIGURATION_SQL} END,
+               json_object('env', {_pick(['prod', 'staging', 'dev'], 'r * 7')},
+                           'team', {_pick(['payments', 'platform', 'data', 'web'], 'r * 11')},
+                           'owner', 'user' || CAST(r % 200 AS VARCHAR)),
+               capture_time,
+               CASE WHEN c = {captures_per_resource - 1} AND hash(r) % 50 = 0 THEN 'ResourceDeleted' ELSE 'OK' END
+        FROM (
+            SELECT r, c,
+                   'res-' || lpad(CAST(r AS VARCHAR), 12, '0') AS resource_id,
+                   {_pick(RESOURCE_TYPES, 'r')} AS resource_type,
+                   {_pick(REGIONS, 'r * 5')} AS region,
+                   TIMESTAMP '{START}' + to_seconds(CAST(hash(r, c) % ({DAYS} * 86400) AS BIGINT)) AS capture_time
+            FROM range({resources}) AS rs(r), range({captures_per_resource}) AS cs(c)
+        ) AS captures
+    """)
+    conn.execute(hot_path_backfill_sql("aws_config_resources", "instance_type IS NULL", "duckdb"))
+    merge_new_captures(conn, EPOCH, "duckdb")
+
+
+def populate_logs(conn, rows):
+    conn.execute(f"""
+        INSERT INTO cloudwatch_logs
+        SELECT {_pick(LOG_GROUPS, 'i')},
+               '2026/09/' || lpad(CAST(1 + i % 30 AS VARCHAR), 2, '0') || '/[$LATEST]' || md5(CAST(i % 977 AS VARCHAR)),
+               TIMESTAMP '{START}' + to_seconds(CAST(hash(i) % ({DAYS} * 86400) AS BIGINT)),
+               {_pick(LOG_MESSAGES, 'i * 13')} || ' request_id=' || md5(CAST(i AS VARCHAR))
+        FROM range({rows}) AS t(i)
+    """)
+
+
+def populate_amis(conn, rows):
+    conn.execute(f"""
+        INSERT INTO ami_details
+        SELECT 'ami-' || lpad(CAST(i AS VARCHAR), 17, '0'),
+               'base-image-' || CAST(i % 50 AS VARCHAR) || '-v' || CAST(i AS VARCHAR),
+               'Golden image build ' || CAST(i AS VARCHAR) || ' with hardened OS packages',
+               TIMESTAMP '2024-01-01' + to_days(CAST(hash(i) % 1000 AS INTEGER)),
+               CAST(100000000000 + i % 3 AS VARCHAR),
+               {_pick(REGIONS, 'i')}
+        FROM range({rows}) AS t(i)
+    """)
+
+
+def populate_quotas(conn):
+    conn.execute(f"""
+        INSERT INTO quota_details
+        SELECT s.service, 'Quota ' || CAST(q AS VARCHAR) || ' for ' || s.service,
+               CAST(10 * (1 + hash(q) % 100) AS DOUBLE) AS quota_value,
+               CAST(hash(q, region) % (10 * (1 + hash(q) % 100)) AS DOUBLE),
+               CASE WHEN q % 4 = 0 THEN 'Count' ELSE 'None' END,
+               region
+        FROM (SELECT unnest({_sql_list(['ec2', 's3', 'lambda', 'rds', 'dynamodb', 'vpc', 'ebs', 'elasticloadbalancing'])}) AS service) AS s,
+             (SELECT unnest({_sql_list(REGIONS)}) AS region) AS rg,
+             range(40) AS qs(q)
+    """)
+    conn.execute("""
+        INSERT INTO service_limits
+        SELECT service, quota_name, quota_value, unit FROM quota_details WHERE region = 'us-east-1'
+    """)
+
+
+def populate_cur(conn, rows):
+    conn.execute(f"""
+        INSERT INTO cost_usage_reports
+        SELECT strftime(TIMESTAMP '{START}' + to_days(CAST(hash(i) % {DAYS} AS INTEGER)), '%Y-%m-%d'),
+               {_pick(SERVICES, 'i')},
+               round((hash(i, 1) % 100000) / 1000.0, 4),
+               round((hash(i, 2) % 10000) / 10.0, 2),
+               {_pick(['Hrs', 'GB-Mo', 'Requests', 'GB'], 'i * 3')}
+        FROM range({rows}) AS t(i)
+    """)
+
+
+def populate(conn, scale):
+    """Fill every table at the given scale; returns seconds spent per table."""
+    create_tables(conn)
+    timings = {}
+    for name, step in (
+        ("aws_config_resources", lambda: populate_config(conn, scale)),
+        ("cloudwatch_logs", lambda: populate_logs(conn, scale)),
+        ("ami_details", lambda: populate_amis(conn, max(100, scale // 100))),
+        ("quota_details", lambda: populate_quotas(conn)),
+        ("cost_usage_reports", lambda: populate_cur(conn, max(100, scale // 2))),
+    ):
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10_000)
+    parser.add_argument("--db", default=":memory:")
+    args = parser.parse_args()
+
+    conn = duckdb.connect(args.db)
+    for table, seconds in populate(conn, args.scale).items():
+        print(f"{table:<24}{seconds:>8.2f}s")
+    for table in define_extended_schema():
+        print(f"{table:<32}{conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]:>12,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Warehouse admission control: latency per priority class with one heavy user, cancellation, timeouts.
+
+One batch user floods the warehouse with slow queries while a few API users run medium ones
+and an analyst at the REPL runs short interactive ones. The mix runs without admission control
+(only the connection pool limits concurrency) and through the QueryScheduler, then an
+abandoned query is cancelled and a batch query runs into its statement timeout.
+
+Point the REDSHIFT_* environment variables at a scratch Postgres database and run from the
+repository root:
+
+    python -m benchmarks.warehouse_admission --duration 10
+
+Without a database, --simulate stands in a warehouse with --slots concurrent queries (the
+rest wait in its own queue, like a WLM queue) to exercise the same scheduling:
+
+    python -m benchmarks.warehouse_admission --simulate
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.end_to_end import percentile
+from query_scheduler import QueryCancelled, QueryContext, QueryScheduler, QueueTimeout
+from query_tracing import PrometheusMetrics
+
+# (user, priority, threads, query seconds, think seconds between queries)
+WORKLOAD = [
+    ("etl", "batch", 12, 1.0, 0.0),
+    ("api-1", "batch", 1, 0.2, 0.05),
+    ("api-2", "batch", 1, 0.2, 0.05),
+    ("api-3", "batch", 1, 0.2, 0.05),
+    ("analyst", "interactive", 1, 0.05, 0.2),
+]
+
+
+class PostgresWarehouse:
+    """Runs pg_sleep through the scheduler's pooled connections."""
+
+    def run(self, scheduler, seconds):
+        with scheduler.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(%s)", (seconds,))
+
+    def close(self):
+        from db_pool import close_connection_pool
+        close_connection_pool()
+
+
+class SimulatedWarehouse:
+    """Sleeps instead of querying; slots queries run at once and the rest wait, as on a busy cluster."""
+
+    def __init__(self, slots):
+        self._slots = threading.BoundedSemaphore(slots)
+
+    def run(self, scheduler, seconds):
+        with scheduler.admit() as admission:
+            with self._slots:
+                finished = threading.Event()
+                timeout = admission.statement_timeout_ms / 1000
+                with admission.context.cancels(finished.set):
+                    if finished.wait(min(seconds, timeout)):
+                        raise RuntimeError("canceling statement due to user request")
+                    if seconds > timeout:
+                        raise RuntimeError("canceling statement due to statement timeout")
+
+    def close(self):
+        pass
+
+
+def run_mix(warehouse, scheduler, duration):
+    """Run WORKLOAD for duration seconds; returns per-user latencies (queueing included) and queue timeouts."""
+    latencies = {user: [] for user, *_ in WORKLOAD}
+    timeouts = dict.fromkeys(latencies, 0)
+    deadline = time.monotonic() + duration
+
+    def client(user, priority, seconds, think):
+        with QueryContext(user, priority):
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    warehouse.run(scheduler, seconds)
+                    latencies[user].append(time.perf_counter() - started)
+                except QueueTimeout:
+                    timeouts[user] += 1
+                time.sleep(think)
+
+    threads = []
+    for user, priority, count, seconds, think in WORKLOAD:
+        threads += [threading.Thread(target=client, args=(user, priority, seconds, think)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, timeouts
+
+
+def report(label, latencies, timeouts):
+    print(f"\n{label}")
+    print(f"{'user':<10}{'priority':<13}{'queries':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'timeouts':>10}")
+    for user, priority, *_ in WORKLOAD:
+        samples = latencies[user] or [float("nan")]
+        print(f"{user:<10}{priority:<13}{len(latencies[user]):>8}{percentile(samples, 50) * 1000:>9.0f}"
+              f"{percentile(samples, 99) * 1000:>9.0f}{max(samples) * 1000:>9.0f}{timeouts[user]:>10}")
+
+
+def measure_cancellation(warehouse, scheduler):
+    """Seconds from cancel() to the abandoned query's thread getting QueryCancelled."""
+    outcome = {}
+
+    def ask(context):
+        with context:
+            try:
+                warehouse.run(scheduler, 30)
+            except QueryCancelled:
+                outcome["cancelled"] = time.perf_counter()
+            except Exception as e:
+                outcome["error"] = e
+
+    context = QueryContext("analyst", "interactive")
+    thread = threading.Thread(target=ask, args=(context,))
+    thread.start()
+    time.sleep(0.3)
+    cancelled_at = time.perf_counter()
+    context.cancel()
+    thread.join()
+    if "cancelled" not in outcome:
+        return None, outcome.get("error")
+    return outcome["cancelled"] - cancelled_at, None
+
+
+def measure_statement_timeout(warehouse, scheduler):
+    """Run a batch query longer than its statement timeout; returns (seconds, error)."""
+    started = time.perf_counter()
+    with QueryContext("etl", "batch"):
+        try:
+            warehouse.run(scheduler, 5)
+        except Exception as e:
+            return time.perf_counter() - started, e
+    return time.perf_counter() - started, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds each configuration runs the mix")
+    parser.add_argument("--simulate", action="store_true", help="sleep instead of querying Postgres")
+    parser.add_argument("--slots", type=int, default=10, help="simulated warehouse concurrency")
+    args = parser.parse_args()
+
+    if args.simulate:
+        warehouse = SimulatedWarehouse(args.slots)
+        capacity = args.slots
+    else:
+        from db_pool import get_connection_pool
+        warehouse = PostgresWarehouse()
+        capacity = get_connection_pool().max_size
+
+    # Without admission control, whoever grabs the pool's connections (or the cluster's slots) first wins.
+    unlimited = QueryScheduler(max_concurrency=1000, max_per_user=1000, interactive_reserved=0, queue_timeout=3600)
+    report(f"no admission control ({capacity} connections)", *run_mix(warehouse, unlimited, args.duration))
+
+    metrics = PrometheusMetrics()
+    scheduler = QueryScheduler(metrics=metrics)
+    report(f"admission control (max {scheduler.max_concurrency}, {scheduler.max_per_user} per user, "
+           f"{scheduler.interactive_reserved} reserved for interactive)", *run_mix(warehouse, scheduler, args.duration))
+    stats = scheduler.stats()
+    print(f"admitted {stats['admitted']}, queued {stats['waits']} times, mean wait {stats['wait_seconds_avg'] * 1000:.0f}ms, "
+          f"max wait {stats['wait_seconds_max'] * 1000:.0f}ms, {stats['timeouts']} queue timeouts")
+
+    seconds, error = measure_cancellation(warehouse, scheduler)
+    if error is None:
+        print(f"\nabandoned 30s query stopped {seconds * 1000:.0f}ms after cancel(); "
+              f"running queries cancelled: {scheduler.stats()['cancelled_running']}")
+    else:
+        print(f"\nabandoned query was not cancelled: {error!r}")
+
+    timed = QueryScheduler(statement_timeouts_ms={"batch": 500})
+    seconds, error = measure_statement_timeout(warehouse, timed)
+    print(f"5s batch query under a 500ms statement timeout ended after {seconds * 1000:.0f}ms: "
+          f"{str(error).strip() if error else 'no error'}")
+
+    print("\n" + "\n".join(line for line in metrics.render().splitlines()
+                           if "warehouse" in line and "_bucket" not in line))
+    warehouse.close()
+
+
+if __name__ == "__main__":
+    main()
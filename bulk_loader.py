@@ -0,0 +1,207 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+from db_pool import pooled_connection
+from query_backends import get_query_backend
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 30.0
+
+# "redshift" stages gzip'd newline-JSON chunks in S3 and COPYs them; "postgres" streams CSV
+# through COPY FROM STDIN, which Redshift does not support but a local Postgres stand-in does;
+# "local" inserts into the embedded DuckDB/SQLite query backend.
+LOAD_MODES = ("redshift", "postgres", "local")
+
+AMI_COLUMNS = ["ami_id", "name", "description", "creation_date", "owner_id", "region"]
+
+
+def ami_rows(describe_images_response, region):
+    """Map a describe_images response to ami_details rows."""
+    for image in (describe_images_response or {}).get("Images", []):
+        yield (
+            image.get("ImageId"),
+            image.get("Name"),
+            image.get("Description"),
+            image.get("CreationDate"),
+            image.get("OwnerId"),
+            region,
+        )
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class BulkLoader:
+    """Buffer rows for one table and load each batch with a single COPY in its own transaction."""
+
+    def __init__(self, table, columns, mode="redshift", batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, s3_client=None, s3_bucket=None,
+                 s3_prefix="bulk-load", iam_role=None):
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown bulk load mode {mode!r}; expected one of {LOAD_MODES}")
+        if mode == "redshift" and not (s3_client and s3_bucket and iam_role):
+            raise ValueError("Redshift bulk loads need an S3 client, bucket and IAM role for COPY")
+        self.table = table
+        self.columns = columns
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.s3_client = s3_client
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix.strip("/")
+        self.iam_role = iam_role
+        self.rows_loaded = 0
+        self.batches_loaded = 0
+        self.load_seconds = 0.0
+        self._rows = []
+        self._first_buffered = None
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        """Buffer one row, loading the buffer once it is full or older than flush_interval."""
+        self.add_many([row])
+
+    def add_many(self, rows):
+        for row in rows:
+            with self._lock:
+                if not self._rows:
+                    self._first_buffered = time.monotonic()
+                self._rows.append(row)
+                due = (len(self._rows) >= self.batch_size
+                       or time.monotonic() - self._first_buffered >= self.flush_interval)
+                batch = self._take() if due else None
+            if batch:
+                self.load(batch)
+
+    def _take(self):
+        batch, self._rows = self._rows, []
+        return batch
+
+    def flush(self):
+        """Load whatever is buffered."""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self.load(batch)
+
+    def load(self, rows, replace_where=None):
+        """Load one batch of rows with a single COPY inside one transaction.
+
+        replace_where is an optional (sql, params) condition; matching rows are deleted in the
+        same transaction first, which turns the load into an upsert of that slice of the table.
+        """
+        rows = list(rows)
+        if not rows and replace_where is None:
+            return
+        started = time.perf_counter()
+        if self.mode == "redshift":
+            self._copy_from_s3(rows, replace_where)
+        elif self.mode == "postgres":
+            self._copy_from_stdin(rows, replace_where)
+        else:
+            self._insert_local(rows, replace_where)
+        with self._lock:
+            self.rows_loaded += len(rows)
+            self.batches_loaded += 1
+            self.load_seconds += time.perf_counter() - started
+
+    def _delete(self, cur, replace_where):
+        if replace_where is not None:
+            condition, params = replace_where
+            cur.execute(f"DELETE FROM {self.table} WHERE {condition}", params)
+
+    def _copy_from_stdin(self, rows, replace_where=None):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                self._delete(cur, replace_where)
+                if not rows:
+                    return
+                cur.copy_expert(
+                    f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+
+    def _insert_local(self, rows, replace_where=None):
+        backend = get_query_backend()
+        with backend.maintenance_connection() as conn:
+            with conn.cursor() as cur:
+                if replace_where is not None:
+                    condition, params = replace_where
+                    cur.execute(f"DELETE FROM {self.table} WHERE {condition.replace('%s', backend.placeholder)}", params)
+                if rows:
+                    placeholders = ", ".join([backend.placeholder] * len(self.columns))
+                    cur.executemany(f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders})", rows)
+
+    def _copy_from_s3(self, rows, replace_where=None):
+        if not rows:
+            with pooled_connection() as conn:
+                with conn.cursor() as cur:
+                    self._delete(cur, replace_where)
+            return
+        payload = io.BytesIO()
+        with gzip.GzipFile(fileobj=payload, mode="wb") as chunk:
+            for row in rows:
+                record = {column: _json_value(value) for column, value in zip(self.columns, row)}
+                chunk.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+        key = f"{self.s3_prefix}/{self.table}/{uuid.uuid4().hex}.json.gz"
+        self.s3_client.put_object(Bucket=self.s3_bucket, Key=key, Body=payload.getvalue())
+        try:
+            with pooled_connection() as conn:
+                with conn.cursor() as cur:
+                    self._delete(cur, replace_where)
+                    cur.execute(
+                        f"COPY {self.table} ({', '.join(self.columns)}) "
+                        f"FROM 's3://{self.s3_bucket}/{key}' IAM_ROLE %s "
+                        "FORMAT AS JSON 'auto' GZIP TIMEFORMAT 'auto'",
+                        (self.iam_role,),
+                    )
+        finally:
+            self.s3_client.delete_object(Bucket=self.s3_bucket, Key=key)
+
+    def stats(self):
+        return {
+            "table": self.table,
+            "rows": self.rows_loaded,
+            "batches": self.batches_loaded,
+            "seconds": self.load_seconds,
+            "rows_per_second": self.rows_loaded / self.load_seconds if self.load_seconds else 0.0,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+
+def create_bulk_loader(table, columns, s3_client=None, s3_bucket=None, iam_role=None):
+    """Build a BulkLoader configured from BULK_LOAD_* environment variables.
+
+    Without BULK_LOAD_MODE, rows go wherever the query backend reads from: COPY via S3 for
+    Redshift, plain inserts for the embedded backends.
+    """
+    default_mode = "redshift" if get_query_backend().name == "redshift" else "local"
+    return BulkLoader(
+        table,
+        columns,
+        mode=os.getenv("BULK_LOAD_MODE", default_mode),
+        batch_size=int(os.getenv("BULK_LOAD_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+        flush_interval=float(os.getenv("BULK_LOAD_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)),
+        s3_client=s3_client,
+        s3_bucket=s3_bucket or os.getenv("BULK_LOAD_S3_BUCKET"),
+        iam_role=iam_role or os.getenv("BULK_LOAD_IAM_ROLE"),
+    )
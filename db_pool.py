@@ -0,0 +1,355 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_CHECKOUT_TIMEOUT = 30.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+DEFAULT_STATEMENT_TIMEOUT_MS = 60000
+DEFAULT_FETCH_BATCH_SIZE = 500
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class RedshiftConnectionPool:
+    """Thread-safe pool of reusable psycopg2 connections to Redshift."""
+
+    def __init__(self, min_size=DEFAULT_POOL_MIN_SIZE, max_size=DEFAULT_POOL_MAX_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT,
+                 health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL,
+                 statement_timeout_ms=DEFAULT_STATEMENT_TIMEOUT_MS, **connect_kwargs):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.statement_timeout_ms = statement_timeout_ms
+        self.connect_kwargs = connect_kwargs
+
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "idle_evictions": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+        }
+
+        for _ in range(min_size):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+            self._size += 1
+            self._stats["connections_created"] += 1
+
+    def _connect(self):
+        """Open a new connection with the pool's default statement timeout applied."""
+        conn = psycopg2.connect(**self.connect_kwargs)
+        if self.statement_timeout_ms:
+            with conn.cursor() as cur:
+                cur.execute("SET statement_timeout TO %s", (int(self.statement_timeout_ms),))
+            conn.commit()
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._stats["connections_closed"] += 1
+
+    def _is_healthy(self, conn, last_used):
+        """Check a connection on checkout; only round-trips if it has sat idle for a while."""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _evict_idle(self):
+        """Close idle connections past idle_timeout, keeping at least min_size open. Caller holds the lock."""
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats["idle_evictions"] += 1
+            self._close(conn)
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, opening a new one if below max_size."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeoutError("Connection pool is closed")
+                    self._evict_idle()
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No connection available after {timeout:.1f}s (max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+            if candidate is None:
+                break
+            # Health-check outside the lock so a slow round trip does not block other checkouts.
+            conn, last_used = candidate
+            if self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._stats["hits"] += 1
+                    self._record_wait(started, waited)
+                return conn
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+                self._size -= 1
+                self._close(conn)
+                self._cond.notify()
+
+        # Connect outside the lock so a slow handshake does not block other checkouts.
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["misses"] += 1
+            self._stats["connections_created"] += 1
+            self._record_wait(started, waited)
+        return conn
+
+    def _record_wait(self, started, waited):
+        if not waited:
+            return
+        elapsed = time.monotonic() - started
+        self._stats["waits"] += 1
+        self._stats["wait_seconds_total"] += elapsed
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], elapsed)
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, discarding it if it is broken."""
+        if not discard and not conn.closed:
+            try:
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, statement_timeout_ms=None):
+        """Borrow a connection, committing on success and rolling back on error."""
+        conn = self.getconn()
+        discard = False
+        try:
+            if statement_timeout_ms is not None:
+                with conn.cursor() as cur:
+                    cur.execute("SET statement_timeout TO %s", (int(statement_timeout_ms),))
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+            raise
+        finally:
+            if statement_timeout_ms is not None and not discard and not conn.closed:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("SET statement_timeout TO %s", (int(self.statement_timeout_ms or 0),))
+                    conn.commit()
+                except psycopg2.Error:
+                    discard = True
+            self.putconn(conn, discard=discard)
+
+    def metrics(self):
+        """Return a snapshot of pool hit/miss and wait-time counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        checkouts = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / checkouts if checkouts else 0.0
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                self._close(conn)
+            self._cond.notify_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """Return the process-wide Redshift connection pool, creating it from the environment on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RedshiftConnectionPool(
+                min_size=int(os.getenv("REDSHIFT_POOL_MIN_SIZE", DEFAULT_POOL_MIN_SIZE)),
+                max_size=int(os.getenv("REDSHIFT_POOL_MAX_SIZE", DEFAULT_POOL_MAX_SIZE)),
+                idle_timeout=float(os.getenv("REDSHIFT_POOL_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT)),
+                checkout_timeout=float(os.getenv("REDSHIFT_POOL_CHECKOUT_TIMEOUT", DEFAULT_CHECKOUT_TIMEOUT)),
+                health_check_interval=float(os.getenv("REDSHIFT_POOL_HEALTH_CHECK_INTERVAL", DEFAULT_HEALTH_CHECK_INTERVAL)),
+                statement_timeout_ms=int(os.getenv("REDSHIFT_STATEMENT_TIMEOUT_MS", DEFAULT_STATEMENT_TIMEOUT_MS)),
+                dbname=os.getenv("REDSHIFT_DB"),
+                user=os.getenv("REDSHIFT_USER"),
+                password=os.getenv("REDSHIFT_PASSWORD"),
+                host=os.getenv("REDSHIFT_HOST"),
+                port=os.getenv("REDSHIFT_PORT"),
+            )
+        return _pool
+
+
+def pooled_connection(statement_timeout_ms=None):
+    """Borrow a connection from the shared pool for the duration of a with-block."""
+    return get_connection_pool().connection(statement_timeout_ms=statement_timeout_ms)
+
+
+def close_connection_pool():
+    """Close the shared pool, e.g. at process shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+class QueryStream:
+    """Iterate a query's rows in fetchmany batches from a named server-side cursor.
+
+    Only one batch is held in memory at a time. Column names are available in
+    ``columns`` once iteration has started, and ``total_row_count()`` reports the
+    true size of the result even if the consumer stopped reading early. For SQL whose
+    LIMIT was added or lowered by the guardrail, pass the query as written as ``count_sql``
+    and the cap as ``row_limit`` so the count covers every matching row.
+    """
+
+    def __init__(self, sql_query, batch_size=DEFAULT_FETCH_BATCH_SIZE, connection=None,
+                 count_sql=None, row_limit=None):
+        self.sql_query = sql_query
+        self.batch_size = batch_size
+        self.count_sql = count_sql or sql_query
+        self.row_limit = row_limit
+        # Context manager yielding the connection to run on; the shared pool by default.
+        self.connection = connection or pooled_connection
+        self.columns = None
+        self.row_count = 0
+        # Time spent waiting on the database, so tracing can tell it apart from formatting.
+        self.fetch_seconds = 0.0
+        self.exhausted = False
+        self._rows = None
+
+    def __iter__(self):
+        if self._rows is None:
+            self._rows = self._generate()
+        return self._rows
+
+    def _generate(self):
+        with self.connection() as conn:
+            with conn.cursor(name=f"agent_stream_{uuid.uuid4().hex}") as cur:
+                cur.itersize = self.batch_size
+                started = time.perf_counter()
+                cur.execute(self.sql_query)
+                while True:
+                    rows = cur.fetchmany(self.batch_size)
+                    self.fetch_seconds += time.perf_counter() - started
+                    if self.columns is None and cur.description:
+                        self.columns = [col[0] for col in cur.description]
+                    if not rows:
+                        break
+                    for row in rows:
+                        self.row_count += 1
+                        yield row
+                    started = time.perf_counter()
+        self.exhausted = True
+
+    def close(self):
+        """Release the server-side cursor and its connection without reading the rest."""
+        if self._rows is not None:
+            self._rows.close()
+
+    def limit_reached(self):
+        """True if the rows read so far may have been cut off by row_limit."""
+        return self.row_limit is not None and self.row_count >= self.row_limit
+
+    def total_row_count(self):
+        """Return the full result size, counting server-side if the stream was not drained or hit row_limit."""
+        if self.exhausted and not self.limit_reached():
+            return self.row_count
+        self.close()
+        return count_query_rows(self.count_sql, connection=self.connection)
+
+
+def stream_query(sql_query, batch_size=DEFAULT_FETCH_BATCH_SIZE, connection=None, count_sql=None, row_limit=None):
+    """Return a QueryStream over the rows of sql_query."""
+    return QueryStream(sql_query, batch_size=batch_size, connection=connection, count_sql=count_sql,
+                       row_limit=row_limit)
+
+
+def count_query_rows(sql_query, connection=None):
+    """Count the rows a query would return without transferring them."""
+    with (connection or pooled_connection)() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM ({sql_query.strip().rstrip(';')}) AS counted_rows")
+            return cur.fetchone()[0]
@@ -0,0 +1,128 @@
+import datetime
+import json
+
+from aws_clients import get_client
+from aws_config_schema_design import HOT_JSON_PATHS
+from bulk_loader import ami_rows
+from watermark_store import get_watermark_store
+
+# describe_images has no "created after" filter, but creation-date accepts wildcards, so
+# recent watermarks can be turned into one day-prefix pattern per day since.
+MAX_CREATION_DATE_FILTER_DAYS = 31
+
+CONFIG_SELECT_EXPRESSION = (
+    "SELECT resourceId, resourceType, awsRegion, configuration, tags, "
+    "configurationItemCaptureTime, configurationItemStatus "
+    "WHERE configurationItemCaptureTime > '{watermark}'"
+)
+
+LOG_COLUMNS = ["log_group", "log_stream", "timestamp", "message"]
+CONFIG_COLUMNS = ["resource_id", "resource_type", "region", "configuration", "tags", "capture_time", "status"] + list(HOT_JSON_PATHS)
+
+
+def creation_date_filter(watermark, today=None):
+    """Return creation-date wildcard values covering each day since the watermark, or None if too old."""
+    if not watermark:
+        return None
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    since = datetime.date.fromisoformat(watermark[:10])
+    days = (today - since).days
+    if days < 0 or days > MAX_CREATION_DATE_FILTER_DAYS:
+        return None
+    return [f"{since + datetime.timedelta(days=offset)}*" for offset in range(days + 1)]
+
+
+def load_new_images(images, region, loader, store, collector):
+    """Load only the images created after the collector's watermark, then advance it."""
+    watermark = store.get(collector, region, "")
+    new_images = [image for image in images if image.get("CreationDate", "") > watermark]
+    if not new_images:
+        return 0
+    loader.load(ami_rows({"Images": new_images}, region))
+    store.set(collector, region, max(image["CreationDate"] for image in new_images))
+    return len(new_images)
+
+
+def collect_new_owned_amis(session, region, loader, store=None):
+    """Load self-owned AMIs created since the last run in this region."""
+    store = store or get_watermark_store()
+    collector = "ami_details:self"
+    kwargs = {"Owners": ["self"]}
+    date_filter = creation_date_filter(store.get(collector, region))
+    if date_filter:
+        kwargs["Filters"] = [{"Name": "creation-date", "Values": date_filter}]
+    ec2 = get_client(session, "ec2", region)
+    images = [image for page in ec2.get_paginator("describe_images").paginate(**kwargs) for image in page["Images"]]
+    return load_new_images(images, region, loader, store, collector)
+
+
+def collect_new_log_events(session, region, log_group_name, loader, store=None):
+    """Pull CloudWatch log events newer than the last pulled event into cloudwatch_logs."""
+    store = store or get_watermark_store()
+    collector = f"cloudwatch_logs:{log_group_name}"
+    watermark = int(store.get(collector, region, 0))
+    logs = get_client(session, "logs", region)
+    newest = watermark
+    count = 0
+    for page in logs.get_paginator("filter_log_events").paginate(logGroupName=log_group_name, startTime=watermark + 1):
+        for event in page["events"]:
+            loader.add((
+                log_group_name,
+                event["logStreamName"],
+                datetime.datetime.fromtimestamp(event["timestamp"] / 1000, tz=datetime.timezone.utc),
+                event["message"],
+            ))
+            newest = max(newest, event["timestamp"])
+            count += 1
+    loader.flush()
+    if newest > watermark:
+        store.set(collector, region, newest)
+    return count
+
+
+def hot_path_value(document, path):
+    """Follow a HOT_JSON_PATHS path into a parsed JSON document, or None if any step is missing."""
+    for key in path:
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+    if isinstance(document, (dict, list)):
+        return json.dumps(document)
+    return document
+
+
+def config_item_row(item, region):
+    """Map an AWS Config advanced-query result to an aws_config_resources row, sidecar columns included."""
+    configuration = item.get("configuration") or {}
+    tags = {tag["key"]: tag["value"] for tag in item.get("tags") or []}
+    documents = {"configuration": configuration, "tags": tags}
+    return (
+        item.get("resourceId"),
+        item.get("resourceType"),
+        item.get("awsRegion", region),
+        json.dumps(configuration),
+        json.dumps(tags),
+        item.get("configurationItemCaptureTime"),
+        item.get("configurationItemStatus"),
+    ) + tuple(hot_path_value(documents[spec["source"]], spec["path"]) for spec in HOT_JSON_PATHS.values())
+
+
+def collect_new_config_items(session, region, loader, store=None):
+    """Append Config configuration items captured since the last run into aws_config_resources."""
+    store = store or get_watermark_store()
+    collector = "aws_config_resources"
+    watermark = store.get(collector, region, "1970-01-01T00:00:00.000Z")
+    config = get_client(session, "config", region)
+    newest = watermark
+    count = 0
+    paginator = config.get_paginator("select_resource_config")
+    for page in paginator.paginate(Expression=CONFIG_SELECT_EXPRESSION.format(watermark=watermark)):
+        for result in page["Results"]:
+            item = json.loads(result)
+            loader.add(config_item_row(item, region))
+            newest = max(newest, item.get("configurationItemCaptureTime", ""))
+            count += 1
+    loader.flush()
+    if newest > watermark:
+        store.set(collector, region, newest)
+    return count
@@ -0,0 +1,264 @@
+import calendar
+import datetime
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+from schema_provider import get_schema_provider
+from translation_cache import normalize_question
+
+# Words that carry no meaning for the shapes below; anything else left over blocks a match.
+FILLER_WORDS = {
+    "the", "all", "our", "my", "me", "please", "any", "aws", "do", "did", "does", "we", "have", "has",
+    "are", "is", "was", "were", "there", "exist", "currently", "existing", "of", "a", "an",
+}
+# Names people use that cannot be derived from the stored values.
+RESOURCE_ALIASES = {
+    "AWS::EC2::Instance": ["server", "virtual machine", "vm"],
+    "AWS::EC2::Volume": ["ebs volume", "disk"],
+    "AWS::EC2::VPC": ["network"],
+    "AWS::Lambda::Function": ["lambda"],
+    "AWS::S3::Bucket": ["s3"],
+}
+SERVICE_ALIASES = {
+    "elasticloadbalancing": ["elb", "load balancing", "load balancer"],
+    "cloudwatch": ["cloud watch"],
+    "datatransfer": ["data transfer"],
+}
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+
+_PERIOD = (
+    r"(?P<period>(?:" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")(?: \d{4})?"
+    r"|\d{4}-\d{2}|\d{4}|last month|this month|last year|this year)"
+)
+_IN_PERIOD = rf"(?:(?: in| for| during| over)? {_PERIOD})?"
+_IN_REGION = r"(?: in {region})?"
+_COST = r"(?:cost|costs|spend|spent|spending|bill|billing)"
+
+# (intent, grammar); {resource}, {region}, {cost_service} and {quota_service} match dictionary entries.
+INTENT_GRAMMAR = [
+    ("count_resources_by_region",
+     r"^(?:how many|count|number|total) {resource} (?:per|by|in each|for each|each) region$"),
+    ("count_resources_by_region", r"^{resource} (?:count )?(?:per|by) region$"),
+    ("count_resources", rf"^(?:how many|count|number|total) {{resource}}{_IN_REGION}$"),
+    ("list_resources", rf"^(?:list|show|display|get|which|what) {{resource}}{_IN_REGION}$"),
+    ("list_resources", r"^{resource} in {region}$"),
+    ("cost_by_service",
+     rf"^(?:(?:what|how much|show|list) )?{_COST}(?: broken down)? (?:by|per|for each) service{_IN_PERIOD}$"),
+    ("cost_by_service", rf"^{_PERIOD} {_COST} (?:by|per) service$"),
+    ("cost_by_service", rf"^(?:which|what) services? cost most{_IN_PERIOD}$"),
+    ("service_cost", rf"^(?:(?:what|how much|show) )?{_COST}(?: on| for)? {{cost_service}}{_IN_PERIOD}$"),
+    ("service_cost", rf"^(?:(?:what|how much|show) )?{{cost_service}} {_COST}{_IN_PERIOD}$"),
+    # Usage is not collected (quota_details.used is NULL), so usage/utilization questions go to the model.
+    ("quota_limits", r"^(?:(?:show|list|what) )?(?:service )?quotas? (?:for|on) {quota_service}" + _IN_REGION + "$"),
+    ("quota_limits", r"^(?:(?:show|list|what) )?{quota_service} (?:service )?quotas?" + _IN_REGION + "$"),
+]
+
+RoutedQuery = namedtuple("RoutedQuery", ["intent", "sql", "params"])
+
+
+def sql_literal(value):
+    """Quote a dictionary value for a SQL template."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def split_words(name):
+    """'SecurityGroup' -> 'security group', 'DBInstance' -> 'db instance'."""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", " ", name).lower()
+
+
+def plural(phrase):
+    if re.search(r"(?:s|x|sh|ch)$", phrase):
+        return phrase + "es"
+    if re.search(r"[^aeiou]y$", phrase):
+        return phrase[:-1] + "ies"
+    return phrase + "s"
+
+
+def resource_type_aliases(resource_type):
+    """Phrases naming a Config resource type, e.g. AWS::EC2::SecurityGroup -> 'ec2 security groups'."""
+    parts = resource_type.split("::")
+    if len(parts) != 3:
+        return []
+    service, name = parts[1].lower(), split_words(parts[2])
+    phrases = [name, f"{service} {name}"] + RESOURCE_ALIASES.get(resource_type, [])
+    return [form for phrase in phrases for form in (phrase, plural(phrase))]
+
+
+def service_aliases(service):
+    """Phrases naming a service code, e.g. AmazonEC2 -> 'ec2', AWSLambda -> 'lambda'."""
+    short = re.sub(r"^(?:amazon|aws)", "", service.lower()) or service.lower()
+    return [service.lower(), short] + SERVICE_ALIASES.get(short, [])
+
+
+def alias_table(values, aliases_for):
+    """Map every alias to its value, dropping aliases that name more than one value."""
+    owners = {}
+    for value in values:
+        for alias in aliases_for(value):
+            owners.setdefault(alias, set()).add(value)
+    return {alias: next(iter(named)) for alias, named in owners.items() if len(named) == 1}
+
+
+def resolve_period(period, today):
+    """Turn a period phrase into the time_period prefix it covers ('2026-08', '2026')."""
+    if period in ("this month", "last month"):
+        month = today.replace(day=1)
+        if period == "last month":
+            month = (month - datetime.timedelta(days=1)).replace(day=1)
+        return month.strftime("%Y-%m")
+    if period in ("this year", "last year"):
+        return str(today.year - (period == "last year"))
+    if re.fullmatch(r"\d{4}(?:-\d{2})?", period):
+        return period
+    name, _, year = period.partition(" ")
+    month = MONTHS[name]
+    # A bare month name means its most recent occurrence.
+    year = int(year) if year else today.year - (month > today.month)
+    return f"{year:04d}-{month:02d}"
+
+
+def build_dictionaries(snapshot):
+    """Regions, resource types and service codes present in the data, from the schema snapshot's statistics."""
+    return {
+        "region": sorted(set(snapshot.values("aws_config_resources_latest", "region"))
+                         | set(snapshot.values("quota_details", "region"))),
+        "resource": snapshot.values("aws_config_resources_latest", "resource_type"),
+        "cost_service": snapshot.values("cost_usage_reports", "service"),
+        "quota_service": snapshot.values("quota_details", "service"),
+    }
+
+
+class IntentRouter:
+    """Matches a question against INTENT_GRAMMAR and renders the intent's SQL template.
+
+    Entity slots only accept values found in the data, and the whole question (minus filler
+    words) must match, so a question with an extra condition falls through to the model.
+    """
+
+    def __init__(self, dictionaries, grammar=INTENT_GRAMMAR):
+        self.aliases = {
+            "region": alias_table(dictionaries.get("region", []), lambda region: [region, region.replace("-", " ")]),
+            "resource": alias_table(dictionaries.get("resource", []), resource_type_aliases),
+            "cost_service": alias_table(dictionaries.get("cost_service", []), service_aliases),
+            "quota_service": alias_table(dictionaries.get("quota_service", []), service_aliases),
+        }
+        self.patterns = []
+        for intent, rule in grammar:
+            for slot, aliases in self.aliases.items():
+                # Longest alias first, so "ec2 instances" wins over "ec2 instance"; nothing matches an empty slot.
+                choices = "|".join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True)) or "(?!)"
+                rule = rule.replace(f"{{{slot}}}", f"(?P<{slot}>{choices})")
+            self.patterns.append((intent, re.compile(rule)))
+
+    def route(self, question, today=None):
+        """Return a RoutedQuery for the question, or None if no intent matches it completely."""
+        words = re.findall(r"[a-z0-9][a-z0-9.\-]*", normalize_question(question).replace("?", " "))
+        text = " ".join(word.strip(".") for word in words if word not in FILLER_WORDS)
+        for intent, pattern in self.patterns:
+            match = pattern.match(text)
+            if match is not None:
+                params = {slot: self.aliases[slot][value] if slot in self.aliases else value
+                          for slot, value in match.groupdict().items() if value is not None}
+                if "period" in params:
+                    params["period"] = resolve_period(params["period"], today or datetime.date.today())
+                return RoutedQuery(intent, render_template(intent, params), params)
+        return None
+
+
+def render_template(intent, params):
+    """SQL for an intent; plain SELECTs every backend dialect accepts."""
+    filters = []
+    if "resource" in params:
+        filters.append(f"resource_type = {sql_literal(params['resource'])}")
+    if "cost_service" in params or "quota_service" in params:
+        filters.append(f"service = {sql_literal(params.get('cost_service') or params.get('quota_service'))}")
+    if "region" in params:
+        filters.append(f"region = {sql_literal(params['region'])}")
+    if "period" in params:
+        filters.append(f"time_period LIKE {sql_literal(params['period'] + '%')}")
+    where = " WHERE " + " AND ".join(filters) if filters else ""
+
+    if intent == "list_resources":
+        columns = "resource_id, region, tag_env, tag_team, capture_time"
+        if params["resource"] == "AWS::EC2::Instance":
+            columns = "resource_id, region, instance_type, instance_state, tag_env, tag_team"
+        return f"SELECT {columns} FROM aws_config_resources_latest{where} ORDER BY region, resource_id"
+    if intent == "count_resources":
+        return f"SELECT COUNT(*) AS resources FROM aws_config_resources_latest{where}"
+    if intent == "count_resources_by_region":
+        return (f"SELECT region, COUNT(*) AS resources FROM aws_config_resources_latest{where} "
+                "GROUP BY region ORDER BY region")
+    if intent in ("cost_by_service", "service_cost"):
+        return (f"SELECT service, SUM(cost) AS total_cost, SUM(usage) AS total_usage FROM cost_usage_reports{where} "
+                "GROUP BY service ORDER BY total_cost DESC")
+    if intent == "quota_limits":
+        return f"SELECT quota_name, region, quota_value, unit FROM quota_details{where} ORDER BY quota_name, region"
+    raise ValueError(f"No SQL template for intent {intent!r}")
+
+
+class RouterService:
+    """Shares one IntentRouter, rebuilt whenever the schema provider has a newer snapshot of the data.
+
+    Also counts matches per intent so the match rate can be reported.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider
+        self._router = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._routing_seconds = 0.0
+
+    def router(self):
+        snapshot = (self.provider or get_schema_provider()).snapshot()
+        with self._lock:
+            if snapshot is self._snapshot:
+                return self._router
+        # Compiling the grammar takes a few milliseconds, once per snapshot.
+        router = IntentRouter(build_dictionaries(snapshot))
+        with self._lock:
+            self._router, self._snapshot = router, snapshot
+        return router
+
+    def route(self, question):
+        router = self.router()
+        started = time.perf_counter()
+        routed = router.route(question)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats[routed.intent if routed else "none"] += 1
+            self._routing_seconds += elapsed
+        return routed
+
+    def stats(self):
+        """Questions per intent ("none" fell through to the model), match rate and mean routing time."""
+        with self._lock:
+            stats = dict(self._stats)
+            seconds = self._routing_seconds
+        total = sum(stats.values())
+        matched = total - stats.get("none", 0)
+        return {
+            "intents": stats,
+            "match_rate": matched / total if total else 0.0,
+            "mean_routing_ms": seconds * 1000 / total if total else 0.0,
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_intent_router():
+    """Return the process-wide router service, or None if disabled via INTENT_ROUTER_ENABLED=0."""
+    global _service
+    if os.getenv("INTENT_ROUTER_ENABLED", "1") == "0":
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = RouterService()
+        return _service
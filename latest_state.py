@@ -0,0 +1,90 @@
+import datetime
+import logging
+import os
+import time
+
+from aws_config_schema_design import HOT_JSON_PATHS, hot_path_backfill_sql, hot_path_unextracted_sql
+from query_backends import get_query_backend
+from watermark_store import get_watermark_store
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = "aws_config_resources"
+LATEST_TABLE = "aws_config_resources_latest"
+LATEST_COLUMNS = ["resource_id", "resource_type", "region", "configuration", "tags", "capture_time"] + list(HOT_JSON_PATHS)
+
+# Firehose batches can land after newer rows from another region, so each refresh re-reads a
+# short window before the watermark. Re-merging a capture is a no-op.
+DEFAULT_REFRESH_LOOKBACK_SECONDS = int(os.getenv("LATEST_REFRESH_LOOKBACK_SECONDS", 3600))
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+_COLUMNS = ", ".join(LATEST_COLUMNS)
+
+
+def merge_new_captures(cur, since, dialect="redshift"):
+    """Fold captures newer than since into the latest table on an open cursor.
+
+    The newest capture per resource replaces an older latest row; a capture whose status column
+    is ResourceDeleted removes it. Returns (captures merged, resources deleted, newest capture_time).
+    """
+    since_sql = f"'{since.isoformat(sep=' ')}'"
+    # Rows streamed in by Firehose arrive without their typed sidecar columns; fill each row once.
+    cur.execute(hot_path_backfill_sql(
+        HISTORY_TABLE, f"capture_time > {since_sql} AND {hot_path_unextracted_sql(dialect)}", dialect))
+    cur.execute(f"""
+        CREATE TEMP TABLE new_captures AS
+        SELECT {_COLUMNS}, status
+        FROM (
+            SELECT {_COLUMNS}, status, ROW_NUMBER() OVER (PARTITION BY resource_id ORDER BY capture_time DESC) AS capture_rank
+            FROM {HISTORY_TABLE}
+            WHERE capture_time > {since_sql}
+        ) AS captures
+        WHERE capture_rank = 1
+    """)
+    cur.execute(f"""
+        DELETE FROM {LATEST_TABLE}
+        WHERE EXISTS (
+            SELECT 1 FROM new_captures
+            WHERE new_captures.resource_id = {LATEST_TABLE}.resource_id
+              AND new_captures.capture_time >= {LATEST_TABLE}.capture_time
+        )
+    """)
+    cur.execute(f"""
+        INSERT INTO {LATEST_TABLE} ({_COLUMNS})
+        SELECT {_COLUMNS} FROM new_captures
+        WHERE COALESCE(status, '') <> 'ResourceDeleted'
+          AND NOT EXISTS (SELECT 1 FROM {LATEST_TABLE} AS latest WHERE latest.resource_id = new_captures.resource_id)
+    """)
+    cur.execute("""
+        SELECT COUNT(*), SUM(CASE WHEN status = 'ResourceDeleted' THEN 1 ELSE 0 END), MAX(capture_time)
+        FROM new_captures
+    """)
+    merged, deleted, newest = cur.fetchone()
+    cur.execute("DROP TABLE new_captures")
+    return merged, deleted or 0, newest
+
+
+def refresh_latest_resources(store=None, lookback_seconds=DEFAULT_REFRESH_LOOKBACK_SECONDS):
+    """Incrementally refresh aws_config_resources_latest from captures since the last refresh."""
+    started = time.perf_counter()
+    store = store or get_watermark_store()
+    watermark = store.get(LATEST_TABLE, "all")
+    since = EPOCH
+    if watermark:
+        since = datetime.datetime.fromisoformat(watermark) - datetime.timedelta(seconds=lookback_seconds)
+
+    backend = get_query_backend()
+    with backend.maintenance_connection() as conn:
+        with conn.cursor() as cur:
+            merged, deleted, newest = merge_new_captures(cur, since, backend.dialect)
+    if newest is not None and (not watermark or str(newest) > watermark):
+        store.set(LATEST_TABLE, "all", str(newest))
+
+    stats = {"captures": merged, "deleted": deleted, "seconds": time.perf_counter() - started}
+    logger.info("Refreshed %s: %s resources changed, %s deleted in %.1fs", LATEST_TABLE, merged, deleted, stats['seconds'])
+    return stats
+
+
+if __name__ == "__main__":
+    refresh_latest_resources()
@@ -1,5 +1,50 @@
-from aws_config_pipeline import setup_aws_config_pipeline
-from nl_query_agent import process_user_query
+import getpass
+import logging
+import os
+
+from aws_config_pipeline import setup_aws_config_pipeline, start_pipeline_setup
+from natural_language_query_agent import process_user_query, process_user_query_stream
+from query_scheduler import QueryCancelled, QueryContext, QueueTimeout
+from sql_guardrail import QueryRejected
+
+# Print answers as the model generates them (0 waits for the whole answer)
+ANSWER_STREAMING = os.getenv("ANSWER_STREAMING", "1") != "0"
+
+# Set up the pipeline while the REPL already answers questions (0 waits for setup first)
+PIPELINE_SETUP_BACKGROUND = os.getenv("PIPELINE_SETUP_BACKGROUND", "1") != "0"
+
+# Where background setup logs its progress, so it does not interleave with answers in the REPL
+PIPELINE_SETUP_LOG = os.getenv("PIPELINE_SETUP_LOG", ".pipeline_setup.log")
+
+logger = logging.getLogger(__name__)
+
+def print_answer(user_query):
+    """Answer a question, streaming the text to the terminal; Ctrl-C abandons just this answer."""
+    print("\nAnswer:")
+    # REPL questions are interactive: they go ahead of batch queries in the warehouse queue.
+    with QueryContext(getpass.getuser(), "interactive") as context:
+        try:
+            if ANSWER_STREAMING:
+                for text in process_user_query_stream(user_query):
+                    print(text, end="", flush=True)
+                print()
+            else:
+                print(process_user_query(user_query))
+        except (KeyboardInterrupt, QueryCancelled):
+            context.cancel()
+            print("\n[cancelled]")
+        except QueueTimeout as e:
+            print(f"\n[warehouse busy: {e}]")
+        except QueryRejected as e:
+            print(f"\n[query rejected: {e.reason}]")
+        except Exception as e:
+            # A database error once repairs ran out, or a model/API failure: keep the REPL running.
+            print(f"\n[error: {e}]")
+
+def report_setup_failure(setup):
+    """Surface an exception from background pipeline setup instead of losing it."""
+    if setup.exception() is not None:
+        logger.error("Pipeline setup failed: %s", setup.exception(), exc_info=setup.exception())
 
 def main():
     # Set up the AWS Config pipeline
@@ -11,16 +56,23 @@ def main():
     redshift_username = 'your_redshift_username'
     redshift_password = 'your_redshift_password'
 
-    setup_aws_config_pipeline(regions, bucket_name, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password)
+    setup_args = (regions, bucket_name, firehose_name, redshift_cluster_jdbc_url, redshift_table_name, redshift_username, redshift_password)
+    if PIPELINE_SETUP_BACKGROUND:
+        logging.basicConfig(filename=PIPELINE_SETUP_LOG, level=logging.INFO,
+                            format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        print(f"Setting up the pipeline in the background; progress is logged to {PIPELINE_SETUP_LOG}")
+        # Converged steps are skipped, so this is usually quick; queries run against existing data meanwhile
+        start_pipeline_setup(*setup_args).add_done_callback(report_setup_failure)
+    else:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        setup_aws_config_pipeline(*setup_args)
 
     # Process user queries
     while True:
         user_query = input("Enter your query about AWS resources (or 'quit' to exit): ")
         if user_query.lower() == 'quit':
             break
-        result = process_user_query(user_query)
-        print("\nAnswer:")
-        print(result)
+        print_answer(user_query)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
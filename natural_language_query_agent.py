@@ -1,77 +1,113 @@
+import asyncio
+import contextvars
+import functools
 import openai
-import psycopg2
 import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from answer_renderer import QueryResult, get_answer_cache, render_local_answer
+from aws_config_schema_design import schema_guidance
+from intent_router import get_intent_router
+from query_backends import dialect_note, get_query_backend, stream_query
+from query_scheduler import query_context
+from query_tracing import llm_usage, mark_first_token, span, trace_query
+from result_formatter import RowCapture, encode_results
+from schema_provider import get_schema_provider
+from sql_examples import few_shot_prompt, get_example_store
+from sql_guardrail import QueryRejected, guard_sql
+from translation_cache import get_translation_cache
+
 # Load environment variables
 load_dotenv()
 
 # Set up OpenAI API key
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Concurrency limits for the async engine, per backend
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", 4))
+
+# Number of most relevant tables to include in the SQL prompt (0 sends the full schema)
+SCHEMA_TOP_K_TABLES = int(os.getenv("SCHEMA_TOP_K_TABLES", 2))
+
+# Times a failing query is sent back to the model with its error before giving up
+SQL_REPAIR_ATTEMPTS = int(os.getenv("SQL_REPAIR_ATTEMPTS", 2))
+
+# Verified question/SQL examples shown in the SQL prompt (0 disables them)
+SQL_FEW_SHOT_EXAMPLES = int(os.getenv("SQL_FEW_SHOT_EXAMPLES", 3))
+
+# Small results are answered from their rows without the answer model (0 always asks the model)
+LOCAL_ANSWERS_ENABLED = os.getenv("LOCAL_ANSWERS_ENABLED", "1") != "0"
+LOCAL_ANSWER_SCAN_ROWS = int(os.getenv("LOCAL_ANSWER_SCAN_ROWS", 200))
+LOCAL_ANSWER_MAX_ROWS = int(os.getenv("LOCAL_ANSWER_MAX_ROWS", 20))
+
 def get_database_schema():
-    """Retrieve the database schema."""
-    return """
-    CREATE TABLE aws_config_resources (
-        resource_id VARCHAR(255),
-        resource_type VARCHAR(50),
-        region VARCHAR(20),
-        configuration JSON,
-        tags JSON,
-        capture_time TIMESTAMP
-    );
-
-    CREATE TABLE cloudwatch_logs (
-        log_group VARCHAR(255),
-        log_stream VARCHAR(255),
-        timestamp TIMESTAMP,
-        message TEXT
-    );
-
-    CREATE TABLE ami_details (
-        ami_id VARCHAR(255),
-        name VARCHAR(255),
-        description TEXT,
-        creation_date TIMESTAMP,
-        owner_id VARCHAR(255)
-    );
-
-    CREATE TABLE quota_details (
-        service VARCHAR(255),
-        quota_name VARCHAR(255),
-        quota_value FLOAT,
-        used FLOAT,
-        unit VARCHAR(50)
-    );
-
-    CREATE TABLE service_limits (
-        service VARCHAR(255),
-        limit_name VARCHAR(255),
-        limit_value FLOAT,
-        unit VARCHAR(50)
-    );
-
-    CREATE TABLE cost_usage_reports (
-        time_period VARCHAR(50),
-        service VARCHAR(255),
-        cost FLOAT,
-        usage FLOAT,
-        unit VARCHAR(50)
-    );
-    """
+    """Retrieve the database schema, introspected from the live tables, with column value hints."""
+    return get_schema_provider().snapshot().render()
+
+def get_prompt_schema(user_query):
+    """Return the schema for the SQL prompt, pruned to the tables relevant to the question."""
+    with span("schema"):
+        if SCHEMA_TOP_K_TABLES <= 0:
+            return dialect_note() + get_database_schema()
+        snapshot = get_schema_provider().snapshot()
+        return dialect_note() + snapshot.render(snapshot.select(user_query, SCHEMA_TOP_K_TABLES))
+
+def route_intent(user_query):
+    """SQL from a template when the question has a known shape, or None to ask the model."""
+    router = get_intent_router()
+    if router is None:
+        return None
+    with span("route_intent") as stage:
+        routed = router.route(user_query)
+        stage.set(intent=routed.intent if routed else "none")
+        return routed.sql if routed else None
 
 def generate_sql_query(user_query, schema):
-    """Generate SQL query from natural language using GPT-3.5."""
+    """Generate SQL query from natural language using GPT-3.5, reusing cached translations.
+
+    Questions the intent router recognises are answered from its SQL templates without a model call.
+    """
+    routed_sql = route_intent(user_query)
+    if routed_sql is not None:
+        return routed_sql
+    with span("generate_sql") as stage:
+        return _generate_sql_query(user_query, schema, stage)
+
+def _generate_sql_query(user_query, schema, stage):
+    """Cache lookup and model call behind generate_sql_query, recorded on its span."""
+    cache = get_translation_cache()
+    if cache is not None:
+        cached_sql = cache.get(user_query, schema)
+        if cached_sql is not None:
+            stage.set(cached=True)
+            return cached_sql
+
     prompt = f"""
     You are an AI assistant that translates natural language queries about AWS resources into SQL queries.
     The database schema is as follows:
     {schema}
+    {schema_guidance(schema)}
+    {similar_examples_prompt(user_query, stage)}
 
     User query: {user_query}
 
     Translate the above query into a SQL query that can be executed on the given schema.
     """
 
+    started = time.perf_counter()
+    sql_query = _complete_sql(prompt, stage)
+
+    if cache is not None:
+        cache.put(user_query, schema, sql_query, time.perf_counter() - started)
+    return sql_query
+
+def _complete_sql(prompt, stage):
+    """Ask the model for SQL, recording token usage on the span."""
     response = openai.Completion.create(
         engine="text-davinci-002",
         prompt=prompt,
@@ -80,29 +116,84 @@ def generate_sql_query(user_query, schema):
         stop=None,
         temperature=0.7,
     )
+    sql_query = response.choices[0].text.strip()
+    if stage.recording:
+        stage.set(**llm_usage(response, prompt, sql_query))
+    return sql_query
 
-    return response.choices[0].text.strip()
+def similar_examples_prompt(user_query, stage):
+    """Verified examples closest to the question, rendered for the SQL prompt."""
+    store = get_example_store()
+    if store is None or SQL_FEW_SHOT_EXAMPLES <= 0:
+        return ""
+    examples = store.nearest(user_query, get_query_backend().dialect, k=SQL_FEW_SHOT_EXAMPLES)
+    stage.set(examples=len(examples))
+    return few_shot_prompt(examples)
+
+def repair_sql_query(user_query, schema, failed_sql, error):
+    """Ask the model to fix SQL that the guardrail or the database rejected, given the error."""
+    with span("repair_sql") as stage:
+        prompt = f"""
+    You are an AI assistant that translates natural language queries about AWS resources into SQL queries.
+    The database schema is as follows:
+    {schema}
+    {schema_guidance(schema)}
+
+    User query: {user_query}
+
+    This SQL query was written for the question above but failed:
+    {failed_sql}
+
+    Error: {' '.join(str(error).split())}
+
+    Return a corrected SQL query that can be executed on the given schema.
+    """
+        return _complete_sql(prompt, stage)
+
+def forget_translation(user_query, schema):
+    """Drop a cached translation that turned out not to work."""
+    cache = get_translation_cache()
+    if cache is not None:
+        cache.invalidate(user_query, schema)
+
+def remember_verified_sql(user_query, schema, sql_query, result, repair_seconds=None):
+    """Keep SQL that returned rows as a few-shot example, and cache it if it was repaired.
+
+    Running without an error is not enough: a query that finds nothing is more likely wrong than verified.
+    """
+    store = get_example_store()
+    if store is not None and result.rows != []:
+        store.add(user_query, sql_query, get_query_backend().dialect)
+    cache = get_translation_cache()
+    if cache is not None and repair_seconds is not None:
+        cache.put(user_query, schema, sql_query, repair_seconds)
+
+def check_generated_sql(user_query, schema, sql_query):
+    """Run generated SQL through the guardrail, forgetting cached translations it rejects."""
+    try:
+        with span("guard_sql"):
+            return guard_sql(sql_query, user_query)
+    except QueryRejected:
+        forget_translation(user_query, schema)
+        raise
 
 def execute_query(sql_query):
-    """Execute the SQL query on the Redshift database."""
-    conn = psycopg2.connect(
-        dbname=os.getenv("REDSHIFT_DB"),
-        user=os.getenv("REDSHIFT_USER"),
-        password=os.getenv("REDSHIFT_PASSWORD"),
-        host=os.getenv("REDSHIFT_HOST"),
-        port=os.getenv("REDSHIFT_PORT")
-    )
-    
-    with conn.cursor() as cur:
-        cur.execute(sql_query)
-        results = cur.fetchall()
-    
-    conn.close()
-    return results
+    """Execute the SQL query on the configured backend (Redshift, or an embedded DuckDB/SQLite)."""
+    with span("execute_query") as stage:
+        rows = get_query_backend().execute(sql_query)
+        stage.set(rows=len(rows))
+        return rows
 
 def format_data_for_gemini(raw_data):
-    """Format the raw data for Gemini input."""
-    return "\n".join([str(row) for row in raw_data])
+    """Format the raw data for Gemini input, as compact CSV within a token budget."""
+    with span("format_results") as stage:
+        formatted_data = encode_results(raw_data)
+        if stage.recording:
+            stage.set(bytes=len(formatted_data.encode("utf-8")))
+            # Streamed rows are fetched while they are formatted; report that time separately.
+            if hasattr(raw_data, "fetch_seconds"):
+                stage.split("execute_query", raw_data.fetch_seconds, rows=raw_data.row_count)
+        return formatted_data
 
 def generate_gemini_prompt(user_query, formatted_data):
     """Generate a prompt for Gemini based on the user query and formatted data."""
@@ -117,25 +208,278 @@ def generate_gemini_prompt(user_query, formatted_data):
 
 def query_gemini(gemini_prompt):
     """Send a prompt to Gemini and get the response."""
-    response = openai.Completion.create(
-        engine="text-davinci-002",  # Replace with actual Gemini model when available
-        prompt=gemini_prompt,
-        max_tokens=300,
-        n=1,
-        stop=None,
-        temperature=0.7,
-    )
-    return response.choices[0].text.strip()
+    with span("answer") as stage:
+        response = openai.Completion.create(
+            engine="text-davinci-002",  # Replace with actual Gemini model when available
+            prompt=gemini_prompt,
+            max_tokens=300,
+            n=1,
+            stop=None,
+            temperature=0.7,
+        )
+        answer = response.choices[0].text.strip()
+        if stage.recording:
+            stage.set(**llm_usage(response, gemini_prompt, answer))
+        return answer
+
+def stream_gemini_answer(gemini_prompt):
+    """Send a prompt to Gemini and yield the answer's text as it is generated.
+
+    Closing the generator (or a KeyboardInterrupt while it waits) aborts the request.
+    """
+    with span("answer") as stage:
+        started = time.perf_counter()
+        response = openai.Completion.create(
+            engine="text-davinci-002",  # Replace with actual Gemini model when available
+            prompt=gemini_prompt,
+            max_tokens=300,
+            n=1,
+            stop=None,
+            temperature=0.7,
+            stream=True,
+        )
+        pieces = []
+        try:
+            for chunk in response:
+                text = chunk.choices[0].text
+                if not pieces:
+                    # Match query_gemini, which strips the completion's leading newlines.
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                    stage.set(ttft_ms=round((time.perf_counter() - started) * 1000, 3))
+                    mark_first_token()
+                pieces.append(text)
+                yield text
+        finally:
+            # Stop reading the HTTP stream instead of draining it in the background.
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+            if stage.recording:
+                stage.set(streamed=True, **llm_usage(None, gemini_prompt, "".join(pieces)))
+
+def fetch_and_format(guarded):
+    """Run guarded SQL (a GuardedSQL) and format its rows; both must happen on the thread holding the cursor.
+
+    Returns a QueryResult, which keeps the rows of small results for local rendering.
+    """
+    # Count every matching row, not just the ones under a LIMIT the guardrail added or lowered.
+    stream = stream_query(guarded.sql, count_sql=guarded.count_sql, row_limit=guarded.row_limit)
+    raw_data = RowCapture(stream, LOCAL_ANSWER_SCAN_ROWS)
+    formatted_data = format_data_for_gemini(raw_data)
+    return QueryResult(guarded.sql, getattr(raw_data, "columns", None), raw_data.head if raw_data.complete else None, formatted_data)
+
+def guard_and_fetch(user_query, schema, sql_query):
+    """Run generated SQL through the guardrail, then run it and format its rows."""
+    return fetch_and_format(check_generated_sql(user_query, schema, sql_query))
+
+def repair_steps(user_query, schema, sql_query):
+    """The guard/run/repair loop, as a generator that leaves running each blocking call to its driver.
+
+    Yields (backend, func, args): backend is "db" for guarding and running SQL, "llm" for repairs,
+    and None for local cache bookkeeping. The driver sends back each call's result or throws its
+    error in. Returns the QueryResult; the last QueryRejected or database error propagates once
+    SQL_REPAIR_ATTEMPTS repairs have failed.
+    """
+    database_error = get_query_backend().Error
+    repair_seconds = None
+    for attempt in range(SQL_REPAIR_ATTEMPTS + 1):
+        try:
+            result = yield "db", guard_and_fetch, (user_query, schema, sql_query)
+        except (QueryRejected, database_error) as e:
+            yield None, forget_translation, (user_query, schema)
+            if attempt == SQL_REPAIR_ATTEMPTS:
+                raise
+            started = time.perf_counter()
+            sql_query = yield "llm", repair_sql_query, (user_query, schema, sql_query, e)
+            repair_seconds = (repair_seconds or 0.0) + time.perf_counter() - started
+            continue
+        yield None, remember_verified_sql, (user_query, schema, sql_query, result, repair_seconds)
+        return result
+
+class RepairLoop:
+    """Steps through repair_steps: advance() takes the last step's outcome and returns the next step or None."""
+
+    def __init__(self, user_query, schema, sql_query):
+        self._steps = repair_steps(user_query, schema, sql_query)
+        self.result = None
+
+    def advance(self, reply=None, error=None):
+        try:
+            return self._steps.throw(error) if error is not None else self._steps.send(reply)
+        except StopIteration as done:
+            self.result = done.value
+            return None
+
+def fetch_with_repair(user_query, schema, sql_query):
+    """Guard, run and format generated SQL, sending errors back to the model up to SQL_REPAIR_ATTEMPTS times.
+
+    Returns the QueryResult. Raises the last QueryRejected or database error once attempts run out.
+    """
+    repairs = RepairLoop(user_query, schema, sql_query)
+    step = repairs.advance()
+    while step is not None:
+        _backend, func, args = step
+        try:
+            reply = func(*args)
+        except Exception as e:
+            step = repairs.advance(error=e)
+        else:
+            step = repairs.advance(reply)
+    return repairs.result
+
+def answer_without_model(user_query, result):
+    """Render small results locally, or reuse the answer given for the same question, SQL and data; None otherwise."""
+    with span("render_answer") as stage:
+        if LOCAL_ANSWERS_ENABLED:
+            answer = render_local_answer(user_query, result, max_rows=LOCAL_ANSWER_MAX_ROWS)
+            if answer is not None:
+                stage.set(source="local")
+                return answer
+        cache = get_answer_cache()
+        answer = cache.get(user_query, result.sql, result.formatted) if cache is not None else None
+        stage.set(source="cache" if answer is not None else "model")
+        return answer
+
+def remember_answer(user_query, result, answer):
+    """Keep the model's answer for the next time this question's SQL returns the same data."""
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.put(user_query, result.sql, result.formatted, answer)
 
 def process_user_query(user_query):
     """Process a user query using SQL generation, data retrieval, and Gemini for final answer."""
-    schema = get_database_schema()
-    sql_query = generate_sql_query(user_query, schema)
-    raw_data = execute_query(sql_query)
-    formatted_data = format_data_for_gemini(raw_data)
-    gemini_prompt = generate_gemini_prompt(user_query, formatted_data)
-    final_answer = query_gemini(gemini_prompt)
-    return final_answer
+    with trace_query(user_query):
+        schema = get_prompt_schema(user_query)
+        sql_query = generate_sql_query(user_query, schema)
+        result = fetch_with_repair(user_query, schema, sql_query)
+        final_answer = answer_without_model(user_query, result)
+        if final_answer is None:
+            gemini_prompt = generate_gemini_prompt(user_query, result.formatted)
+            final_answer = query_gemini(gemini_prompt)
+            remember_answer(user_query, result, final_answer)
+        return final_answer
+
+def process_user_query_stream(user_query):
+    """Like process_user_query, but yield the answer in pieces as the model generates it."""
+    with trace_query(user_query):
+        schema = get_prompt_schema(user_query)
+        sql_query = generate_sql_query(user_query, schema)
+        result = fetch_with_repair(user_query, schema, sql_query)
+        final_answer = answer_without_model(user_query, result)
+        if final_answer is not None:
+            mark_first_token()
+            yield final_answer
+            return
+        pieces = []
+        for text in stream_gemini_answer(generate_gemini_prompt(user_query, result.formatted)):
+            pieces.append(text)
+            yield text
+        # Only reached if the caller read the whole answer; an abandoned one is not cached.
+        remember_answer(user_query, result, "".join(pieces))
+
+class BackendLimits:
+    """Per-backend semaphores bounding concurrent LLM calls and database queries."""
+
+    def __init__(self, llm_concurrency=LLM_MAX_CONCURRENCY, db_concurrency=DB_MAX_CONCURRENCY, executor=None):
+        self.llm = asyncio.Semaphore(llm_concurrency)
+        self.db = asyncio.Semaphore(db_concurrency)
+        # Sized so the semaphores, not the default executor, are what bound concurrency.
+        self.executor = executor or ThreadPoolExecutor(max_workers=llm_concurrency + db_concurrency)
+
+    async def run(self, semaphore, func, *args):
+        """Run a blocking call in the worker pool while holding one of the backend semaphores."""
+        async with semaphore:
+            return await self.offload(func, *args)
+
+    async def offload(self, func, *args):
+        """Run a blocking call in the worker pool without a backend slot, e.g. local cache I/O."""
+        loop = asyncio.get_running_loop()
+        # Carry the question's trace and query context into the worker thread.
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, func, *args))
+
+    async def run_step(self, backend, func, *args):
+        """Run one (backend, func, args) step of repair_steps under that backend's semaphore."""
+        if backend is None:
+            return await self.offload(func, *args)
+        return await self.run(self.llm if backend == "llm" else self.db, func, *args)
+
+_loop_limits = weakref.WeakKeyDictionary()
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+def _default_limits():
+    """Return the limits shared by every query running on the current event loop.
+
+    Semaphores belong to one loop, but every loop's limits share one worker pool, so repeated
+    asyncio.run() calls do not each leave a pool of idle threads behind.
+    """
+    global _shared_executor
+    loop = asyncio.get_running_loop()
+    limits = _loop_limits.get(loop)
+    if limits is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY + DB_MAX_CONCURRENCY)
+        limits = _loop_limits[loop] = BackendLimits(executor=_shared_executor)
+    return limits
+
+async def process_user_query_async(user_query, limits=None):
+    """Async variant of process_user_query; blocking stages run in worker threads under per-backend limits.
+
+    Cancelling the task cancels the question's warehouse queries, which its worker threads would otherwise finish.
+    """
+    limits = limits or _default_limits()
+    with trace_query(user_query), query_context() as context:
+        try:
+            # Schema introspection and the SQLite caches block, so even these stay off the event loop.
+            schema = await limits.offload(get_prompt_schema, user_query)
+            sql_query = await limits.run(limits.llm, generate_sql_query, user_query, schema)
+            # Repairs are model calls, so they wait for an LLM slot rather than hold a database one.
+            repairs = RepairLoop(user_query, schema, sql_query)
+            step = repairs.advance()
+            while step is not None:
+                backend, func, args = step
+                try:
+                    reply = await limits.run_step(backend, func, *args)
+                except Exception as e:
+                    step = repairs.advance(error=e)
+                else:
+                    step = repairs.advance(reply)
+            result = repairs.result
+            final_answer = await limits.offload(answer_without_model, user_query, result)
+            if final_answer is None:
+                gemini_prompt = generate_gemini_prompt(user_query, result.formatted)
+                final_answer = await limits.run(limits.llm, query_gemini, gemini_prompt)
+                await limits.offload(remember_answer, user_query, result, final_answer)
+            return final_answer
+        except asyncio.CancelledError:
+            context.cancel()
+            raise
+
+async def process_user_queries(batch, llm_concurrency=LLM_MAX_CONCURRENCY, db_concurrency=DB_MAX_CONCURRENCY):
+    """Answer a batch of questions concurrently, yielding (question, answer) pairs as each completes.
+
+    A question that fails yields its exception as the answer so the rest of the batch still completes.
+    """
+    limits = BackendLimits(llm_concurrency, db_concurrency)
+
+    async def answer(question):
+        try:
+            return question, await process_user_query_async(question, limits)
+        except Exception as e:
+            return question, e
+
+    tasks = [asyncio.ensure_future(answer(question)) for question in batch]
+    try:
+        for next_completed in asyncio.as_completed(tasks):
+            yield await next_completed
+    finally:
+        for task in tasks:
+            task.cancel()
+        limits.executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     user_query = input("Enter your query about AWS resources: ")
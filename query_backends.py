@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+from aws_config_schema_design import create_index_sql, define_extended_schema, generate_create_table_sql
+from db_pool import DEFAULT_FETCH_BATCH_SIZE, QueryStream, count_query_rows, get_connection_pool
+from db_pool import stream_query as stream_redshift_query
+from query_scheduler import scheduled_connection
+
+try:
+    import duckdb
+except ImportError:  # optional: the embedded backend falls back to SQLite
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("redshift", "duckdb", "sqlite")
+DEFAULT_DUCKDB_PATH = ".local_analytics.duckdb"
+DEFAULT_SQLITE_PATH = ".local_analytics.sqlite3"
+# Statement timeout for DDL, loads, latest-state refreshes and schema scans; 0 lets them run to completion.
+DEFAULT_MAINTENANCE_STATEMENT_TIMEOUT_MS = 0
+
+SQL_DIALECT_NAMES = {"redshift": "Amazon Redshift", "postgres": "PostgreSQL", "duckdb": "DuckDB", "sqlite": "SQLite"}
+
+# Cost and Usage Report Parquet columns rolled up into the cost_usage_reports layout.
+CUR_VIEW_SQL = """
+    CREATE OR REPLACE VIEW cost_usage_reports AS
+    SELECT
+        strftime(line_item_usage_start_date, '%Y-%m') AS time_period,
+        line_item_product_code AS service,
+        SUM(line_item_unblended_cost) AS cost,
+        SUM(line_item_usage_amount) AS usage,
+        pricing_unit AS unit
+    FROM read_parquet('{path}', union_by_name = true)
+    GROUP BY 1, 2, 5
+"""
+
+
+class _LocalCursor:
+    """DB-API cursor wrapper usable as a context manager, like psycopg2's."""
+
+    def __init__(self, cursor, owned=True):
+        self._cursor = cursor
+        self._owned = owned
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._owned:
+            self._cursor.close()
+
+
+class _LocalConnection:
+    """Connection handed out by embedded backends; cursors share its transaction."""
+
+    def __init__(self, raw, shared_cursor=False):
+        self.raw = raw
+        self._shared_cursor = shared_cursor
+
+    def cursor(self):
+        # A DuckDB connection is its own cursor; its cursor() would open a separate connection.
+        if self._shared_cursor:
+            return _LocalCursor(self.raw, owned=False)
+        return _LocalCursor(self.raw.cursor())
+
+
+class LocalQueryStream(QueryStream):
+    """QueryStream over an embedded backend's connection."""
+
+    def __init__(self, backend, sql_query, batch_size=DEFAULT_FETCH_BATCH_SIZE, count_sql=None, row_limit=None):
+        super().__init__(sql_query, batch_size=batch_size, connection=backend.connection, count_sql=count_sql,
+                         row_limit=row_limit)
+        self.backend = backend
+
+    def _generate(self):
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                started = time.perf_counter()
+                cur.execute(self.sql_query)
+                if cur.description:
+                    self.columns = [col[0] for col in cur.description]
+                while True:
+                    rows = cur.fetchmany(self.batch_size)
+                    self.fetch_seconds += time.perf_counter() - started
+                    if not rows:
+                        break
+                    for row in rows:
+                        self.row_count += 1
+                        yield row
+                    started = time.perf_counter()
+        self.exhausted = True
+
+    def total_row_count(self):
+        if self.exhausted and not self.limit_reached():
+            return self.row_count
+        self.close()
+        return self.backend.count(self.count_sql)
+
+
+class QueryBackend:
+    """Where generated SQL runs. Subclasses provide connection(); the rest is shared.
+
+    connection() is for user queries; maintenance_connection() is for the pipeline's own work.
+    """
+
+    name = None
+    dialect = None
+    placeholder = "?"
+    Error = Exception
+    # Whether EXPLAIN reports costs the guardrail can budget against.
+    supports_cost_estimates = False
+
+    @contextmanager
+    def connection(self):
+        raise NotImplementedError
+
+    def maintenance_connection(self):
+        """Connection for DDL, loads, refreshes and catalog reads; the same as connection() unless overridden."""
+        return self.connection()
+
+    def execute(self, sql_query, params=None, maintenance=False):
+        """Run a query and return all of its rows; maintenance=True for the pipeline's own queries."""
+        with (self.maintenance_connection() if maintenance else self.connection()) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql_query, params or ())
+                return cur.fetchall() if cur.description else []
+
+    def execute_script(self, sql_script):
+        """Run several ;-separated statements, e.g. schema DDL, in one transaction."""
+        with self.maintenance_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql_script)
+
+    def stream(self, sql_query, batch_size=DEFAULT_FETCH_BATCH_SIZE, count_sql=None, row_limit=None):
+        return LocalQueryStream(self, sql_query, batch_size=batch_size, count_sql=count_sql, row_limit=row_limit)
+
+    def count(self, sql_query):
+        """Count the rows a query would return without transferring them."""
+        rows = self.execute(f"SELECT COUNT(*) FROM ({sql_query.strip().rstrip(';')}) AS counted_rows")
+        return rows[0][0]
+
+    def explain(self, sql_query):
+        """Return the query plan as text."""
+        rows = self.execute(f"EXPLAIN {sql_query}")
+        return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+    def describe_columns(self, table_names):
+        """(table, column, data type) of the given tables and views as they exist, in column order."""
+        placeholders = ", ".join([self.placeholder] * len(table_names))
+        return self.execute(
+            "SELECT table_name, column_name, data_type FROM information_schema.columns "
+            f"WHERE table_schema = current_schema() AND table_name IN ({placeholders}) "
+            "ORDER BY table_name, ordinal_position",
+            list(table_names),
+            maintenance=True,
+        )
+
+    def table_version(self, table_name):
+        """A catalog statistic that changes when the table's rows do, or None if the backend keeps none."""
+        return None
+
+    def create_tables(self, schemas=None):
+        """Create the schema's tables (and indexes) if they do not exist yet."""
+        schemas = schemas or define_extended_schema()
+        tables = generate_create_table_sql(schemas, self.dialect, if_not_exists=True)
+        indexes = create_index_sql(schemas, self.dialect)
+        self.execute_script("".join(tables.values()) + "\n".join(sql for sql in indexes.values() if sql))
+
+    def close(self):
+        pass
+
+
+class RedshiftBackend(QueryBackend):
+    """The warehouse (or a Postgres stand-in) behind the shared connection pool."""
+
+    name = "redshift"
+    placeholder = "%s"
+    Error = psycopg2.Error
+    supports_cost_estimates = True
+
+    def __init__(self):
+        self.dialect = os.getenv("SCHEMA_DIALECT", "redshift")
+        self.maintenance_statement_timeout_ms = int(
+            os.getenv("REDSHIFT_MAINTENANCE_STATEMENT_TIMEOUT_MS", DEFAULT_MAINTENANCE_STATEMENT_TIMEOUT_MS))
+
+    def connection(self):
+        # User queries wait for a warehouse slot and run under their priority's statement timeout.
+        return scheduled_connection()
+
+    def maintenance_connection(self):
+        # Maintenance is not a user's query: it skips the scheduler and runs under its own statement timeout.
+        pool = get_connection_pool()
+        timeout = self.maintenance_statement_timeout_ms
+        return pool.connection(None if timeout == pool.statement_timeout_ms else timeout)
+
+    def stream(self, sql_query, batch_size=DEFAULT_FETCH_BATCH_SIZE, count_sql=None, row_limit=None):
+        # Generated queries wait for a warehouse slot and run under their priority's statement timeout.
+        # Named server-side cursors keep only one batch in memory.
+        return stream_redshift_query(sql_query, batch_size=batch_size, connection=scheduled_connection,
+                                     count_sql=count_sql, row_limit=row_limit)
+
+    def count(self, sql_query):
+        return count_query_rows(sql_query, connection=scheduled_connection)
+
+    def table_version(self, table_name):
+        # Catalog counters, so schema refreshes never scan the (streaming) tables to detect changes.
+        if self.dialect == "redshift":
+            sql = 'SELECT tbl_rows FROM svv_table_info WHERE "schema" = current_schema() AND "table" = %s'
+        else:
+            sql = ("SELECT n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables "
+                   "WHERE schemaname = current_schema() AND relname = %s")
+        rows = self.execute(sql, (table_name,), maintenance=True)
+        return rows[0][0] if rows else None
+
+
+class DuckDBBackend(QueryBackend):
+    """Embedded DuckDB database file; cost_usage_reports can be a view over CUR Parquet files."""
+
+    name = "duckdb"
+    dialect = "duckdb"
+
+    def __init__(self, path=DEFAULT_DUCKDB_PATH, cur_parquet_path=None):
+        self.path = path
+        self.cur_parquet_path = cur_parquet_path
+        self.Error = duckdb.Error
+        self._db = duckdb.connect(path)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            raw = self._db.cursor()
+        try:
+            raw.execute("BEGIN TRANSACTION")
+            yield _LocalConnection(raw, shared_cursor=True)
+            raw.execute("COMMIT")
+        except BaseException:
+            raw.execute("ROLLBACK")
+            raise
+        finally:
+            raw.close()
+
+    def create_tables(self, schemas=None):
+        schemas = dict(schemas or define_extended_schema())
+        if self.cur_parquet_path:
+            # Scan the CUR Parquet files in place instead of copying them into a table.
+            schemas.pop("cost_usage_reports", None)
+        super().create_tables(schemas)
+        if self.cur_parquet_path:
+            self.execute_script(CUR_VIEW_SQL.format(path=self.cur_parquet_path.replace("'", "''")))
+
+    def close(self):
+        self._db.close()
+
+
+def _json_extract_path_text(document, *path):
+    """Redshift's JSON_EXTRACT_PATH_TEXT for SQLite, so warehouse-style SQL runs unchanged."""
+    try:
+        value = json.loads(document) if isinstance(document, str) else document
+    except ValueError:
+        return None
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class SQLiteBackend(QueryBackend):
+    """Embedded SQLite database, the fallback when DuckDB is not installed."""
+
+    name = "sqlite"
+    dialect = "sqlite"
+    Error = sqlite3.Error
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, cur_parquet_path=None):
+        self.path = path
+        if cur_parquet_path:
+            logger.warning("SQLite cannot read Parquet; ignoring CUR_PARQUET_PATH=%s", cur_parquet_path)
+        # One connection per thread; an in-memory database is shared between them through the cache.
+        self._uri = "file:local_analytics?mode=memory&cache=shared" if path == ":memory:" else f"file:{path}"
+        self._local = threading.local()
+        self._keepalive = self._connect() if path == ":memory:" else None
+
+    def _connect(self):
+        raw = sqlite3.connect(self._uri, uri=True, timeout=30)
+        raw.create_function("JSON_EXTRACT_PATH_TEXT", -1, _json_extract_path_text)
+        return raw
+
+    @contextmanager
+    def connection(self):
+        raw = getattr(self._local, "raw", None)
+        if raw is None:
+            raw = self._local.raw = self._connect()
+        try:
+            yield _LocalConnection(raw)
+            raw.commit()
+        except BaseException:
+            raw.rollback()
+            raise
+
+    def execute_script(self, sql_script):
+        with self.connection() as conn:
+            conn.raw.executescript(sql_script)
+
+    def describe_columns(self, table_names):
+        # SQLite has no information_schema.
+        rows = []
+        for table_name in table_names:
+            rows.extend((table_name, column[1], column[2]) for column in self.execute(f"PRAGMA table_info({table_name})"))
+        return rows
+
+    def explain(self, sql_query):
+        rows = self.execute(f"EXPLAIN QUERY PLAN {sql_query}")
+        return "\n".join(str(row[-1]) for row in rows)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_query_backend(name=None):
+    """Build the backend named by QUERY_BACKEND; DuckDB falls back to SQLite when not installed."""
+    name = name or os.getenv("QUERY_BACKEND", "redshift")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend {name!r}; expected one of {BACKENDS}")
+    if name == "redshift":
+        return RedshiftBackend()
+    cur_parquet_path = os.getenv("CUR_PARQUET_PATH")
+    if name == "duckdb" and duckdb is not None:
+        backend = DuckDBBackend(os.getenv("LOCAL_DB_PATH", DEFAULT_DUCKDB_PATH), cur_parquet_path)
+    else:
+        if name == "duckdb":
+            logger.warning("duckdb is not installed; using the SQLite backend instead")
+        backend = SQLiteBackend(os.getenv("LOCAL_DB_PATH", DEFAULT_SQLITE_PATH), cur_parquet_path)
+    # Embedded databases start empty, so make sure the tables exist.
+    backend.create_tables()
+    return backend
+
+
+def get_query_backend():
+    """Return the process-wide query backend."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_query_backend()
+        return _backend
+
+
+def stream_query(sql_query, batch_size=DEFAULT_FETCH_BATCH_SIZE, count_sql=None, row_limit=None):
+    """Stream sql_query's rows from the configured backend; see QueryStream for count_sql and row_limit."""
+    return get_query_backend().stream(sql_query, batch_size=batch_size, count_sql=count_sql, row_limit=row_limit)
+
+
+def dialect_note():
+    """Schema header telling the model which SQL dialect to write."""
+    return f"-- SQL dialect: {SQL_DIALECT_NAMES[get_query_backend().dialect]}\n"
@@ -1,8 +1,16 @@
 import openai
-import psycopg2
 import os
+import time
 from dotenv import load_dotenv
 
+from aws_config_schema_design import schema_guidance
+from query_backends import dialect_note, get_query_backend, stream_query
+from query_tracing import llm_usage, span, trace_query
+from result_formatter import encode_results
+from schema_provider import get_schema_provider
+from sql_guardrail import QueryRejected, guard_sql
+from translation_cache import get_translation_cache
+
 # Load environment variables
 load_dotenv()
 
@@ -10,43 +18,58 @@ load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 def translate_user_query_to_sql(user_query, schema):
+    with span("generate_sql") as stage:
+        return _translate_user_query_to_sql(user_query, schema, stage)
+
+def _translate_user_query_to_sql(user_query, schema, stage):
+    cache = get_translation_cache()
+    if cache is not None:
+        cached_sql = cache.get(user_query, schema)
+        if cached_sql is not None:
+            stage.set(cached=True)
+            return cached_sql
+
     prompt = f"""
     You are an AI assistant that translates natural language queries about AWS resources into SQL queries.
     The database schema is as follows:
     {schema}
+    {schema_guidance(schema)}
 
     User query: {user_query}
 
     Translate the above query into a SQL query that can be executed on the given schema.
     """
 
+    started = time.perf_counter()
     response = openai.Completion.create(
         engine="text-davinci-002",
         prompt=prompt,
         max_tokens=150
     )
+    sql_query = response.choices[0].text.strip()
+    if stage.recording:
+        stage.set(**llm_usage(response, prompt, sql_query))
 
-    return response.choices[0].text.strip()
+    if cache is not None:
+        cache.put(user_query, schema, sql_query, time.perf_counter() - started)
+    return sql_query
 
 def execute_sql_query(sql_query):
-    conn = psycopg2.connect(
-        dbname=os.getenv("REDSHIFT_DB"),
-        user=os.getenv("REDSHIFT_USER"),
-        password=os.getenv("REDSHIFT_PASSWORD"),
-        host=os.getenv("REDSHIFT_HOST"),
-        port=os.getenv("REDSHIFT_PORT")
-    )
-    
-    with conn.cursor() as cur:
-        cur.execute(sql_query)
-        results = cur.fetchall()
-    
-    conn.close()
-    return results
+    with span("execute_query") as stage:
+        rows = get_query_backend().execute(sql_query)
+        stage.set(rows=len(rows))
+        return rows
 
 def format_data_for_gemini(raw_data):
-    # Convert raw data to a string format that Gemini can understand
-    return "\n".join([str(row) for row in raw_data])
+    # Convert raw data to a string format that Gemini can understand, as compact CSV within a token budget
+    with span("format_results") as stage:
+        formatted_data = encode_results(raw_data)
+        if stage.recording:
+            stage.set(bytes=len(formatted_data.encode("utf-8")))
+            # Streamed rows are fetched while they are formatted; report that time separately
+            if hasattr(raw_data, "fetch_seconds"):
+                stage.split("execute_query", raw_data.fetch_seconds, rows=raw_data.row_count)
+        return formatted_data
 
 def generate_gemini_prompt(user_query, formatted_data):
     return f"""
@@ -59,43 +82,54 @@ def generate_gemini_prompt(user_query, formatted_data):
     """
 
 def query_gemini(gemini_prompt):
-    response = openai.Completion.create(
-        engine="text-davinci-002",
-        prompt=gemini_prompt,
-        max_tokens=300
-    )
-    return response.choices[0].text.strip()
+    with span("answer") as stage:
+        response = openai.Completion.create(
+            engine="text-davinci-002",
+            prompt=gemini_prompt,
+            max_tokens=300
+        )
+        answer = response.choices[0].text.strip()
+        if stage.recording:
+            stage.set(**llm_usage(response, gemini_prompt, answer))
+        return answer
 
 def process_user_query(user_query, schema):
-    # Step 1: Translate user query to SQL
-    sql_query = translate_user_query_to_sql(user_query, schema)
-    
-    # Step 2: Execute SQL query and retrieve data
-    raw_data = execute_sql_query(sql_query)
-    
-    # Step 3: Format retrieved data
-    formatted_data = format_data_for_gemini(raw_data)
-    
-    # Step 4: Generate Gemini prompt
-    gemini_prompt = generate_gemini_prompt(user_query, formatted_data)
-    
-    # Step 5: Send prompt to Gemini and get response
-    final_answer = query_gemini(gemini_prompt)
-    
-    return final_answer
+    # Every stage below records a span under this question's correlation ID when tracing is on
+    with trace_query(user_query):
+        # Step 1: Translate user query to SQL for the backend's dialect
+        schema = dialect_note() + schema
+        sql_query = translate_user_query_to_sql(user_query, schema)
+
+        # Step 2: Enforce a single, bounded, read-only statement within the cost budget
+        with span("guard_sql"):
+            try:
+                guarded = guard_sql(sql_query, user_query)
+            except QueryRejected:
+                # Otherwise the rejected translation is served again until its TTL expires.
+                cache = get_translation_cache()
+                if cache is not None:
+                    cache.invalidate(user_query, schema)
+                raise
+        
+        # Step 3: Execute SQL query and stream the rows from a server-side cursor
+        raw_data = stream_query(guarded.sql, count_sql=guarded.count_sql, row_limit=guarded.row_limit)
+        
+        # Step 4: Format retrieved data
+        formatted_data = format_data_for_gemini(raw_data)
+        
+        # Step 5: Generate Gemini prompt
+        gemini_prompt = generate_gemini_prompt(user_query, formatted_data)
+        
+        # Step 6: Send prompt to Gemini and get response
+        final_answer = query_gemini(gemini_prompt)
+        
+        return final_answer
 
 # Example usage
 if __name__ == "__main__":
-    schema = """
-    CREATE TABLE aws_config_resources (
-        resource_id VARCHAR(255),
-        resource_type VARCHAR(50),
-        region VARCHAR(20),
-        configuration JSON,
-        tags JSON,
-        capture_time TIMESTAMP
-    );
-    """
     user_query = "Show me all EC2 instances in the us-west-2 region"
+    # Live tables and column value hints, pruned to what the question needs
+    snapshot = get_schema_provider().snapshot()
+    schema = snapshot.render(snapshot.select(user_query, top_k=2))
     result = process_user_query(user_query, schema)
     print(result)
\ No newline at end of file
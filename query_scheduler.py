@@ -0,0 +1,318 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from db_pool import get_connection_pool
+from query_tracing import get_tracer, span
+
+# Priority classes, most urgent first: the REPL is interactive, the server and batch callers are batch.
+PRIORITIES = ("interactive", "batch")
+DEFAULT_PRIORITY = "batch"
+# Unattributed work, e.g. process_user_queries, which bounds its own concurrency: only the global limits apply.
+DEFAULT_USER = "system"
+# Warehouse queries running at once, in total and per user; stays below the pool size so the pool never waits.
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_PER_USER = 2
+# Slots only interactive queries may take, so a batch backlog never makes the REPL wait.
+DEFAULT_INTERACTIVE_RESERVED = 2
+# Seconds a query may wait for a slot before QueueTimeout.
+DEFAULT_QUEUE_TIMEOUT = 30.0
+# Server-side statement_timeout per priority; batch queries must not hold slots for long.
+DEFAULT_STATEMENT_TIMEOUTS_MS = {"interactive": 60000, "batch": 30000}
+
+_current_context = contextvars.ContextVar("query_context", default=None)
+
+
+class QueueTimeout(Exception):
+    """A query waited longer than the queue timeout for a warehouse slot."""
+
+
+class QueryCancelled(Exception):
+    """The question was abandoned, so its warehouse query was cancelled or never started."""
+
+
+class QueryContext:
+    """Who a question's warehouse queries run for, at which priority, and whether it was abandoned.
+
+    Use as `with QueryContext(user, priority):` around a question; queries run inside it are
+    scheduled for that user, and cancel() stops the ones still queued or running.
+    """
+
+    def __init__(self, user=DEFAULT_USER, priority=DEFAULT_PRIORITY):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}")
+        self.user = user
+        self.priority = priority
+        self.cancelled = False
+        self._cancel_hooks = []
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_context.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_context.reset(self._token)
+        return False
+
+    def cancel(self):
+        """Abandon the question: queued queries give up and running ones are cancelled server-side."""
+        with self._lock:
+            self.cancelled = True
+            # Under the lock, so a connection cannot be handed to another query mid-cancel.
+            for hook in self._cancel_hooks:
+                hook()
+
+    @contextmanager
+    def cancels(self, hook):
+        """Call hook (e.g. a connection's cancel) if the question is abandoned inside this block.
+
+        Errors raised inside the block once the question was abandoned surface as QueryCancelled.
+        """
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled(f"Question from {self.user} was abandoned")
+            self._cancel_hooks.append(hook)
+        try:
+            yield
+        except Exception as e:
+            if self.cancelled and not isinstance(e, QueryCancelled):
+                raise QueryCancelled(f"Question from {self.user} was abandoned") from e
+            raise
+        finally:
+            with self._lock:
+                self._cancel_hooks.remove(hook)
+
+
+def current_query_context():
+    """The QueryContext of the question being processed, or None."""
+    return _current_context.get()
+
+
+def query_context(user=None, priority=None):
+    """A new QueryContext for one question, taking unset values from the enclosing one."""
+    outer = _current_context.get()
+    return QueryContext(
+        user or (outer.user if outer is not None else DEFAULT_USER),
+        priority or (outer.priority if outer is not None else DEFAULT_PRIORITY),
+    )
+
+
+Admission = namedtuple("Admission", ["context", "statement_timeout_ms", "wait_seconds"])
+Admission.__doc__ = "A granted warehouse slot: whose it is, its statement timeout, and how long it was waited for."
+
+
+class _Waiter:
+    __slots__ = ("context", "sequence", "granted")
+
+    def __init__(self, context, sequence):
+        self.context = context
+        self.sequence = sequence
+        self.granted = False
+
+
+class QueryScheduler:
+    """Admits warehouse queries under global and per-user concurrency limits, interactive before batch.
+
+    Queries over a limit wait in one queue. When a slot frees, the oldest waiter of the most urgent
+    priority whose user is under max_per_user runs next; batch queries never take the last
+    interactive_reserved slots. DEFAULT_USER has no per-user limit. Waiting longer than
+    queue_timeout raises QueueTimeout.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_per_user=DEFAULT_MAX_PER_USER,
+                 interactive_reserved=DEFAULT_INTERACTIVE_RESERVED, queue_timeout=DEFAULT_QUEUE_TIMEOUT,
+                 statement_timeouts_ms=None, metrics=None):
+        if max_concurrency < 1 or max_per_user < 1 or not 0 <= interactive_reserved < max_concurrency:
+            raise ValueError(f"Invalid limits: max_concurrency={max_concurrency}, max_per_user={max_per_user}, "
+                             f"interactive_reserved={interactive_reserved}")
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.interactive_reserved = interactive_reserved
+        self.queue_timeout = queue_timeout
+        self.statement_timeouts_ms = dict(DEFAULT_STATEMENT_TIMEOUTS_MS, **(statement_timeouts_ms or {}))
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._waiting = []  # _Waiters in arrival order
+        self._running = dict.fromkeys(PRIORITIES, 0)
+        self._running_by_user = {}
+        self._stats = {
+            "admitted": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "cancelled_queued": 0,
+            "cancelled_running": 0,
+        }
+        if metrics is not None:
+            metrics.gauge("nlq_warehouse_queue_depth", "priority", self.queue_depth)
+            metrics.gauge("nlq_warehouse_running_queries", "priority", self.running_queries)
+
+    def _has_room(self, context):
+        limit = self.max_concurrency
+        if context.priority != "interactive":
+            limit -= self.interactive_reserved
+        return (sum(self._running.values()) < limit
+                and (context.user == DEFAULT_USER or self._running_by_user.get(context.user, 0) < self.max_per_user))
+
+    def _dispatch(self):
+        """Grant free slots to waiters, most urgent priority first, oldest first. Caller holds the lock."""
+        granted = False
+        for waiter in sorted(self._waiting, key=lambda w: (PRIORITIES.index(w.context.priority), w.sequence)):
+            if self._has_room(waiter.context):
+                self._waiting.remove(waiter)
+                self._running[waiter.context.priority] += 1
+                self._running_by_user[waiter.context.user] = self._running_by_user.get(waiter.context.user, 0) + 1
+                waiter.granted = True
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _release(self, context):
+        self._running[context.priority] -= 1
+        self._running_by_user[context.user] -= 1
+        if not self._running_by_user[context.user]:
+            del self._running_by_user[context.user]
+        self._dispatch()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _wait_for_slot(self, context):
+        started = time.monotonic()
+        waiter = _Waiter(context, next(self._sequence))
+        queued = False
+        with self._cond:
+            self._waiting.append(waiter)
+            try:
+                self._dispatch()
+                while not waiter.granted:
+                    if context.cancelled:
+                        raise QueryCancelled(f"Question from {context.user} was abandoned while queued")
+                    remaining = started + self.queue_timeout - time.monotonic()
+                    if remaining <= 0:
+                        raise QueueTimeout(f"No warehouse slot for {context.user} ({context.priority}) "
+                                           f"after {self.queue_timeout:g}s")
+                    queued = True
+                    self._cond.wait(remaining)
+            except BaseException as e:
+                # Also on Ctrl-C while waiting: give back a slot granted meanwhile, or leave the queue.
+                if waiter.granted:
+                    self._release(context)
+                else:
+                    self._waiting.remove(waiter)
+                self._record(context, "timeout" if isinstance(e, QueueTimeout) else "cancelled",
+                             time.monotonic() - started, queued)
+                raise
+            waited = time.monotonic() - started
+            self._record(context, "admitted", waited, queued)
+        return waited
+
+    def _record(self, context, outcome, waited, queued):
+        """Count an admission outcome. Caller holds the lock."""
+        if outcome == "admitted":
+            self._stats["admitted"] += 1
+            if queued:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        else:
+            self._stats["timeouts" if outcome == "timeout" else "cancelled_queued"] += 1
+        if self.metrics is not None:
+            self.metrics.observe("nlq_warehouse_queue_wait_seconds", waited, priority=context.priority)
+            self.metrics.increment("nlq_warehouse_admissions_total", outcome=outcome, priority=context.priority)
+
+    @contextmanager
+    def admit(self, context=None):
+        """Hold a warehouse slot for the current question's query for the duration of a with-block.
+
+        Waits in the queue if the question's user or the warehouse is at its limit; yields an Admission.
+        """
+        context = context or current_query_context() or QueryContext()
+        with span("warehouse_queue") as stage:
+            stage.set(priority=context.priority)
+            with context.cancels(self._wake):
+                waited = self._wait_for_slot(context)
+        try:
+            yield Admission(context, self.statement_timeouts_ms[context.priority], waited)
+        except QueryCancelled:
+            with self._cond:
+                self._stats["cancelled_running"] += 1
+            if self.metrics is not None:
+                self.metrics.increment("nlq_warehouse_cancellations_total", priority=context.priority)
+            raise
+        finally:
+            with self._cond:
+                self._release(context)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled warehouse connection once admitted, under the priority's statement timeout.
+
+        Abandoning the question cancels the statement on the server and raises QueryCancelled.
+        """
+        with self.admit() as admission:
+            pool = get_connection_pool()
+            timeout = admission.statement_timeout_ms
+            # The pool's connections already carry its default; only set a different one.
+            with pool.connection(None if timeout == pool.statement_timeout_ms else timeout) as conn:
+                with admission.context.cancels(conn.cancel):
+                    yield conn
+
+    def queue_depth(self):
+        """Queries waiting for a slot, per priority."""
+        with self._cond:
+            depth = dict.fromkeys(PRIORITIES, 0)
+            for waiter in self._waiting:
+                depth[waiter.context.priority] += 1
+            return depth
+
+    def running_queries(self):
+        """Queries holding a slot, per priority."""
+        with self._cond:
+            return dict(self._running)
+
+    def stats(self):
+        """Return a snapshot of admission counters, queue depth and wait times."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._waiting)
+            stats["running"] = sum(self._running.values())
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_query_scheduler():
+    """Return the process-wide warehouse scheduler configured by the WAREHOUSE_* settings."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = QueryScheduler(
+                max_concurrency=int(os.getenv("WAREHOUSE_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                max_per_user=int(os.getenv("WAREHOUSE_MAX_PER_USER", DEFAULT_MAX_PER_USER)),
+                interactive_reserved=int(os.getenv("WAREHOUSE_INTERACTIVE_RESERVED", DEFAULT_INTERACTIVE_RESERVED)),
+                queue_timeout=float(os.getenv("WAREHOUSE_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT)),
+                statement_timeouts_ms={
+                    priority: int(os.getenv(f"WAREHOUSE_{priority.upper()}_STATEMENT_TIMEOUT_MS", timeout))
+                    for priority, timeout in DEFAULT_STATEMENT_TIMEOUTS_MS.items()
+                },
+                metrics=get_tracer().metrics,
+            )
+        return _scheduler
+
+
+def scheduled_connection():
+    """Borrow a warehouse connection through the shared scheduler for the duration of a with-block."""
+    return get_query_scheduler().connection()
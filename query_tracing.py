@@ -0,0 +1,350 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from result_formatter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated: "log" writes one JSON line per question, "prometheus" keeps metrics for
+# /metrics. Empty (or "none") disables tracing; stage code then only pays a context lookup.
+DEFAULT_TRACE_EXPORTERS = ""
+# Port for the Prometheus text endpoint; 0 keeps metrics in-process (see render_metrics()).
+DEFAULT_METRICS_PORT = 0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace = contextvars.ContextVar("query_trace", default=None)
+
+
+class _NullSpan:
+    """Span handed out when no question is being traced; every method is a no-op."""
+
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def split(self, name, seconds, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One pipeline stage of a traced question: duration plus attributes such as tokens and rows."""
+
+    recording = True
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+        self.attrs = {}
+        self.started = None
+        self.seconds = None
+        self.error = None
+        self._split_seconds = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started - self._split_seconds
+        if exc is not None:
+            self.error = type(exc).__name__
+        self.trace.add(self)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update((key, value) for key, value in attrs.items() if value is not None)
+
+    def split(self, name, seconds, **attrs):
+        """Report part of this span's time as its own stage, e.g. database fetches inside formatting."""
+        child = Span(self.trace, name)
+        child.seconds = seconds
+        child.set(**attrs)
+        self._split_seconds += seconds
+        self.trace.add(child)
+
+    def to_dict(self):
+        span = {"stage": self.name, "ms": round(self.seconds * 1000, 3), **self.attrs}
+        if self.error:
+            span["error"] = self.error
+        return span
+
+
+class QueryTrace:
+    """Spans recorded for one question under a correlation ID."""
+
+    def __init__(self, question, correlation_id=None):
+        self.question = question
+        self.correlation_id = correlation_id or uuid.uuid4().hex[:16]
+        self.spans = []
+        self.started = time.perf_counter()
+        self.seconds = None
+        # Question start to the first streamed answer token, as the user experiences it.
+        self.first_token_seconds = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        # Stages of an async question run in worker threads.
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        first_token_ms = None if self.first_token_seconds is None else round(self.first_token_seconds * 1000, 3)
+        return {
+            "correlation_id": self.correlation_id,
+            "question": self.question,
+            "ms": round(self.seconds * 1000, 3),
+            "first_token_ms": first_token_ms,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class PrometheusMetrics:
+    """Stage latency histograms and token/row/byte counters in the Prometheus text format."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def _observe(self, name, labels, seconds):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+    def _increment(self, name, labels, value=1):
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration outside a trace, e.g. time a query spent waiting for a warehouse slot."""
+        with self._lock:
+            self._observe(name, tuple(sorted(labels.items())), seconds)
+
+    def increment(self, name, value=1, **labels):
+        with self._lock:
+            self._increment(name, tuple(sorted(labels.items())), value)
+
+    def gauge(self, name, label, callback):
+        """Report callback()'s {label value: number} at every scrape, e.g. queue depth per priority."""
+        with self._lock:
+            self._gauges[name] = (label, callback)
+
+    def record(self, trace):
+        status = "error" if trace.error else "ok"
+        with self._lock:
+            self._observe("nlq_query_duration_seconds", (), trace.seconds)
+            self._increment("nlq_queries_total", (("status", status),))
+            if trace.first_token_seconds is not None:
+                self._observe("nlq_time_to_first_token_seconds", (), trace.first_token_seconds)
+            for span in trace.spans:
+                stage = (("stage", span.name),)
+                self._observe("nlq_stage_duration_seconds", stage, span.seconds)
+                if span.error:
+                    self._increment("nlq_stage_errors_total", stage)
+                if "intent" in span.attrs:
+                    # Match rate is sum without intent="none" over the total.
+                    self._increment("nlq_intent_routes_total", (("intent", span.attrs["intent"]),))
+                if "source" in span.attrs:
+                    # Answers rendered locally or served from the answer cache skip the answer model.
+                    self._increment("nlq_answers_total", (("source", span.attrs["source"]),))
+                for attr, metric in (("prompt_tokens", "nlq_llm_prompt_tokens_total"),
+                                     ("completion_tokens", "nlq_llm_completion_tokens_total"),
+                                     ("rows", "nlq_rows_returned_total"),
+                                     ("bytes", "nlq_formatted_bytes_total")):
+                    if attr in span.attrs:
+                        self._increment(metric, stage, span.attrs[attr])
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+            for name in sorted({name for name, _labels in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, histogram["buckets"]):
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{name}_sum{label_text(labels)} {histogram['sum']:.6f}")
+                    lines.append(f"{name}_count{label_text(labels)} {histogram['count']}")
+            for name in sorted({name for name, _labels in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value}")
+        # Read gauges outside the lock; their callbacks take locks of their own.
+        for name, (label, callback) in gauges:
+            lines.append(f"# TYPE {name} gauge")
+            for value_label, value in sorted(callback().items()):
+                lines.append(f"{name}{label_text([(label, value_label)])} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(metrics, port, host="0.0.0.0"):
+    """Serve metrics at http://host:port/metrics from a daemon thread."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving Prometheus metrics on port %s", server.server_address[1])
+    return server
+
+
+class Tracer:
+    """Starts traces for questions and hands finished ones to the configured exporters."""
+
+    def __init__(self, exporters=(), metrics_port=DEFAULT_METRICS_PORT):
+        self.exporters = frozenset(exporters)
+        self.enabled = bool(self.exporters)
+        self.metrics = PrometheusMetrics() if "prometheus" in self.exporters else None
+        self.server = None
+        if self.metrics is not None and metrics_port:
+            self.server = start_metrics_server(self.metrics, metrics_port)
+        self._log = logging.getLogger("query_tracing.traces")
+        if "log" in self.exporters and not self._log.handlers:
+            # Trace lines are machine-readable JSON; keep them out of the root logger's format.
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+            self._log.setLevel(logging.INFO)
+            self._log.propagate = False
+
+    def finish(self, trace):
+        trace.seconds = time.perf_counter() - trace.started
+        if "log" in self.exporters:
+            self._log.info(json.dumps(trace.to_dict(), default=str))
+        if self.metrics is not None:
+            self.metrics.record(trace)
+
+
+class _TraceScope:
+    """Context manager making a QueryTrace current for the stages run inside it."""
+
+    def __init__(self, tracer, trace):
+        self.tracer = tracer
+        self.trace = trace
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        if exc is not None:
+            self.trace.error = type(exc).__name__
+        self.tracer.finish(self.trace)
+        return False
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Return the process-wide tracer configured by TRACE_EXPORTERS and TRACE_METRICS_PORT."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                names = os.getenv("TRACE_EXPORTERS", DEFAULT_TRACE_EXPORTERS)
+                exporters = {name.strip() for name in names.split(",") if name.strip() not in ("", "none")}
+                _tracer = Tracer(exporters, int(os.getenv("TRACE_METRICS_PORT", DEFAULT_METRICS_PORT)))
+    return _tracer
+
+
+def trace_query(question, correlation_id=None):
+    """Trace one question; use as `with trace_query(question):` around the whole pipeline.
+
+    Inside an active trace (e.g. a server that assigned the correlation ID) it joins that trace.
+    """
+    tracer = get_tracer()
+    if not tracer.enabled or _current_trace.get() is not None:
+        return NULL_SPAN
+    return _TraceScope(tracer, QueryTrace(question, correlation_id))
+
+
+def span(name):
+    """Time one stage of the current question; a no-op outside trace_query()."""
+    trace = _current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name)
+
+
+def current_correlation_id():
+    """Correlation ID of the question being processed, or None."""
+    trace = _current_trace.get()
+    return trace.correlation_id if trace is not None else None
+
+
+def mark_first_token():
+    """Record that the current question's first answer token reached the user."""
+    trace = _current_trace.get()
+    if trace is not None and trace.first_token_seconds is None:
+        trace.first_token_seconds = time.perf_counter() - trace.started
+
+
+def llm_usage(response, prompt, completion):
+    """Prompt/completion token counts from the API's usage block, estimated when it is missing."""
+    usage = getattr(response, "usage", None) or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or estimate_tokens(prompt),
+        "completion_tokens": usage.get("completion_tokens") or estimate_tokens(completion),
+    }
+
+
+def render_metrics():
+    """Prometheus text for the process's metrics, e.g. to serve from an existing web app."""
+    metrics = get_tracer().metrics
+    return metrics.render() if metrics is not None else ""
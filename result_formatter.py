@@ -0,0 +1,227 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+import logging
+import os
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a characters-per-token estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 2000
+DEFAULT_MAX_JSON_CHARS = 160
+DEFAULT_MAX_TEXT_CHARS = 200
+DEFAULT_MAX_SCAN_ROWS = 100000
+SUMMARY_MAX_DISTINCT = 25
+SUMMARY_TOP_VALUES = 5
+
+# Columns that hold whole JSON documents or free text and dominate prompt size.
+WIDE_COLUMNS = {"configuration", "tags", "message"}
+
+_encoding = None
+
+
+def estimate_tokens(text):
+    """Count prompt tokens with tiktoken when installed, otherwise estimate ~4 characters per token."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _compact_json(value, limit):
+    """Render a JSON document as flat key=value pairs, keeping only scalar fields."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return _truncate(value, limit)
+    if isinstance(value, dict):
+        # Nested objects are projected away; tags are already a flat {key: value} map.
+        text = ";".join(f"{k}={v}" for k, v in value.items() if not isinstance(v, (dict, list)))
+    else:
+        text = json.dumps(value, separators=(",", ":"), default=str)
+    return _truncate(text, limit)
+
+
+def compact_value(column, value, max_json_chars=DEFAULT_MAX_JSON_CHARS, max_text_chars=DEFAULT_MAX_TEXT_CHARS):
+    """Render one cell as short text for the answer prompt."""
+    if value is None:
+        return ""
+    if column in WIDE_COLUMNS or isinstance(value, (dict, list)):
+        if column == "message" and isinstance(value, str):
+            return _truncate(value, max_text_chars)
+        return _compact_json(value, max_json_chars)
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    if isinstance(value, decimal.Decimal):
+        return f"{float(value):.6g}"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return _truncate(str(value), max_text_chars)
+
+
+class ResultSummary:
+    """Bounded-memory per-column statistics over a streamed result set."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.row_count = 0
+        self.nulls = [0] * len(columns)
+        self.minimums = [None] * len(columns)
+        self.maximums = [None] * len(columns)
+        self.value_counts = [{} for _ in columns]  # dropped to None once a column is high-cardinality
+
+    def add(self, row):
+        self.row_count += 1
+        for i, value in enumerate(row):
+            if value is None:
+                self.nulls[i] += 1
+                continue
+            if self.columns[i] in WIDE_COLUMNS or isinstance(value, (dict, list)):
+                continue
+            try:
+                if self.minimums[i] is None or value < self.minimums[i]:
+                    self.minimums[i] = value
+                if self.maximums[i] is None or value > self.maximums[i]:
+                    self.maximums[i] = value
+            except TypeError:
+                pass
+            counts = self.value_counts[i]
+            if counts is not None and not isinstance(value, float):
+                counts[value] = counts.get(value, 0) + 1
+                if len(counts) > SUMMARY_MAX_DISTINCT:
+                    self.value_counts[i] = None
+
+    def render(self, total_rows, row_limit=None):
+        lines = [f"Total rows: {total_rows}"]
+        if row_limit is not None and total_rows > row_limit:
+            lines.append(f"(result truncated: the query returned only the first {row_limit} rows)")
+        if total_rows > self.row_count:
+            lines.append(f"(statistics computed over the first {self.row_count} rows)")
+        for i, column in enumerate(self.columns):
+            parts = []
+            if self.minimums[i] is not None:
+                parts.append(f"min={compact_value(column, self.minimums[i])}")
+                parts.append(f"max={compact_value(column, self.maximums[i])}")
+            if self.nulls[i]:
+                parts.append(f"nulls={self.nulls[i]}")
+            counts = self.value_counts[i]
+            if counts and len(counts) > 1:
+                top = sorted(counts.items(), key=lambda item: -item[1])[:SUMMARY_TOP_VALUES]
+                parts.append("top: " + ", ".join(f"{compact_value(column, v)} ({n})" for v, n in top))
+            elif counts is None:
+                parts.append(f"more than {SUMMARY_MAX_DISTINCT} distinct values")
+            if parts:
+                lines.append(f"- {column}: " + "; ".join(parts))
+        return "\n".join(lines)
+
+
+class RowCapture:
+    """Pass a result set's rows through while keeping the first max_rows of them.
+
+    Attributes of the wrapped stream (columns, fetch_seconds, total_row_count...) stay reachable.
+    """
+
+    def __init__(self, rows, max_rows):
+        self._rows = rows
+        self.max_rows = max_rows
+        self.head = []
+        self.seen = 0
+
+    def __iter__(self):
+        for row in self._rows:
+            self.seen += 1
+            if len(self.head) < self.max_rows:
+                self.head.append(row)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._rows, name)
+
+    @property
+    def complete(self):
+        """True if head holds every row of the result."""
+        return self.seen <= self.max_rows
+
+
+def encode_results(rows, columns=None, token_budget=None, max_scan_rows=DEFAULT_MAX_SCAN_ROWS):
+    """Encode a (possibly streaming) result set as header-once CSV packed into a token budget.
+
+    If every row fits, the CSV is returned as-is. Otherwise the output falls back to a
+    summary (row count, min/max and top values per column) followed by as many sample
+    rows as fit in what is left of the budget.
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv("RESULT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+    iterator = iter(rows)
+    sample_lines = []
+    sample_tokens = 0
+    naive_tokens = 0
+    summary = None
+    overflowed = False
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="")
+
+    for row in iterator:
+        if columns is None:
+            columns = getattr(rows, "columns", None) or [f"col{i + 1}" for i in range(len(row))]
+            summary = ResultSummary(columns)
+        summary.add(row)
+        naive_tokens += (len(str(row)) + 3) // 4
+        if not overflowed:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([compact_value(column, value) for column, value in zip(columns, row)])
+            line = buffer.getvalue()
+            line_tokens = estimate_tokens(line) + 1
+            if sample_tokens + line_tokens <= token_budget:
+                sample_lines.append(line)
+                sample_tokens += line_tokens
+            else:
+                overflowed = True
+        if overflowed and summary.row_count >= max_scan_rows:
+            break
+
+    if columns is None:
+        return "(no rows returned)"
+
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerow(columns)
+    header = buffer.getvalue()
+
+    if not overflowed:
+        encoded = "\n".join([header] + sample_lines)
+        total_rows = len(sample_lines)
+    else:
+        if hasattr(rows, "total_row_count"):
+            total_rows = rows.total_row_count()
+        else:
+            total_rows = summary.row_count + sum(1 for _ in iterator)
+        summary_text = summary.render(total_rows, getattr(rows, "row_limit", None))
+        remaining = token_budget - estimate_tokens(summary_text) - estimate_tokens(header)
+        kept = []
+        for line in sample_lines:
+            remaining -= estimate_tokens(line) + 1
+            if remaining < 0:
+                break
+            kept.append(line)
+        encoded = f"{summary_text}\n\nSample rows ({len(kept)} of {total_rows}):\n" + "\n".join([header] + kept)
+
+    logger.info(
+        "Encoded %d rows for the answer prompt: ~%d tokens as raw tuples, %d tokens encoded",
+        total_rows, naive_tokens, estimate_tokens(encoded),
+    )
+    return encoded
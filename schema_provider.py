@@ -0,0 +1,267 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql
+from query_backends import get_query_backend
+from schema_relevance import SchemaRelevanceIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEMA_TTL = 300
+# Distinct values kept per low-cardinality column; the prompt shows at most DEFAULT_HINT_VALUES of them.
+DEFAULT_MAX_DISTINCT = 200
+DEFAULT_HINT_VALUES = 25
+# Rows per table that low-cardinality values are gathered from, so a refresh never groups a whole table.
+DEFAULT_STATS_SAMPLE_ROWS = 100_000
+
+# information_schema spellings of the types the prompt and the relevance index expect.
+TYPE_NAMES = {
+    "character varying": "VARCHAR",
+    "character": "CHAR",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMPTZ",
+    "double precision": "FLOAT",
+    "real": "FLOAT",
+    "double": "FLOAT",
+}
+
+ColumnStats = namedtuple("ColumnStats", ["values", "minimum", "maximum", "sampled"], defaults=[False])
+ColumnStats.__doc__ = ("Most frequent values (None if not gathered or too many), min/max for range columns, "
+                       "and whether the values come from a sample that may miss some.")
+
+
+def is_range_column(column):
+    return column["type"].upper().startswith("TIMESTAMP") or column.get("filter") == "range"
+
+
+class SchemaSnapshot:
+    """Tables and columns as they exist in the database, with column statistics, at one point in time.
+
+    Snapshots are immutable; a refresh builds a new one, so questions in flight keep a consistent view.
+    """
+
+    def __init__(self, schemas, stats, versions, introspected=True, provisional=False):
+        self.schemas = schemas  # table -> [column dicts], design metadata merged with live types
+        self.stats = stats  # (table, column) -> ColumnStats
+        self.versions = versions  # table -> catalog change counter or row count, to skip unchanged tables
+        self.introspected = introspected
+        self.provisional = provisional  # replaced on the next request rather than after the TTL
+        self.built_at = time.time()
+        self._index = None
+
+    @property
+    def relevance_index(self):
+        if self._index is None:
+            self._index = SchemaRelevanceIndex(self.schemas)
+        return self._index
+
+    def select(self, question, top_k):
+        """Tables and columns relevant to the question, as chosen by the schema relevance index."""
+        return self.relevance_index.select(question, top_k)
+
+    def values(self, table_name, column_name):
+        """Distinct values of a low-cardinality column, most frequent first, or [] if unknown."""
+        stats = self.stats.get((table_name, column_name))
+        return list(stats.values) if stats is not None and stats.values else []
+
+    def column_hints(self, tables, max_values=DEFAULT_HINT_VALUES):
+        """Comment lines with known values and ranges for the given tables' columns."""
+        lines = []
+        for table_name, columns in tables.items():
+            for column in columns:
+                stats = self.stats.get((table_name, column["name"]))
+                if stats is None:
+                    continue
+                label = f"{table_name}.{column['name']}"
+                if stats.values:
+                    shown = ", ".join(f"'{value}'" for value in sorted(stats.values[:max_values], key=str))
+                    more = " and others" if len(stats.values) > max_values else ""
+                    if stats.sampled:
+                        lines.append(f"-- {label} sampled values include: {shown}{more}")
+                    else:
+                        lines.append(f"-- {label} values: {shown}{more}")
+                elif stats.minimum is not None:
+                    lines.append(f"-- {label} ranges from {_day(stats.minimum)} to {_day(stats.maximum)}")
+        return lines
+
+    def render(self, tables=None, hints=True):
+        """CREATE TABLE statements for the tables (all by default) followed by their column hints."""
+        tables = self.schemas if tables is None else tables
+        ddl = "".join(generate_create_table_sql(tables).values())
+        hints = self.column_hints(tables) if hints else []
+        return ddl + ("\n    " + "\n    ".join(hints) + "\n" if hints else "")
+
+
+def _day(value):
+    # Day precision keeps the prompt (and so the translation cache key) stable between loads.
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def introspect_schemas(backend, design):
+    """The designed tables that exist, with their live columns and types, keeping design metadata."""
+    live = {}
+    for table_name, column_name, data_type in backend.describe_columns(list(design)):
+        type_name = TYPE_NAMES.get(str(data_type).lower(), str(data_type).upper())
+        live.setdefault(table_name, []).append((column_name, type_name))
+    schemas = {}
+    for table_name, designed in design.items():
+        if table_name not in live:
+            continue
+        metadata = {column["name"]: column for column in designed}
+        schemas[table_name] = [
+            dict(metadata.get(column_name, {}), name=column_name, type=type_name)
+            for column_name, type_name in live[table_name]
+        ]
+    return schemas
+
+
+def table_version(backend, table_name):
+    """A value that changes when the table's rows do: the backend's catalog statistics, else its row count."""
+    version = backend.table_version(table_name)
+    if version is None:
+        version = backend.execute(f"SELECT COUNT(*) FROM {table_name}", maintenance=True)[0][0]
+    return version
+
+
+def sample_stats(backend, table_name, columns, sample_rows, max_distinct):
+    """Min/max of range columns over the whole table, and values of low-cardinality columns from at most sample_rows rows.
+
+    Range columns lead the sort key, so their MIN/MAX read only zone maps; the values are marked
+    sampled when the table has more rows than the sample.
+    """
+    range_columns = [column["name"] for column in columns if is_range_column(column)]
+    low_columns = [column["name"] for column in columns if column.get("cardinality") == "low"]
+    stats = {}
+    if range_columns:
+        aggregates = ", ".join(f"MIN({name}), MAX({name})" for name in range_columns)
+        row = backend.execute(f"SELECT {aggregates} FROM {table_name}", maintenance=True)[0]
+        for i, name in enumerate(range_columns):
+            stats[(table_name, name)] = ColumnStats(None, row[2 * i], row[2 * i + 1])
+    if not low_columns:
+        return stats
+    probe = f"(SELECT 1 AS present FROM {table_name} LIMIT {sample_rows + 1}) AS probe"
+    sampled = backend.execute(f"SELECT COUNT(*) FROM {probe}", maintenance=True)[0][0] > sample_rows
+    sample = f"(SELECT {', '.join(low_columns)} FROM {table_name} LIMIT {sample_rows}) AS sampled"
+    for name in low_columns:
+        rows = backend.execute(
+            f"SELECT {name}, COUNT(*) AS n FROM {sample} WHERE {name} IS NOT NULL "
+            f"GROUP BY {name} ORDER BY n DESC LIMIT {max_distinct + 1}",
+            maintenance=True,
+        )
+        values = [value for value, _count in rows]
+        stats[(table_name, name)] = ColumnStats(values if len(values) <= max_distinct else None, None, None, sampled)
+    return stats
+
+
+class SchemaProvider:
+    """Introspects the live schema and column statistics, caching them for ttl_seconds.
+
+    The first snapshot is built on first use. After that, an expired snapshot keeps being served
+    while a background thread builds the next one, re-gathering statistics (values from a sample
+    of sample_rows rows) only for tables whose catalog statistics or row count changed. Until the
+    tables exist, the designed schema is served and introspection is retried on the next request.
+    """
+
+    def __init__(self, backend=None, ttl_seconds=DEFAULT_SCHEMA_TTL, max_distinct=DEFAULT_MAX_DISTINCT,
+                 sample_rows=DEFAULT_STATS_SAMPLE_ROWS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_distinct = max_distinct
+        self.sample_rows = sample_rows
+        self._snapshot = None
+        self._refreshing = False
+        self._expired = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def build(self, previous=None):
+        """Introspect the database into a new snapshot, reusing previous statistics where nothing changed."""
+        backend = self.backend or get_query_backend()
+        design = define_extended_schema()
+        try:
+            schemas = introspect_schemas(backend, design)
+        except Exception as e:
+            logger.warning("Error introspecting the database schema, using the designed schema: %s", e)
+            return SchemaSnapshot(design, {}, {}, introspected=False)
+        if not schemas:
+            # Nothing created yet (e.g. pipeline setup still running): prompt with the design meanwhile.
+            return SchemaSnapshot(design, {}, {}, introspected=False, provisional=True)
+        stats, versions = {}, {}
+        for table_name, columns in schemas.items():
+            unchanged = (
+                previous is not None and previous.introspected
+                and previous.schemas.get(table_name) == columns
+            )
+            try:
+                version = table_version(backend, table_name)
+                if unchanged and previous.versions.get(table_name) == version:
+                    # Same rows as last time: keep the statistics instead of sampling again.
+                    table_stats = {key: value for key, value in previous.stats.items() if key[0] == table_name}
+                else:
+                    table_stats = sample_stats(backend, table_name, columns, self.sample_rows, self.max_distinct)
+            except Exception as e:
+                logger.warning("Error gathering column statistics for %s: %s", table_name, e)
+                continue
+            stats.update(table_stats)
+            versions[table_name] = version
+        return SchemaSnapshot(schemas, stats, versions)
+
+    def _refresh(self):
+        try:
+            snapshot = self.build(self._snapshot)
+            with self._lock:
+                self._snapshot = snapshot
+                self._expired = snapshot.provisional
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def snapshot(self):
+        """The current snapshot; builds the first one, and refreshes expired ones in the background."""
+        with self._lock:
+            snapshot = self._snapshot
+            refresh = (
+                snapshot is not None and not self._refreshing
+                and (self._expired or time.time() - snapshot.built_at > self.ttl_seconds)
+            )
+            if refresh:
+                self._refreshing, self._expired = True, False
+        if snapshot is None:
+            with self._build_lock:
+                if self._snapshot is None:
+                    built = self.build()
+                    with self._lock:
+                        self._snapshot = built
+                        # The designed schema stands in only until the tables exist.
+                        self._expired = built.provisional
+                return self._snapshot
+        if refresh:
+            threading.Thread(target=self._refresh, name="schema-refresh", daemon=True).start()
+        return snapshot
+
+    def invalidate(self):
+        """Refresh on the next request, e.g. after a migration added columns."""
+        with self._lock:
+            self._expired = True
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_schema_provider():
+    """Return the process-wide schema provider configured by SCHEMA_CACHE_TTL and SCHEMA_STATS_SAMPLE_ROWS."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = SchemaProvider(
+                ttl_seconds=float(os.getenv("SCHEMA_CACHE_TTL", DEFAULT_SCHEMA_TTL)),
+                sample_rows=int(os.getenv("SCHEMA_STATS_SAMPLE_ROWS", DEFAULT_STATS_SAMPLE_ROWS)),
+            )
+        return _provider
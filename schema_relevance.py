@@ -0,0 +1,152 @@
+import math
+import re
+from collections import Counter
+
+from aws_config_schema_design import define_extended_schema, generate_create_table_sql
+
+DEFAULT_TOP_K_TABLES = 2
+VARIANT_MARGIN = 1.1
+
+# Words users say that never appear in the column descriptions, attached to the column they point at.
+COLUMN_SYNONYMS = {
+    ("aws_config_resources", "resource_type"): [
+        "ec2", "instance", "s3", "bucket", "lambda", "function", "vpc", "subnet", "security", "group",
+        "rds", "database", "iam", "role", "user", "volume", "ebs", "elb", "load", "balancer", "resource",
+    ],
+    ("aws_config_resources", "region"): ["region", "where", "located"],
+    ("aws_config_resources", "configuration"): [
+        "config", "configured", "instancetype", "size", "state", "running", "stopped", "encrypted",
+        "public", "private", "setting", "property",
+    ],
+    ("aws_config_resources", "tags"): ["tag", "tagged", "label", "owner", "env", "environment", "team"],
+    ("aws_config_resources", "capture_time"): ["changed", "change", "history", "historical", "previously", "was", "ago"],
+    ("cloudwatch_logs", "message"): ["log", "error", "exception", "warning", "fail", "failed", "failure", "timeout", "crash"],
+    ("cloudwatch_logs", "log_group"): ["log", "cloudwatch"],
+    ("cloudwatch_logs", "timestamp"): ["when", "today", "yesterday", "hour", "minute", "recent"],
+    ("ami_details", "ami_id"): ["ami", "image", "machine"],
+    ("ami_details", "name"): ["ami", "image"],
+    ("ami_details", "creation_date"): ["created", "oldest", "newest", "age", "old"],
+    ("quota_details", "quota_name"): ["quota", "limit"],
+    ("quota_details", "used"): ["usage", "utilization", "remaining", "headroom", "close", "near"],
+    ("quota_details", "quota_value"): ["quota", "maximum", "max"],
+    ("service_limits", "limit_name"): ["limit", "maximum"],
+    ("cost_usage_reports", "cost"): ["cost", "spend", "spent", "spending", "bill", "billing", "price", "expensive", "cheap", "dollar", "money", "charge"],
+    ("cost_usage_reports", "time_period"): ["month", "monthly", "week", "weekly", "day", "daily", "period", "last", "year"],
+    ("cost_usage_reports", "usage"): ["usage", "consumed", "hour"],
+}
+
+# Typed copies of hot configuration/tags paths exist in both Config tables.
+for _table_name in ("aws_config_resources", "aws_config_resources_latest"):
+    COLUMN_SYNONYMS.update({
+        (_table_name, "instance_type"): ["instancetype", "type", "size", "t2", "t3", "t4g", "m5", "c5", "r5", "micro", "small", "medium", "large", "xlarge"],
+        (_table_name, "instance_state"): ["running", "stopped", "stopping", "pending", "terminated", "state"],
+        (_table_name, "vpc_id"): ["vpc", "network"],
+        (_table_name, "tag_env"): ["env", "environment", "prod", "production", "staging", "dev", "tagged"],
+        (_table_name, "tag_owner"): ["owner", "owned", "own", "tagged"],
+        (_table_name, "tag_team"): ["team", "tagged"],
+    })
+
+# The latest-state table answers to the same words, plus those asking about the present.
+COLUMN_SYNONYMS.update({
+    ("aws_config_resources_latest", column): words
+    for (table_name, column), words in list(COLUMN_SYNONYMS.items())
+    if table_name == "aws_config_resources" and column != "capture_time"
+})
+COLUMN_SYNONYMS[("aws_config_resources_latest", "capture_time")] = ["now", "current", "currently", "exist", "existing", "latest", "active", "count", "number", "many", "total"]
+
+_REGION_PATTERN = re.compile(r"\b[a-z]{2}(?:-gov)?-[a-z]+-\d\b")
+
+
+def tokenize(text):
+    """Lowercase word tokens with a light plural stem, plus a 'region' token for region codes."""
+    text = text.lower()
+    tokens = []
+    if _REGION_PATTERN.search(text):
+        tokens.append("region")
+    for word in re.findall(r"[a-z0-9]+", _REGION_PATTERN.sub(" ", text)):
+        if len(word) < 2:
+            continue
+        if word.endswith("ies") and len(word) > 4:
+            word = word[:-3] + "y"
+        elif word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class SchemaRelevanceIndex:
+    """TF-IDF index over column names, descriptions and synonyms, used to prune the prompt schema."""
+
+    def __init__(self, schemas=None, synonyms=COLUMN_SYNONYMS):
+        self.schemas = schemas if schemas is not None else define_extended_schema()
+        self._documents = {}
+        for table_name, columns in self.schemas.items():
+            for col in columns:
+                words = [table_name, col["name"], col.get("description", "")]
+                words.extend(synonyms.get((table_name, col["name"]), []))
+                self._documents[(table_name, col["name"])] = Counter(tokenize(" ".join(words)))
+
+        document_frequency = Counter()
+        for terms in self._documents.values():
+            document_frequency.update(terms.keys())
+        total = len(self._documents)
+        self._idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self._vectors = {key: self._weigh(terms) for key, terms in self._documents.items()}
+
+    def _weigh(self, terms):
+        vector = {term: (1 + math.log(count)) * self._idf.get(term, 0.0) for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def score_columns(self, question):
+        """Return a cosine relevance score for every (table, column) pair."""
+        query = self._weigh(Counter(term for term in tokenize(question) if term in self._idf))
+        return {
+            key: sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            for key, vector in self._vectors.items()
+        }
+
+    def select(self, question, top_k=DEFAULT_TOP_K_TABLES):
+        """Pick the top_k most relevant tables and, within each, the columns worth showing."""
+        scores = self.score_columns(question)
+        table_scores = Counter()
+        for (table_name, _), score in scores.items():
+            table_scores[table_name] += score
+        # Tables with the same columns (latest state vs history) are alternatives: offer only one,
+        # the first listed unless another clearly scores higher.
+        layouts = {table_name: tuple(col["name"] for col in columns) for table_name, columns in self.schemas.items()}
+        chosen = {}
+        for table_name, layout in layouts.items():
+            if layout not in chosen or table_scores[table_name] > VARIANT_MARGIN * table_scores[chosen[layout]]:
+                chosen[layout] = table_name
+        ranked = [
+            table_name for table_name, score in table_scores.most_common()
+            if score > 0 and chosen[layouts[table_name]] == table_name
+        ][:top_k]
+        if not ranked:
+            return dict(self.schemas)
+
+        selected = {}
+        for table_name in ranked:
+            columns = self.schemas[table_name]
+            kept = [
+                col for i, col in enumerate(columns)
+                if i == 0 or col["type"] == "TIMESTAMP" or scores[(table_name, col["name"])] > 0
+            ]
+            selected[table_name] = kept
+        return selected
+
+    def relevant_schema(self, question, top_k=DEFAULT_TOP_K_TABLES):
+        """Render CREATE TABLE statements for only the tables and columns relevant to the question."""
+        return "".join(generate_create_table_sql(self.select(question, top_k)).values())
+
+
+_index = None
+
+
+def select_relevant_schema(question, top_k=DEFAULT_TOP_K_TABLES):
+    """Return pruned schema DDL for the question using a shared index over define_extended_schema."""
+    global _index
+    if _index is None:
+        _index = SchemaRelevanceIndex()
+    return _index.relevant_schema(question, top_k)
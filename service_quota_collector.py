@@ -0,0 +1,268 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ClientError
+from aws_clients import get_client
+from bulk_loader import create_bulk_loader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_REFRESH_INTERVAL = 24 * 3600
+MAX_RETRIES = 8
+
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded", "Throttling"}
+
+QUOTA_COLUMNS = ["service", "quota_name", "quota_value", "used", "unit", "region"]
+
+
+class AdaptiveRateLimiter:
+    """Client-side request pacing that halves its rate on throttling and creeps back up on success."""
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, min_rate=0.5):
+        self.max_rate = requests_per_second
+        self.min_rate = min_rate
+        self.rate = requests_per_second
+        self.throttles = 0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request slot at the current rate."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+
+
+def call_with_backoff(limiter, operation, **kwargs):
+    """Call a boto3 operation through the limiter, retrying throttled calls with jittered exponential backoff."""
+    for attempt in range(MAX_RETRIES):
+        limiter.acquire()
+        try:
+            response = operation(**kwargs)
+            limiter.on_success()
+            return response
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in THROTTLING_ERROR_CODES or attempt == MAX_RETRIES - 1:
+                raise
+            limiter.on_throttle()
+            time.sleep(min(20.0, (2 ** attempt) * 0.1) * random.uniform(0.5, 1.5))
+
+
+def iter_pages(limiter, operation, result_key, **kwargs):
+    """Yield every item of a NextToken-paginated operation, one page in memory at a time."""
+    while True:
+        response = call_with_backoff(limiter, operation, **kwargs)
+        yield from response.get(result_key, [])
+        next_token = response.get("NextToken")
+        if not next_token:
+            return
+        kwargs["NextToken"] = next_token
+
+
+def quota_row(quota, region):
+    """Map a Service Quotas API quota to a quota_details row."""
+    return (
+        quota.get("ServiceCode"),
+        quota.get("QuotaName"),
+        quota.get("Value"),
+        None,  # usage is not part of list_service_quotas
+        quota.get("Unit"),
+        region,
+    )
+
+
+class BatchBuffer:
+    """Thread-safe row buffer that hands full batches to a sink."""
+
+    def __init__(self, sink, batch_size=DEFAULT_BATCH_SIZE):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._rows = []
+        self._lock = threading.Lock()
+        self._sink_lock = threading.Lock()
+
+    def add(self, row):
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) < self.batch_size:
+                return
+            batch, self._rows = self._rows, []
+        self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._rows = self._rows, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._sink_lock:
+            self.sink(batch)
+            self.rows_written += len(batch)
+
+
+class SliceBuffer:
+    """Buffers changed (region, service) slices and replaces them in loads of about batch_size rows.
+
+    Each load deletes exactly its slices (replace_where) before inserting their rows; a slice is
+    never split across loads. A slice's fingerprint is stored only once the load replacing it has
+    committed, so a failed load is simply retried on the next run.
+    """
+
+    def __init__(self, sink, store, batch_size=DEFAULT_BATCH_SIZE):
+        self.sink = sink
+        self.store = store
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._slices = {}
+        self._row_count = 0
+
+    def add(self, region, service_code, rows, fingerprint):
+        self._slices[(region, service_code)] = (rows, fingerprint)
+        self._row_count += len(rows)
+        if self._row_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._slices:
+            return
+        slices, self._slices, self._row_count = self._slices, {}, 0
+        self.sink([row for rows, _ in slices.values() for row in rows], replace_where=slices_condition(slices))
+        for (region, service_code), (rows, fingerprint) in slices.items():
+            self.store.set(f"quota_details:{service_code}", region, fingerprint)
+            self.rows_written += len(rows)
+
+
+def collect_region_service_quotas(session, region, service_code, limiter, buffer):
+    """Stream every quota of one service in one region into the buffer."""
+    client = get_client(session, "service-quotas", region)
+    count = 0
+    for quota in iter_pages(limiter, client.list_service_quotas, "Quotas", ServiceCode=service_code):
+        buffer.add(quota_row(quota, region))
+        count += 1
+    return count
+
+
+def changed_service_quotas(session, region, service_code, limiter, store):
+    """Return (rows, fingerprint) for one service's quotas in one region, or None if unchanged since the last run."""
+    client = get_client(session, "service-quotas", region)
+    rows = [quota_row(quota, region) for quota in
+            iter_pages(limiter, client.list_service_quotas, "Quotas", ServiceCode=service_code)]
+    fingerprint = hashlib.sha256(json.dumps(sorted(rows, key=str), default=str).encode("utf-8")).hexdigest()
+    if store.get(f"quota_details:{service_code}", region) == fingerprint:
+        return None
+    return rows, fingerprint
+
+
+def slices_condition(slices):
+    """A replace_where condition matching the quota_details rows of the given (region, service) slices."""
+    services_by_region = {}
+    for region, service_code in slices:
+        services_by_region.setdefault(region, []).append(service_code)
+    condition = " OR ".join(f"(region = %s AND service IN ({', '.join(['%s'] * len(codes))}))"
+                            for codes in services_by_region.values())
+    params = tuple(value for region, codes in services_by_region.items() for value in (region, *codes))
+    return condition, params
+
+
+def collect_service_quotas(session, regions, sink=None, batch_size=DEFAULT_BATCH_SIZE,
+                           max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                           store=None, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+    """Collect every quota of every service in every region into quota_details, in batches.
+
+    Service codes are enumerated per region with list_services, then each (region, service)
+    pair is paginated on a shared worker pool. Requests are paced per region, since Service
+    Quotas throttles per account and region. Each batch is handed to sink, which defaults to
+    a bulk COPY into quota_details.
+
+    With a watermark store the collection is incremental: regions collected within
+    refresh_interval are skipped outright, and only services whose fingerprint differs from
+    the last run are replaced, batch_size rows at a time through a SliceBuffer.
+    """
+    started = time.perf_counter()
+    if sink is None:
+        sink = create_bulk_loader("quota_details", QUOTA_COLUMNS, s3_client=get_client(session, "s3")).load
+    if store is not None:
+        now = time.time()
+        due = [region for region in regions if now - float(store.get("quota_details", region, 0)) >= refresh_interval]
+        skipped = len(regions) - len(due)
+        regions = due
+    else:
+        skipped = 0
+    limiters = {region: AdaptiveRateLimiter(requests_per_second) for region in regions}
+    buffer = BatchBuffer(sink, batch_size)
+    slices = SliceBuffer(sink, store, batch_size) if store is not None else None
+    failures = []
+
+    def service_codes(region):
+        client = get_client(session, "service-quotas", region)
+        return [service["ServiceCode"] for service in iter_pages(limiters[region], client.list_services, "Services")]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        code_futures = {executor.submit(service_codes, region): region for region in regions}
+        quota_futures = {}
+        for future in as_completed(code_futures):
+            region = code_futures[future]
+            try:
+                codes = future.result()
+            except ClientError as e:
+                logger.error("Error listing services in region %s: %s", region, e)
+                failures.append((region, None, str(e)))
+                continue
+            for code in codes:
+                if store is None:
+                    quota_future = executor.submit(collect_region_service_quotas, session, region, code, limiters[region], buffer)
+                else:
+                    quota_future = executor.submit(changed_service_quotas, session, region, code, limiters[region], store)
+                quota_futures[quota_future] = (region, code)
+        for future in as_completed(quota_futures):
+            region, code = quota_futures[future]
+            try:
+                result = future.result()
+            except ClientError as e:
+                logger.error("Error gathering %s quotas in region %s: %s", code, region, e)
+                failures.append((region, code, str(e)))
+                continue
+            if result is not None:
+                slices.add(region, code, *result)
+    buffer.flush()
+    if store is not None:
+        slices.flush()
+        for region in regions:
+            if not any(failed_region == region for failed_region, _, _ in failures):
+                store.set("quota_details", region, time.time())
+
+    seconds = time.perf_counter() - started
+    records = slices.rows_written if store is not None else buffer.rows_written
+    stats = {
+        "records": records,
+        "regions_skipped": skipped,
+        "seconds": seconds,
+        "records_per_second": records / seconds if seconds else 0.0,
+        "throttles": sum(limiter.throttles for limiter in limiters.values()),
+        "failures": failures,
+    }
+    logger.info("Collected %s service quotas in %.1fs (%.0f records/s)", stats['records'], seconds, stats['records_per_second'])
+    return stats
@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+
+from watermark_store import get_watermark_store
+
+SETUP_STATE_COLLECTOR = "pipeline_setup"
+
+
+def desired_state_fingerprint(**settings):
+    """Stable hash of the settings a setup step applies; any change forces that step to run again.
+
+    The hash is unsalted and stored in the watermark store, so never pass secrets such as passwords.
+    """
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SetupState:
+    """Remembers which desired state was last applied per account and scope (a region, or e.g. "database").
+
+    Fingerprints live in the watermark store, so a restart only re-applies what changed or drifted.
+    """
+
+    def __init__(self, account_id, store=None, force=None):
+        self.account_id = account_id
+        self.store = store or get_watermark_store()
+        self.force = os.getenv("PIPELINE_FORCE_SETUP", "0") == "1" if force is None else force
+        self._collector = f"{SETUP_STATE_COLLECTOR}:{account_id}"
+
+    def is_converged(self, scope, fingerprint, describe_check):
+        """True if fingerprint was applied last time and describe_check() confirms it is still in place."""
+        if self.force or self.store.get(self._collector, scope) != fingerprint:
+            return False
+        # The stored fingerprint only says what was applied; resources can be deleted out of band.
+        return bool(describe_check())
+
+    def record(self, scope, fingerprint):
+        """Mark fingerprint as applied; call only after every step of the scope succeeded."""
+        self.store.set(self._collector, scope, fingerprint)
@@ -0,0 +1,131 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from schema_relevance import tokenize
+from translation_cache import normalize_question
+
+DEFAULT_EXAMPLES_PATH = ".sql_examples.sqlite3"
+DEFAULT_MAX_EXAMPLES = 2000
+DEFAULT_FEW_SHOT_EXAMPLES = 3
+# Below this cosine similarity an example shares little more than filler words with the question.
+MIN_EXAMPLE_SIMILARITY = 0.25
+
+
+class ExampleStore:
+    """Question -> SQL pairs that ran successfully, with a TF-IDF nearest-neighbour lookup.
+
+    Examples are kept per SQL dialect, since SQL verified on DuckDB may not run on Redshift.
+    The index lives in memory and is rebuilt from SQLite on start-up; nothing leaves the host.
+    """
+
+    def __init__(self, path=DEFAULT_EXAMPLES_PATH, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.max_examples = max_examples
+        self._lock = threading.Lock()
+        self._examples = {}  # (dialect, normalized question) -> (question, sql, term counts)
+        self._document_frequency = Counter()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_examples (
+                dialect TEXT NOT NULL,
+                normalized_question TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql_query TEXT NOT NULL,
+                verified_at REAL NOT NULL,
+                PRIMARY KEY (dialect, normalized_question)
+            )
+            """
+        )
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT dialect, normalized_question, question, sql_query FROM sql_examples ORDER BY verified_at"
+        ).fetchall()
+        for dialect, normalized, question, sql_query in rows:
+            self._index((dialect, normalized), question, sql_query)
+
+    def _index(self, key, question, sql_query):
+        previous = self._examples.pop(key, None)
+        if previous is not None:
+            self._document_frequency.subtract(previous[2].keys())
+        terms = Counter(tokenize(question))
+        self._examples[key] = (question, sql_query, terms)
+        self._document_frequency.update(terms.keys())
+
+    def _weigh(self, terms):
+        total = len(self._examples)
+        vector = {
+            term: (1 + math.log(count)) * (math.log((1 + total) / (1 + self._document_frequency[term])) + 1)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def add(self, question, sql_query, dialect):
+        """Remember SQL that answered the question and returned rows, replacing any older example for it."""
+        key = (dialect, normalize_question(question))
+        now = time.time()
+        with self._lock:
+            self._index(key, question, sql_query)
+            self._db.execute(
+                "INSERT OR REPLACE INTO sql_examples VALUES (?, ?, ?, ?, ?)",
+                (dialect, key[1], question, sql_query, now),
+            )
+            while len(self._examples) > self.max_examples:
+                # Dicts keep insertion order and _index re-inserts on update, so the first key is the stalest.
+                stale = next(iter(self._examples))
+                self._document_frequency.subtract(self._examples.pop(stale)[2].keys())
+                self._db.execute(
+                    "DELETE FROM sql_examples WHERE dialect = ? AND normalized_question = ?", stale
+                )
+            self._db.commit()
+
+    def nearest(self, question, dialect, k=DEFAULT_FEW_SHOT_EXAMPLES, min_similarity=MIN_EXAMPLE_SIMILARITY):
+        """Return up to k (similarity, question, sql) examples for the dialect, most similar first."""
+        with self._lock:
+            query = self._weigh(Counter(tokenize(question)))
+            scored = []
+            for (example_dialect, _), (example_question, sql_query, terms) in self._examples.items():
+                if example_dialect != dialect:
+                    continue
+                vector = self._weigh(terms)
+                similarity = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+                if similarity >= min_similarity:
+                    scored.append((similarity, example_question, sql_query))
+        scored.sort(key=lambda example: example[0], reverse=True)
+        return scored[:k]
+
+    def __len__(self):
+        return len(self._examples)
+
+
+def few_shot_prompt(examples):
+    """Render examples as prompt text, or an empty string if there are none."""
+    if not examples:
+        return ""
+    lines = ["Examples of questions and SQL that ran successfully on this database:"]
+    for _similarity, question, sql_query in examples:
+        lines.append(f"Question: {question}")
+        lines.append(f"SQL: {' '.join(sql_query.split())}")
+    return "\n    ".join(lines)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_example_store():
+    """Return the process-wide example store, or None if disabled via SQL_EXAMPLES_ENABLED=0."""
+    global _store
+    if os.getenv("SQL_EXAMPLES_ENABLED", "1") == "0":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ExampleStore(
+                path=os.getenv("SQL_EXAMPLES_PATH", DEFAULT_EXAMPLES_PATH),
+                max_examples=int(os.getenv("SQL_EXAMPLES_MAX", DEFAULT_MAX_EXAMPLES)),
+            )
+        return _store
@@ -0,0 +1,246 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from aws_config_schema_design import define_extended_schema
+from query_backends import get_query_backend
+
+DEFAULT_MAX_ROWS = 1000
+DEFAULT_MAX_COST = 5e7
+DEFAULT_PLAN_CACHE_SIZE = 512
+DEFAULT_PLAN_CACHE_TTL = 600
+
+WIDE_COLUMN_TYPES = ("JSON", "TEXT", "SUPER")
+
+# Statements and clauses that write, change session state or move data out of the warehouse.
+FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "DROP", "ALTER", "CREATE", "TRUNCATE", "GRANT", "REVOKE",
+    "COPY", "UNLOAD", "VACUUM", "ANALYZE", "CALL", "EXECUTE", "SET", "RESET", "LOCK", "INTO",
+}
+
+# Question words that mean the user does want to see a wide column.
+WIDE_COLUMN_HINTS = {
+    "configuration": ("config", "configuration", "setting", "detail", "instance type", "instancetype", "state", "json"),
+    "tags": ("tag", "label", "owner", "env"),
+    "message": ("message", "log", "error", "exception", "text", "content"),
+    "description": ("description", "describe"),
+}
+
+_TOKEN_PATTERN = re.compile(
+    r"""(?P<comment>--[^\n]*|/\*.*?\*/)
+      |(?P<string>'(?:[^']|'')*')
+      |(?P<ident>"(?:[^"]|"")*")
+      |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+      |(?P<number>\d+(?:\.\d+)?)
+      |(?P<symbol>[(),;*])
+      |(?P<other>\S)""",
+    re.DOTALL | re.VERBOSE,
+)
+_COST_PATTERN = re.compile(r"cost=[\d.]+\.\.([\d.]+)")
+
+GuardedSQL = namedtuple("GuardedSQL", ["sql", "count_sql", "row_limit"])
+GuardedSQL.__doc__ = """SQL ready to run. If the guardrail added or lowered its LIMIT, row_limit is that cap and
+count_sql the query as written, whose row count is the true number of matching rows; both are None otherwise."""
+
+
+class QueryRejected(Exception):
+    """Raised when generated SQL is unsafe or too expensive to run."""
+
+    def __init__(self, reason, sql_query=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.sql_query = sql_query
+
+
+def tokenize_sql(sql_query):
+    """Split SQL into (kind, text, leading whitespace) tokens, dropping comments."""
+    tokens = []
+    end = 0
+    for match in _TOKEN_PATTERN.finditer(sql_query):
+        gap = sql_query[end:match.start()]
+        end = match.end()
+        if match.lastgroup == "comment":
+            continue
+        prefix = gap if not gap.strip() else " "
+        tokens.append((match.lastgroup, match.group(), prefix))
+    return tokens
+
+
+def strip_markdown(sql_query):
+    """Remove the ```sql fences models like to wrap their answer in."""
+    sql_query = sql_query.strip()
+    fenced = re.match(r"^```(?:sql)?\s*(.*?)\s*```$", sql_query, re.DOTALL | re.IGNORECASE)
+    return fenced.group(1) if fenced else sql_query
+
+
+def single_statement(tokens):
+    """Return the tokens of the only statement, rejecting stacked statements."""
+    statements = [[]]
+    for token in tokens:
+        if token[:2] == ("symbol", ";"):
+            statements.append([])
+        else:
+            statements[-1].append(token)
+    statements = [statement for statement in statements if statement]
+    if not statements:
+        raise QueryRejected("The model did not return a SQL statement.")
+    if len(statements) > 1:
+        raise QueryRejected(f"Only one statement may run per question; got {len(statements)}.")
+    return statements[0]
+
+
+def check_read_only(tokens):
+    """Reject anything that is not a plain SELECT (optionally with CTEs)."""
+    first = tokens[0][1].upper()
+    if first not in ("SELECT", "WITH"):
+        raise QueryRejected(f"Only read-only SELECT queries are allowed, not {first}.")
+    for kind, text, _ in tokens:
+        if kind == "word" and text.upper() in FORBIDDEN_KEYWORDS:
+            raise QueryRejected(f"Read-only queries may not use {text.upper()}.")
+
+
+def _top_level(tokens):
+    """Yield (index, kind, text) for tokens outside any parentheses."""
+    depth = 0
+    for i, (kind, text, _) in enumerate(tokens):
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0:
+            yield i, kind, text
+
+
+def enforce_limit(tokens, max_rows):
+    """Add a LIMIT to the outer query, or lower one that exceeds max_rows.
+
+    Returns (tokens, capped); capped is False when the query's own LIMIT was already within max_rows.
+    """
+    tokens = list(tokens)
+    top = list(_top_level(tokens))
+    for position, (i, kind, text) in enumerate(top):
+        if kind == "word" and text.upper() == "LIMIT" and position + 1 < len(top):
+            value_index, value_kind, value = top[position + 1]
+            # Also replaces LIMIT ALL / LIMIT NULL.
+            if value_kind != "number" or float(value) > max_rows:
+                tokens[value_index] = ("number", str(max_rows), tokens[value_index][2])
+                return tokens, True
+            return tokens, False
+    return tokens + [("word", "LIMIT", " "), ("number", str(max_rows), " ")], True
+
+
+def project_wide_columns(tokens, question, schemas):
+    """Replace a top-level SELECT * over one table with its columns, minus wide ones the question did not ask for."""
+    top = list(_top_level(tokens))
+    words = [(i, text.upper()) for i, kind, text in top if kind in ("word", "symbol")]
+    if len(words) < 4 or words[0][1] != "SELECT" or words[1][1] != "*" or words[2][1] != "FROM":
+        return tokens
+    table_index = words[3][0]
+    table_name = tokens[table_index][1].strip('"').lower()
+    if table_name not in schemas:
+        return tokens
+    if any(text == "," or text.upper() == "JOIN" for _, text in words[4:]):
+        return tokens
+
+    question = question.lower()
+    kept = []
+    for col in schemas[table_name]:
+        is_wide = col["type"].upper().startswith(WIDE_COLUMN_TYPES)
+        wanted = any(hint in question for hint in WIDE_COLUMN_HINTS.get(col["name"], (col["name"],)))
+        if not is_wide or wanted:
+            kept.append(col["name"])
+    if len(kept) == len(schemas[table_name]):
+        return tokens
+    star_index = words[1][0]
+    return tokens[:star_index] + [("word", ", ".join(kept), tokens[star_index][2])] + tokens[star_index + 1:]
+
+
+def render_sql(tokens):
+    """Join tokens back into SQL text, keeping the original spacing."""
+    return "".join(prefix + text for _, text, prefix in tokens).strip()
+
+
+def normalize_sql(sql_query):
+    """Whitespace- and case-insensitive key for caching plans."""
+    return "".join(
+        (" " if prefix else "") + (text if kind in ("string", "ident") else text.lower())
+        for kind, text, prefix in tokenize_sql(sql_query)
+    ).strip()
+
+
+class PlanCostCache:
+    """Caches EXPLAIN cost estimates per normalized SQL so repeated questions skip the planner round trip."""
+
+    def __init__(self, max_entries=DEFAULT_PLAN_CACHE_SIZE, ttl_seconds=DEFAULT_PLAN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cost(self, sql_query):
+        key = normalize_sql(sql_query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        cost = explain_cost(sql_query)
+        with self._lock:
+            self._entries[key] = (cost, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cost
+
+
+def explain_cost(sql_query):
+    """Return the planner's total cost estimate for the query."""
+    plan = get_query_backend().explain(sql_query)
+    match = _COST_PATTERN.search(plan)
+    return float(match.group(1)) if match else 0.0
+
+
+_plan_cache = PlanCostCache()
+_schemas = None
+
+
+def guard_sql(sql_query, question="", max_rows=None, max_cost=None, check_cost=None):
+    """Validate and rewrite generated SQL before it reaches the warehouse.
+
+    Enforces a single read-only statement, projects away wide JSON/TEXT columns the
+    question did not ask for, caps the outer LIMIT, and rejects queries whose EXPLAIN
+    cost exceeds max_cost. Returns a GuardedSQL; raises QueryRejected with the reason.
+    """
+    global _schemas
+    if _schemas is None:
+        _schemas = define_extended_schema()
+    max_rows = max_rows or int(os.getenv("SQL_MAX_ROWS", DEFAULT_MAX_ROWS))
+    max_cost = max_cost or float(os.getenv("SQL_MAX_COST", DEFAULT_MAX_COST))
+    if check_cost is None:
+        # Embedded backends have no cost model to budget against.
+        check_cost = os.getenv("SQL_EXPLAIN_ENABLED", "1") != "0" and get_query_backend().supports_cost_estimates
+
+    tokens = single_statement(tokenize_sql(strip_markdown(sql_query)))
+    check_read_only(tokens)
+    tokens = project_wide_columns(tokens, question, _schemas)
+    limited, capped = enforce_limit(tokens, max_rows)
+    guarded_sql = render_sql(limited)
+
+    if check_cost:
+        cost = _plan_cache.cost(guarded_sql)
+        if cost > max_cost:
+            raise QueryRejected(
+                f"Estimated cost {cost:,.0f} exceeds the budget of {max_cost:,.0f}; "
+                "narrow the query with a filter on time, region or resource type.",
+                guarded_sql,
+            )
+    if capped:
+        return GuardedSQL(guarded_sql, render_sql(tokens), max_rows)
+    return GuardedSQL(guarded_sql, None, None)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def duckdb_backend(monkeypatch, tmp_path):
+    """The process-wide query backend as an empty in-memory DuckDB database with the schema's tables."""
+    import query_backends
+
+    monkeypatch.setenv("QUERY_BACKEND", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", ":memory:")
+    monkeypatch.setattr(query_backends, "_backend", None)
+    backend = query_backends.get_query_backend()
+    yield backend
+    backend.close()
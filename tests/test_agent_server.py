@@ -0,0 +1,86 @@
+import socket
+import threading
+
+import pytest
+
+from agent_server import MAX_QUESTION_BYTES, QueryService, create_server
+from query_scheduler import current_query_context
+
+
+@pytest.fixture
+def server():
+    server = create_server(port=0, service=object())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, content_length, body=b""):
+    """Send one POST /query on a kept-alive connection; returns (status line, whether the server closed it)."""
+    with socket.create_connection(server.server_address[:2], timeout=5) as conn:
+        conn.sendall(b"POST /query HTTP/1.1\r\nHost: test\r\nConnection: keep-alive\r\n"
+                     b"Content-Length: " + content_length.encode() + b"\r\n\r\n" + body)
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = conn.recv(4096)
+            assert chunk, "connection closed without a response"
+            response += chunk
+        headers, _, payload = response.partition(b"\r\n\r\n")
+        length = int(next(line.split(b":")[1] for line in headers.split(b"\r\n")
+                          if line.lower().startswith(b"content-length")))
+        while len(payload) < length:
+            chunk = conn.recv(4096)
+            assert chunk, "connection closed mid-response"
+            payload += chunk
+        conn.settimeout(1)
+        try:
+            closed = conn.recv(1) == b""
+        except socket.timeout:
+            closed = False
+        return headers.split(b"\r\n")[0].decode(), closed
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5"])
+def test_invalid_content_length_is_a_bad_request(server, content_length):
+    status, closed = post(server, content_length)
+    assert status == "HTTP/1.1 400 Bad Request"
+    assert closed
+
+
+def test_oversized_request_closes_the_connection(server):
+    status, closed = post(server, str(MAX_QUESTION_BYTES + 1), b"x" * 64)
+    assert status == "HTTP/1.1 413 Request Entity Too Large"
+    assert closed
+
+
+def test_empty_question_keeps_the_connection(server):
+    status, closed = post(server, "2", b"{}")
+    assert status == "HTTP/1.1 400 Bad Request"
+    assert not closed
+
+
+def test_identical_questions_share_a_run_only_within_a_user():
+    release = threading.Event()
+    users = []
+
+    def answer(question):
+        users.append(current_query_context().user)
+        release.wait(5)
+        return "42"
+
+    service = QueryService(workers=2, answer=answer)
+    first, _, _ = service.submit("How many instances?", "a", "alice")
+    joined, _, coalesced = service.submit("how many instances", "b", "alice")
+    assert joined is first and coalesced
+    other, _, coalesced = service.submit("How many instances?", "c", "bob")
+    assert other is not first and not coalesced
+
+    # Alice's callers giving up cancels only her run; Bob's keeps going under his own context.
+    service.abandon("How many instances?", first, "alice")
+    service.abandon("How many instances?", first, "alice")
+    release.set()
+    assert other.result(timeout=5) == "42"
+    assert "bob" in users
+    assert service.snapshot()["abandoned"] == 1
@@ -0,0 +1,116 @@
+import datetime
+import json
+
+import automation_script
+
+TODAY = datetime.datetime.now(datetime.timezone.utc).date()
+IMAGES = [
+    {"ImageId": "ami-old", "CreationDate": f"{TODAY - datetime.timedelta(days=400)}T08:00:00.000Z"},
+    {"ImageId": "ami-new", "CreationDate": f"{TODAY}T08:00:00.000Z"},
+]
+
+
+class FakeEC2:
+    """describe_images over IMAGES, honouring creation-date day wildcards like EC2 does."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, Owners, Filters=()):
+        self.requests.append(Filters)
+        images = IMAGES
+        for image_filter in Filters:
+            prefixes = [value.rstrip("*") for value in image_filter["Values"]]
+            images = [image for image in images if image["CreationDate"].startswith(tuple(prefixes))]
+        yield {"Images": images}
+
+
+class FakeSSM:
+    class exceptions:
+        class ParameterNotFound(Exception):
+            pass
+
+    def __init__(self):
+        self.parameters = {}
+        self.writes = 0
+
+    def get_parameter(self, Name):
+        if Name not in self.parameters:
+            raise self.exceptions.ParameterNotFound(Name)
+        return {"Parameter": {"Value": self.parameters[Name]}}
+
+    def put_parameter(self, Name, Value, Type, Overwrite):
+        self.parameters[Name] = Value
+        self.writes += 1
+
+
+def test_second_run_without_new_images_filters_by_date_and_writes_nothing(monkeypatch):
+    clients = {"ec2": FakeEC2(), "ssm": FakeSSM()}
+    monkeypatch.setattr(automation_script.boto3, "client", lambda service: clients[service])
+
+    first = json.loads(automation_script.ami_collector_handler({}, None))
+    assert [image["ImageId"] for image in first] == ["ami-old", "ami-new"]
+    assert clients["ssm"].writes == 1
+    assert clients["ec2"].requests[0] == ()
+
+    second = json.loads(automation_script.ami_collector_handler({}, None))
+    assert second == []
+    assert clients["ssm"].writes == 1
+    assert clients["ec2"].requests[1] == [{"Name": "creation-date", "Values": [f"{TODAY}*"]}]
+
+
+def test_inline_lambda_code_defines_the_handler():
+    namespace = {}
+    exec(compile(automation_script.ami_collector_source(), "index.py", "exec"), namespace)
+    assert namespace["handler"].__doc__ == automation_script.ami_collector_handler.__doc__
+
+
+class FakeServiceQuotas:
+    """Two services, the first with its quotas split over two pages."""
+
+    PAGES = {
+        ("ec2", None): {"Quotas": [{"ServiceCode": "ec2", "QuotaName": "Running instances", "Value": 64.0}],
+                        "NextToken": "page-2"},
+        ("ec2", "page-2"): {"Quotas": [{"ServiceCode": "ec2", "QuotaName": "Elastic IPs", "Value": 5.0}]},
+        ("s3", None): {"Quotas": [{"ServiceCode": "s3", "QuotaName": "Buckets", "Value": 100.0}]},
+    }
+
+    def list_services(self, **kwargs):
+        return {"Services": [{"ServiceCode": "ec2"}, {"ServiceCode": "s3"}]}
+
+    def list_service_quotas(self, ServiceCode, NextToken=None):
+        return self.PAGES[(ServiceCode, NextToken)]
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body.decode("utf-8")
+
+
+def test_quota_lambda_pages_through_every_service_and_writes_batches(monkeypatch):
+    s3 = FakeS3()
+    clients = {"service-quotas": FakeServiceQuotas(), "s3": s3}
+    monkeypatch.setattr(automation_script.boto3, "client", lambda service: clients[service])
+    monkeypatch.setattr(automation_script, "DEFAULT_BATCH_SIZE", 2)
+    monkeypatch.setenv("QUOTA_BUCKET", "config-bucket")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+
+    result = json.loads(automation_script.quota_collector_handler({}, None))
+    assert result["records"] == 3
+    assert len(result["objects"]) == 2
+    rows = [json.loads(line) for body in s3.objects.values() for line in body.splitlines()]
+    assert sorted(row["quota_name"] for row in rows) == ["Buckets", "Elastic IPs", "Running instances"]
+    assert {row["region"] for row in rows} == {"us-east-1"}
+
+
+def test_inline_quota_lambda_code_defines_the_handler():
+    namespace = {}
+    exec(compile(automation_script.quota_collector_source(), "index.py", "exec"), namespace)
+    assert namespace["handler"].__doc__ == automation_script.quota_collector_handler.__doc__
+    assert "NextToken" in namespace["iter_pages"].__code__.co_consts
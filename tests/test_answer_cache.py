@@ -0,0 +1,22 @@
+from answer_renderer import AnswerCache
+
+SQL = "SELECT log_group, COUNT(*) FROM cloudwatch_logs WHERE log_group = 'g' GROUP BY 1"
+DATA = "log_group,count\ng,5000"
+
+
+def test_same_question_and_data_hits(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite3"))
+    cache.put("Why are there so many logs in g?", SQL, DATA, "Because g is chatty.")
+    assert cache.get("why are there so many logs in g", SQL, DATA) == "Because g is chatty."
+
+
+def test_different_question_with_the_same_sql_misses(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite3"))
+    cache.put("Why are there so many logs in g?", SQL, DATA, "Because g is chatty.")
+    assert cache.get("Should I be worried about log volume in g?", SQL, DATA) is None
+
+
+def test_changed_data_misses(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite3"))
+    cache.put("Why are there so many logs in g?", SQL, DATA, "Because g is chatty.")
+    assert cache.get("Why are there so many logs in g?", SQL, "log_group,count\ng,5001") is None
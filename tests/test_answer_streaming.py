@@ -0,0 +1,76 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+import natural_language_query_agent as agent
+from answer_renderer import QueryResult
+
+CHUNKS = ["\n\nThere are", " two", " running", " instances."]
+
+
+class StreamingCompletions(BaseHTTPRequestHandler):
+    """Server-sent completion chunks like the API's stream=True; holds the rest until release is set."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        # Chunked like the real API, so each event reaches the client as soon as it is sent.
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, text in enumerate(CHUNKS):
+            if i == 1 and not self.server.release.wait(10):
+                return
+            self.send_event(json.dumps({"object": "text_completion", "choices": [{"text": text, "index": 0}]}))
+        self.send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send_event(self, data):
+        event = f"data: {data}\n\n".encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    """A local streaming completions endpoint the openai client talks to instead of the API."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StreamingCompletions)
+    server.requests = []
+    server.release = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openai, "api_base", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(openai, "api_key", "test")
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_first_token_is_yielded_before_the_model_finishes(completions, monkeypatch):
+    remembered = []
+    monkeypatch.setattr(agent, "get_prompt_schema", lambda user_query: "CREATE TABLE t (n INT)")
+    monkeypatch.setattr(agent, "generate_sql_query", lambda user_query, schema: "SELECT n FROM t")
+    monkeypatch.setattr(agent, "fetch_with_repair",
+                        lambda user_query, schema, sql: QueryResult(sql, ["n"], [(2,)], "n\n2"))
+    monkeypatch.setattr(agent, "answer_without_model", lambda user_query, result: None)
+    monkeypatch.setattr(agent, "remember_answer", lambda user_query, result, answer: remembered.append(answer))
+
+    pieces = agent.process_user_query_stream("How many instances are running?")
+    # The endpoint has sent only the first chunk and is holding the rest of the answer.
+    assert next(pieces) == "There are"
+    assert not remembered
+    completions.release.set()
+    assert "There are" + "".join(pieces) == "There are two running instances."
+    assert remembered == ["There are two running instances."]
+    assert completions.requests == ["/v1/engines/text-davinci-002/completions"]
+
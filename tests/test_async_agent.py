@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+import natural_language_query_agent as agent
+from answer_renderer import QueryResult
+
+
+@pytest.fixture
+def stubbed_agent(monkeypatch, duckdb_backend):
+    """The agent with its model and warehouse calls replaced; records which thread ran each call."""
+    calls = []
+    database_error = duckdb_backend.Error
+
+    def record(name, value=None):
+        def call(*args):
+            calls.append((name, threading.current_thread() is threading.main_thread()))
+            return value
+        return call
+
+    def guard_and_fetch(user_query, schema, sql_query):
+        calls.append(("guard_and_fetch", threading.current_thread() is threading.main_thread()))
+        if sql_query == "SELECT broken":
+            raise database_error("no such column: broken")
+        return QueryResult(sql_query, ["n"], [(1,)], "n\n1")
+
+    monkeypatch.setattr(agent, "get_prompt_schema", record("get_prompt_schema", "CREATE TABLE t (n INT)"))
+    monkeypatch.setattr(agent, "generate_sql_query", record("generate_sql_query", "SELECT broken"))
+    monkeypatch.setattr(agent, "repair_sql_query", record("repair_sql_query", "SELECT n FROM t"))
+    monkeypatch.setattr(agent, "guard_and_fetch", guard_and_fetch)
+    monkeypatch.setattr(agent, "forget_translation", record("forget_translation"))
+    monkeypatch.setattr(agent, "remember_verified_sql", record("remember_verified_sql"))
+    monkeypatch.setattr(agent, "answer_without_model", record("answer_without_model"))
+    monkeypatch.setattr(agent, "query_gemini", record("query_gemini", "One."))
+    monkeypatch.setattr(agent, "remember_answer", record("remember_answer"))
+    return calls
+
+
+def test_async_path_repairs_like_the_sync_path_without_blocking_the_loop(stubbed_agent):
+    assert asyncio.run(agent.process_user_query_async("How many?")) == "One."
+    async_calls = list(stubbed_agent)
+    assert not [name for name, on_loop in async_calls if on_loop]
+
+    stubbed_agent.clear()
+    assert agent.process_user_query("How many?") == "One."
+    assert [name for name, _ in stubbed_agent] == [name for name, _ in async_calls] == [
+        "get_prompt_schema", "generate_sql_query", "guard_and_fetch", "forget_translation", "repair_sql_query",
+        "guard_and_fetch", "remember_verified_sql", "answer_without_model", "query_gemini", "remember_answer",
+    ]
+
+
+def test_repairs_give_up_after_the_configured_attempts(stubbed_agent, monkeypatch, duckdb_backend):
+    monkeypatch.setattr(agent, "repair_sql_query", lambda *args: "SELECT broken")
+    monkeypatch.setattr(agent, "SQL_REPAIR_ATTEMPTS", 1)
+    with pytest.raises(duckdb_backend.Error):
+        asyncio.run(agent.process_user_query_async("How many?"))
+    assert [name for name, _ in stubbed_agent].count("guard_and_fetch") == 2
+
+
+def test_repeated_event_loops_share_one_worker_pool(stubbed_agent):
+    async def pool():
+        await agent.process_user_query_async("How many?")
+        return agent._default_limits().executor
+
+    pools = {asyncio.run(pool()) for _ in range(3)}
+    assert len(pools) == 1
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import Counter
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from moto import mock_aws
+
+import aws_clients
+from aws_config_pipeline import enable_aws_config
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """A boto3 session against moto that counts the clients it creates, per (service, region)."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        session = boto3.Session(region_name="us-east-1")
+        session.created = Counter()
+        create_client = session.client
+
+        def client(service, region_name=None, **kwargs):
+            session.created[service, region_name] += 1
+            return create_client(service, region_name=region_name, **kwargs)
+
+        session.client = client
+        yield session
+
+
+def test_clients_are_created_once_per_service_and_region(session):
+    assert aws_clients.get_client(session, "config", "us-west-2") is aws_clients.get_client(session, "config", "us-west-2")
+    assert aws_clients.get_client(session, "config", "us-east-1") is not aws_clients.get_client(session, "config", "us-west-2")
+    assert session.created == {("config", "us-west-2"): 1, ("config", "us-east-1"): 1}
+
+    # Another session gets its own clients.
+    other = boto3.Session(region_name="us-east-1")
+    assert aws_clients.get_client(other, "config", "us-west-2") is not aws_clients.get_client(session, "config", "us-west-2")
+
+
+def test_account_id_is_looked_up_once_per_session(session):
+    sts = aws_clients.get_client(session, "sts")
+    # A slow STS call, so the threads below all ask while the first lookup is in flight.
+    sts.meta.events.register("before-call.*.*", lambda **kwargs: time.sleep(0.2))
+    with Stubber(sts) as stubber:
+        # A second GetCallerIdentity would find no queued response and fail.
+        stubber.add_response("get_caller_identity", {
+            "Account": "123456789012", "UserId": "AIDAEXAMPLE", "Arn": "arn:aws:iam::123456789012:user/setup"})
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(aws_clients.get_account_id(session)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.append(aws_clients.get_account_id(session))
+        stubber.assert_no_pending_responses()
+    assert results == ["123456789012"] * 5
+
+
+def test_setup_steps_reuse_clients_and_account_id_across_calls(session):
+    for region in ("us-west-2", "us-east-1"):
+        config = boto3.client("config", region_name=region)
+        config.put_configuration_recorder(
+            ConfigurationRecorder={"name": "default", "roleARN": "arn:aws:iam::123456789012:role/config"})
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=f"config-{region}")
+        config.put_delivery_channel(DeliveryChannel={"name": "default", "s3BucketName": f"config-{region}"})
+
+    for _ in range(2):
+        for region in ("us-west-2", "us-east-1"):
+            assert enable_aws_config(session, region)
+
+    assert session.created == {("config", "us-west-2"): 1, ("config", "us-east-1"): 1, ("sts", None): 1}
+    recorder = aws_clients.get_client(session, "config", "us-west-2").describe_configuration_recorders()
+    assert recorder["ConfigurationRecorders"][0]["roleARN"].startswith("arn:aws:iam::123456789012:role/aws-service-role/")
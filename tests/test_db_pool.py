@@ -0,0 +1,124 @@
+import threading
+
+import psycopg2
+import pytest
+
+import db_pool
+from db_pool import PoolTimeoutError, RedshiftConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.statements.append(sql)
+        if sql == "SELECT 1" and self.conn.on_health_check:
+            self.conn.on_health_check()
+
+    def fetchone(self):
+        return (1,)
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection to stand in for Postgres."""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = psycopg2.extensions.STATUS_READY
+        self.statements = []
+        self.on_health_check = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(db_pool.psycopg2, "connect", connect)
+    return opened
+
+
+def test_connections_are_reused(connections):
+    pool = RedshiftConnectionPool(min_size=0, max_size=2)
+    for _ in range(3):
+        with pool.connection() as conn:
+            assert conn is connections[0]
+    assert len(connections) == 1
+    metrics = pool.metrics()
+    assert (metrics["hits"], metrics["misses"]) == (2, 1)
+
+
+def test_checkouts_wait_at_max_size(connections):
+    pool = RedshiftConnectionPool(min_size=0, max_size=2, checkout_timeout=0.05)
+    first, second = pool.getconn(), pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    pool.putconn(first)
+    assert pool.getconn() is first
+    assert len(connections) == 2
+    assert pool.metrics()["timeouts"] == 1
+
+
+def test_broken_connections_are_discarded(connections):
+    pool = RedshiftConnectionPool(min_size=1, max_size=2, health_check_interval=0)
+    stale = connections[0]
+    stale.broken = True
+    with pool.connection() as conn:
+        assert conn is not stale
+    assert stale.closed
+    metrics = pool.metrics()
+    assert metrics["health_check_failures"] == 1
+    assert metrics["size"] == 1
+
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as failing:
+            failing.broken = True
+            failing.cursor().execute("SELECT * FROM quota_details")
+    assert failing.closed
+    assert pool.metrics()["size"] == 0
+
+
+def test_health_checks_do_not_hold_the_pool_lock(connections):
+    pool = RedshiftConnectionPool(min_size=1, max_size=2, health_check_interval=0)
+    acquired = []
+
+    def check_lock():
+        locked = pool._cond.acquire(timeout=1)
+        acquired.append(locked)
+        if locked:
+            pool._cond.release()
+
+    def health_check():
+        probe = threading.Thread(target=check_lock)
+        probe.start()
+        probe.join()
+
+    connections[0].on_health_check = health_check
+    pool.getconn()
+    assert acquired == [True]
@@ -0,0 +1,89 @@
+import os
+
+import psycopg2
+import pytest
+
+from db_pool import RedshiftConnectionPool, stream_query
+
+# A libpq connection string for a scratch Postgres database, e.g. "dbname=test user=postgres host=localhost".
+TEST_POSTGRES_DSN = os.getenv("TEST_POSTGRES_DSN")
+
+
+@pytest.fixture
+def dsn():
+    """The scratch database's DSN; skips the test when no Postgres server is reachable."""
+    if not TEST_POSTGRES_DSN:
+        pytest.skip("TEST_POSTGRES_DSN is not set")
+    try:
+        psycopg2.connect(TEST_POSTGRES_DSN).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    return TEST_POSTGRES_DSN
+
+
+@pytest.fixture
+def pool(dsn):
+    pool = RedshiftConnectionPool(min_size=0, max_size=2, health_check_interval=0,
+                                  statement_timeout_ms=200, dsn=dsn)
+    yield pool
+    pool.close()
+
+
+def show_statement_timeout(conn):
+    with conn.cursor() as cur:
+        cur.execute("SHOW statement_timeout")
+        return cur.fetchone()[0]
+
+
+def test_statement_timeout_cancels_long_queries_and_per_checkout_overrides_are_undone(pool):
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(2)")
+
+    with pool.connection(statement_timeout_ms=5000) as conn:
+        assert show_statement_timeout(conn) == "5s"
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_sleep(0.5)")
+
+    # The same connection comes back with the pool's own timeout.
+    with pool.connection() as again:
+        assert again is conn
+        assert show_statement_timeout(again) == "200ms"
+    assert pool.metrics()["connections_created"] == 1
+
+
+def test_streams_read_a_batch_at_a_time_and_count_the_rest_server_side(pool):
+    sql = "SELECT n FROM generate_series(1, 1000) AS n ORDER BY n"
+    stream = stream_query(sql, batch_size=100, connection=pool.connection)
+    rows = iter(stream)
+    assert [next(rows)[0] for _ in range(150)] == list(range(1, 151))
+    assert stream.columns == ["n"]
+    assert stream.total_row_count() == 1000
+    assert pool.metrics()["in_use"] == 0
+
+    capped = stream_query(sql + " LIMIT 10", connection=pool.connection, count_sql=sql, row_limit=10)
+    assert len(list(capped)) == 10
+    assert capped.total_row_count() == 1000
+
+
+def test_health_check_replaces_a_connection_the_server_terminated(pool, dsn):
+    with pool.connection() as conn:
+        pid = conn.get_backend_pid()
+
+    admin = psycopg2.connect(dsn)
+    try:
+        with admin.cursor() as cur:
+            cur.execute("SELECT pg_terminate_backend(%s)", (pid,))
+            assert cur.fetchone()[0]
+    finally:
+        admin.close()
+
+    with pool.connection() as fresh:
+        assert fresh.get_backend_pid() != pid
+        with fresh.cursor() as cur:
+            cur.execute("SELECT 1")
+            assert cur.fetchone() == (1,)
+    stats = pool.metrics()
+    assert stats["health_check_failures"] == 1
+    assert stats["connections_created"] == 2
@@ -0,0 +1,16 @@
+from intent_router import IntentRouter
+
+ROUTER = IntentRouter({"region": ["us-east-1"], "quota_service": ["AmazonEC2", "AWSLambda"]})
+
+
+def test_quota_questions_list_limits():
+    routed = ROUTER.route("Show lambda quotas in us-east-1")
+    assert routed.intent == "quota_limits"
+    assert routed.sql == ("SELECT quota_name, region, quota_value, unit FROM quota_details "
+                          "WHERE service = 'AWSLambda' AND region = 'us-east-1' ORDER BY quota_name, region")
+
+
+def test_quota_usage_questions_go_to_the_model():
+    # quota_details.used is never collected, so a template could not answer these.
+    assert ROUTER.route("Quota usage for ec2") is None
+    assert ROUTER.route("What is the ec2 quota utilization?") is None
@@ -0,0 +1,36 @@
+from aws_config_schema_design import hot_path_unextracted_sql
+from incremental_collectors import config_item_row
+from latest_state import HISTORY_TABLE, LATEST_TABLE, refresh_latest_resources
+from watermark_store import WatermarkStore
+
+
+def insert_streamed(backend, resource_id, capture_time, status, configuration):
+    """A row as Firehose delivers it: status column set, sidecar columns left empty."""
+    backend.execute(
+        f"INSERT INTO {HISTORY_TABLE} (resource_id, resource_type, region, configuration, tags, capture_time, status) "
+        "VALUES (?, 'AWS::EC2::Instance', 'us-east-1', ?, '{}', ?, ?)",
+        (resource_id, configuration, capture_time, status),
+    )
+
+
+def test_streamed_deletions_remove_latest_rows_and_backfill_runs_once(duckdb_backend, tmp_path):
+    store = WatermarkStore(str(tmp_path / "watermarks.sqlite3"))
+    insert_streamed(duckdb_backend, "i-1", "2026-01-01 00:00:00", "OK", '{"instanceType": "t3.large"}')
+    insert_streamed(duckdb_backend, "i-2", "2026-01-01 00:00:00", "OK", '{}')
+    refresh_latest_resources(store)
+    assert duckdb_backend.execute(f"SELECT resource_id, instance_type FROM {LATEST_TABLE} ORDER BY 1") == [
+        ("i-1", "t3.large"), ("i-2", None)]
+    pending = f"SELECT COUNT(*) FROM {HISTORY_TABLE} WHERE {hot_path_unextracted_sql('duckdb')}"
+    assert duckdb_backend.execute(pending) == [(0,)]
+
+    insert_streamed(duckdb_backend, "i-1", "2026-01-02 00:00:00", "ResourceDeleted", '{}')
+    stats = refresh_latest_resources(store)
+    assert stats["deleted"] == 1
+    assert duckdb_backend.execute(f"SELECT resource_id FROM {LATEST_TABLE}") == [("i-2",)]
+
+
+def test_pulled_config_items_carry_their_status():
+    row = config_item_row({"resourceId": "i-1", "configurationItemStatus": "ResourceDeleted",
+                           "configuration": {"instanceType": "t3.large"}}, "us-east-1")
+    assert row[6] == "ResourceDeleted"
+    assert "configurationItemStatus" not in row[3]
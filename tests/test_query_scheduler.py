@@ -0,0 +1,72 @@
+from contextlib import ExitStack, contextmanager
+
+import pytest
+
+from query_scheduler import DEFAULT_USER, QueryContext, QueryScheduler, QueueTimeout
+
+
+def hold(scheduler, stack, user, count):
+    for _ in range(count):
+        stack.enter_context(scheduler.admit(QueryContext(user, "batch")))
+
+
+def test_per_user_limit_queues_a_users_extra_queries():
+    scheduler = QueryScheduler(max_concurrency=8, max_per_user=2, queue_timeout=0.05)
+    with ExitStack() as stack:
+        hold(scheduler, stack, "etl", 2)
+        with pytest.raises(QueueTimeout):
+            hold(scheduler, stack, "etl", 1)
+        hold(scheduler, stack, "analyst", 1)
+
+
+def test_unattributed_work_is_only_bound_by_the_global_limit():
+    scheduler = QueryScheduler(max_concurrency=8, max_per_user=2, interactive_reserved=2, queue_timeout=0.05)
+    with ExitStack() as stack:
+        hold(scheduler, stack, DEFAULT_USER, 6)
+        assert scheduler.running_queries()["batch"] == 6
+        with pytest.raises(QueueTimeout):
+            hold(scheduler, stack, DEFAULT_USER, 1)
+
+
+def test_redshift_user_queries_are_scheduled_and_maintenance_is_not(monkeypatch):
+    import query_backends
+
+    used = []
+
+    @contextmanager
+    def borrow(kind):
+        used.append(kind)
+        yield FakeConnection()
+
+    class FakePool:
+        statement_timeout_ms = 60000
+
+        def connection(self, statement_timeout_ms=None):
+            return borrow(("maintenance", statement_timeout_ms))
+
+    monkeypatch.setattr(query_backends, "scheduled_connection", lambda: borrow("scheduled"))
+    monkeypatch.setattr(query_backends, "get_connection_pool", FakePool)
+    monkeypatch.setenv("REDSHIFT_MAINTENANCE_STATEMENT_TIMEOUT_MS", "0")
+    backend = query_backends.RedshiftBackend()
+
+    backend.execute("SELECT 1")
+    backend.execute("SELECT 1", maintenance=True)
+    backend.execute_script("CREATE TABLE t (n INT)")
+    assert used == ["scheduled", ("maintenance", 0), ("maintenance", 0)]
+
+
+class FakeConnection:
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        self.description = [("n",)] if sql.startswith("SELECT") else None
+
+    def fetchall(self):
+        return [(1,)]
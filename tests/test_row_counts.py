@@ -0,0 +1,59 @@
+import datetime
+
+import natural_language_query_agent as agent
+from sql_guardrail import guard_sql
+
+
+def insert_logs(backend, log_group, count):
+    started = datetime.datetime(2026, 10, 1)
+    with backend.connection() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO cloudwatch_logs VALUES (?, ?, ?, ?)",
+                [(log_group, f"stream-{i % 7}", started + datetime.timedelta(seconds=i), f"request {i} handled in {i % 90}ms")
+                 for i in range(count)],
+            )
+
+
+def fetch(question, sql_query):
+    return agent.fetch_and_format(guard_sql(sql_query, question, max_rows=1000, check_cost=False))
+
+
+def test_guard_reports_only_the_limits_it_added_or_lowered():
+    guarded = guard_sql("SELECT * FROM (SELECT * FROM t LIMIT 5) AS s WHERE x = 1", max_rows=1000, check_cost=False)
+    assert guarded.sql == "SELECT * FROM (SELECT * FROM t LIMIT 5) AS s WHERE x = 1 LIMIT 1000"
+    assert guarded.count_sql == "SELECT * FROM (SELECT * FROM t LIMIT 5) AS s WHERE x = 1"
+    assert guarded.row_limit == 1000
+
+    lowered = guard_sql("SELECT 1 LIMIT 5000", max_rows=1000, check_cost=False)
+    assert lowered == ("SELECT 1 LIMIT 1000", "SELECT 1 LIMIT 5000", 1000)
+    assert guard_sql("SELECT 1 LIMIT 300", max_rows=1000, check_cost=False) == ("SELECT 1 LIMIT 300", None, None)
+
+
+def test_count_past_the_guardrail_limit_is_the_true_count(duckdb_backend):
+    insert_logs(duckdb_backend, "g", 5000)
+    result = fetch("Show the log messages in g", "SELECT log_stream, timestamp, message FROM cloudwatch_logs WHERE log_group = 'g'")
+    assert result.rows is None
+    assert "Total rows: 5000" in result.formatted
+    assert "the query returned only the first 1000 rows" in result.formatted
+    assert " of 5000):" in result.formatted
+
+
+def test_count_under_the_guardrail_limit_is_not_marked_truncated(duckdb_backend):
+    insert_logs(duckdb_backend, "g", 600)
+    result = fetch("Show the log messages in g", "SELECT log_stream, timestamp, message FROM cloudwatch_logs WHERE log_group = 'g'")
+    assert "Total rows: 600" in result.formatted
+    assert "truncated" not in result.formatted
+
+
+def test_top_n_the_user_asked_for_is_not_reported_as_truncated(duckdb_backend, monkeypatch):
+    insert_logs(duckdb_backend, "g", 5000)
+    counts = []
+    count = duckdb_backend.count
+    monkeypatch.setattr(duckdb_backend, "count", lambda sql_query: counts.append(sql_query) or count(sql_query))
+    result = fetch("Show the top 300 most recent log messages in g",
+                   "SELECT log_stream, timestamp, message FROM cloudwatch_logs WHERE log_group = 'g' "
+                   "ORDER BY timestamp DESC LIMIT 300")
+    assert "Total rows: 300" in result.formatted
+    assert "truncated" not in result.formatted
+    assert not counts
@@ -0,0 +1,17 @@
+from aws_config_schema_design import MERGED_TABLES, define_extended_schema, generate_create_table_sql, physical_design
+
+
+def test_merged_tables_get_a_compound_sort_key():
+    statements = generate_create_table_sql(define_extended_schema(), dialect="redshift")
+    for table_name in MERGED_TABLES:
+        assert "COMPOUND SORTKEY" in statements[table_name]
+    assert "COMPOUND SORTKEY (resource_type, region)" in statements["aws_config_resources_latest"]
+
+
+def test_append_only_equality_tables_stay_interleaved():
+    columns = [
+        {"name": "service", "type": "VARCHAR(255)", "filter": "equality"},
+        {"name": "region", "type": "VARCHAR(20)", "filter": "equality"},
+    ]
+    assert physical_design(columns)["sortkey_style"] == "INTERLEAVED"
+    assert physical_design(columns, merged=True)["sortkey_style"] == "COMPOUND"
@@ -0,0 +1,63 @@
+import time
+
+from aws_config_schema_design import define_extended_schema
+from query_backends import DuckDBBackend
+from schema_provider import SchemaProvider
+
+
+def wait_for_refresh(provider, snapshot):
+    for _ in range(100):
+        if provider.snapshot() is not snapshot:
+            return provider.snapshot()
+        time.sleep(0.02)
+    raise AssertionError("the schema was not refreshed")
+
+
+def test_designed_schema_is_served_until_the_tables_exist():
+    backend = DuckDBBackend(":memory:")
+    try:
+        provider = SchemaProvider(backend)
+        fallback = provider.snapshot()
+        assert not fallback.introspected
+        assert set(fallback.schemas) == set(define_extended_schema())
+
+        backend.create_tables()
+        snapshot = wait_for_refresh(provider, fallback)
+        assert snapshot.introspected
+        assert set(snapshot.schemas) == set(define_extended_schema())
+    finally:
+        backend.close()
+
+
+def test_statistics_come_from_a_bounded_sample_and_unchanged_tables_are_not_resampled(duckdb_backend):
+    duckdb_backend.execute(
+        "INSERT INTO quota_details (service, quota_name, quota_value, region) "
+        "SELECT 'svc-' || (i % 3), 'quota', i, 'us-east-1' FROM range(1000) t(i)"
+    )
+    provider = SchemaProvider(duckdb_backend, sample_rows=10)
+    snapshot = provider.build()
+    assert snapshot.versions["quota_details"] == 1000
+    assert sorted(snapshot.values("quota_details", "service")) == ["svc-0", "svc-1", "svc-2"]
+    assert "-- quota_details.service sampled values include: 'svc-0', 'svc-1', 'svc-2'" in snapshot.column_hints(snapshot.schemas)
+
+    sampled = []
+    execute = duckdb_backend.execute
+    duckdb_backend.execute = lambda sql, params=None, **kwargs: sampled.append(sql) or execute(sql, params, **kwargs)
+    try:
+        provider.build(snapshot)
+    finally:
+        duckdb_backend.execute = execute
+    assert not [sql for sql in sampled if "sampled" in sql]
+    assert sampled
+
+
+def test_ranges_cover_the_whole_table_and_small_tables_are_not_marked_sampled(duckdb_backend):
+    duckdb_backend.execute(
+        "INSERT INTO cloudwatch_logs (log_group, timestamp) "
+        "SELECT 'g', TIMESTAMP '2026-01-01' + i * INTERVAL 1 DAY FROM range(100) t(i)"
+    )
+    duckdb_backend.execute("INSERT INTO quota_details (service, region) VALUES ('ec2', 'us-east-1')")
+    snapshot = SchemaProvider(duckdb_backend, sample_rows=10).build()
+    hints = snapshot.column_hints(snapshot.schemas)
+    assert "-- cloudwatch_logs.timestamp ranges from 2026-01-01 to 2026-04-10" in hints
+    assert "-- quota_details.service values: 'ec2'" in hints
@@ -0,0 +1,90 @@
+import pytest
+
+from bulk_loader import BulkLoader
+from service_quota_collector import QUOTA_COLUMNS, collect_service_quotas
+from watermark_store import WatermarkStore
+
+QUOTAS = {
+    "ec2": [{"ServiceCode": "ec2", "QuotaName": "Running instances", "Value": 64.0, "Unit": "None"}],
+    "s3": [{"ServiceCode": "s3", "QuotaName": "Buckets", "Value": 100.0, "Unit": "None"}],
+}
+
+
+class FakeServiceQuotas:
+    def __init__(self, quotas):
+        self.quotas = quotas
+
+    def list_services(self, **kwargs):
+        return {"Services": [{"ServiceCode": code} for code in self.quotas]}
+
+    def list_service_quotas(self, ServiceCode, **kwargs):
+        return {"Quotas": self.quotas[ServiceCode]}
+
+
+class FakeSession:
+    def __init__(self, quotas):
+        self.quotas = quotas
+
+    def client(self, service, region_name=None):
+        return FakeServiceQuotas(self.quotas)
+
+
+def collect(session, loader, store, **kwargs):
+    return collect_service_quotas(session, ["us-east-1", "us-west-2"], sink=loader.load, store=store,
+                                  refresh_interval=0, **kwargs)
+
+
+def test_changed_slices_are_replaced_in_one_load(duckdb_backend, tmp_path):
+    loader = BulkLoader("quota_details", QUOTA_COLUMNS, mode="local")
+    store = WatermarkStore(str(tmp_path / "watermarks.sqlite3"))
+    quotas = {code: list(rows) for code, rows in QUOTAS.items()}
+    session = FakeSession(quotas)
+
+    assert collect(session, loader, store)["records"] == 4
+    assert loader.batches_loaded == 1
+
+    assert collect(session, loader, store)["records"] == 0
+    assert loader.batches_loaded == 1
+
+    quotas["ec2"] = [dict(QUOTAS["ec2"][0], Value=128.0)]
+    assert collect(session, loader, store)["records"] == 2
+    assert loader.batches_loaded == 2
+    rows = duckdb_backend.execute("SELECT service, region, quota_value FROM quota_details ORDER BY 1, 2")
+    assert rows == [("ec2", "us-east-1", 128.0), ("ec2", "us-west-2", 128.0),
+                    ("s3", "us-east-1", 100.0), ("s3", "us-west-2", 100.0)]
+
+
+def test_changed_slices_are_replaced_in_bounded_loads(duckdb_backend, tmp_path):
+    loader = BulkLoader("quota_details", QUOTA_COLUMNS, mode="local")
+    store = WatermarkStore(str(tmp_path / "watermarks.sqlite3"))
+    loads = []
+
+    def sink(rows, replace_where=None):
+        loads.append(len(rows))
+        if len(loads) == 2:
+            raise RuntimeError("COPY failed")
+        loader.load(rows, replace_where=replace_where)
+
+    with pytest.raises(RuntimeError):
+        collect_service_quotas(FakeSession(QUOTAS), ["us-east-1", "us-west-2"], sink=sink, store=store,
+                               refresh_interval=0, batch_size=2, max_workers=1)
+    # Only the slices of the load that committed are remembered; the next run replaces the rest.
+    assert loads == [2, 2]
+    assert collect(FakeSession(QUOTAS), loader, store, batch_size=2)["records"] == 2
+    assert duckdb_backend.execute("SELECT COUNT(*) FROM quota_details")[0][0] == 4
+
+
+def test_default_sink_stages_through_the_sessions_s3_client(monkeypatch):
+    import service_quota_collector
+
+    session = FakeSession(QUOTAS)
+    built = {}
+
+    def create_bulk_loader(table, columns, s3_client=None, **kwargs):
+        built["s3_client"] = s3_client
+        return BulkLoader(table, columns, mode="local")
+
+    monkeypatch.setattr(service_quota_collector, "create_bulk_loader", create_bulk_loader)
+    collect_service_quotas(session, [], store=None)
+    assert built["s3_client"] is service_quota_collector.get_client(session, "s3")
+
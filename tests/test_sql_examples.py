@@ -0,0 +1,23 @@
+import natural_language_query_agent as agent
+from answer_renderer import QueryResult
+from sql_examples import ExampleStore
+
+SQL = "SELECT region, COUNT(*) FROM aws_config_resources GROUP BY region"
+
+
+def remember(monkeypatch, tmp_path, result):
+    store = ExampleStore(str(tmp_path / "examples.sqlite3"))
+    monkeypatch.setattr(agent, "get_example_store", lambda: store)
+    monkeypatch.setattr(agent, "get_translation_cache", lambda: None)
+    agent.remember_verified_sql("How many resources per region?", "schema", SQL, result)
+    return store.nearest("How many resources per region?", agent.get_query_backend().dialect)
+
+
+def test_sql_that_returned_rows_is_learned(duckdb_backend, monkeypatch, tmp_path):
+    result = QueryResult(SQL, ["region", "count"], [("us-east-1", 3)], "region,count\nus-east-1,3")
+    assert [sql for _score, _question, sql in remember(monkeypatch, tmp_path, result)] == [SQL]
+
+
+def test_sql_that_found_nothing_is_not_learned(duckdb_backend, monkeypatch, tmp_path):
+    result = QueryResult(SQL, ["region", "count"], [], "(no rows returned)")
+    assert remember(monkeypatch, tmp_path, result) == []
@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+
+from query_backends import dialect_note
+from schema_provider import ColumnStats, SchemaSnapshot
+from translation_cache import schema_fingerprint
+
+SCHEMAS = {
+    "quota_details": [
+        {"name": "service", "type": "VARCHAR(64)", "cardinality": "low"},
+        {"name": "collected_at", "type": "TIMESTAMP"},
+    ],
+}
+
+
+def prompt_schema(schemas, regions, newest, sampled=False):
+    stats = {
+        ("quota_details", "service"): ColumnStats(regions, None, None, sampled),
+        ("quota_details", "collected_at"): ColumnStats(None, datetime.date(2024, 1, 1), newest),
+    }
+    return dialect_note() + SchemaSnapshot(schemas, stats, {}).render()
+
+
+def test_refreshed_column_hints_keep_the_cache_key(duckdb_backend):
+    before = prompt_schema(SCHEMAS, ["ec2", "s3"], datetime.date(2024, 6, 1))
+    # The table also outgrew the statistics sample, so its values are now labelled as sampled.
+    after = prompt_schema(SCHEMAS, ["ec2", "s3", "lambda"], datetime.date(2024, 6, 2), sampled=True)
+    assert before != after
+    assert schema_fingerprint(before) == schema_fingerprint(after)
+
+
+def test_ddl_changes_change_the_cache_key(duckdb_backend):
+    widened = {"quota_details": SCHEMAS["quota_details"] + [{"name": "unit", "type": "VARCHAR(32)"}]}
+    newest = datetime.date(2024, 6, 1)
+    assert (schema_fingerprint(prompt_schema(SCHEMAS, ["ec2"], newest))
+            != schema_fingerprint(prompt_schema(widened, ["ec2"], newest)))
+
+
+def test_query_processor_forgets_a_cached_translation_the_guardrail_rejects(duckdb_backend, monkeypatch, tmp_path):
+    import query_processor
+    import translation_cache
+    from sql_guardrail import QueryRejected
+
+    cache = translation_cache.TranslationCache(str(tmp_path / "translations.sqlite3"))
+    monkeypatch.setattr(translation_cache, "_cache", cache)
+    monkeypatch.setenv("TRANSLATION_CACHE_ENABLED", "1")
+    schema = "CREATE TABLE quota_details (service VARCHAR(64));"
+    cache.put("Drop the quotas", query_processor.dialect_note() + schema, "DROP TABLE quota_details", 1.0)
+
+    with pytest.raises(QueryRejected):
+        query_processor.process_user_query("Drop the quotas", schema)
+    assert cache.get("Drop the quotas", query_processor.dialect_note() + schema) is None
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = ".translation_cache.sqlite3"
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+
+# Column value/range hints rendered by SchemaSnapshot.column_hints; they follow the data, not the schema.
+COLUMN_HINT_PATTERN = re.compile(r"^[ \t]*-- \w+\.\w+ (?:values:|sampled values include:|ranges from) .*$", re.MULTILINE)
+
+
+def normalize_question(question):
+    """Normalize a question so trivially different phrasings share a cache entry."""
+    question = question.strip().lower()
+    question = re.sub(r"\s+", " ", question)
+    return question.rstrip(" ?.!")
+
+
+def schema_fingerprint(schema):
+    """Hash the schema prompt without its column hints; DDL changes yield new cache keys, new statistics do not."""
+    ddl = COLUMN_HINT_PATTERN.sub("", schema)
+    return hashlib.sha256(" ".join(ddl.split()).encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Bounded in-memory LRU of NL->SQL translations backed by an on-disk SQLite store with TTL."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_CACHE_SIZE, ttl_seconds=DEFAULT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (sql, created_at, generation_seconds)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "latency_saved_seconds": 0.0}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                cache_key TEXT PRIMARY KEY,
+                schema_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql_query TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                generation_seconds REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - ttl_seconds,))
+        self._db.commit()
+
+    def _key(self, question, schema):
+        schema_hash = schema_fingerprint(schema)
+        key = hashlib.sha256(f"{schema_hash}\n{normalize_question(question)}".encode("utf-8")).hexdigest()
+        return key, schema_hash
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, question, schema):
+        """Return the cached SQL for this question and schema, or None."""
+        key, _ = self._key(question, schema)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            else:
+                self._memory.pop(key, None)
+                row = self._db.execute(
+                    "SELECT sql_query, created_at, generation_seconds FROM translations WHERE cache_key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None or now - row[1] >= self.ttl_seconds:
+                    self._stats["misses"] += 1
+                    return None
+                entry = tuple(row)
+                self._remember(key, entry)
+            self._stats["hits"] += 1
+            self._stats["latency_saved_seconds"] += entry[2]
+        logger.info("Translation cache hit, saved %.2fs of SQL generation", entry[2])
+        return entry[0]
+
+    def put(self, question, schema, sql_query, generation_seconds):
+        """Store a fresh translation along with how long the model took to produce it."""
+        key, schema_hash = self._key(question, schema)
+        entry = (sql_query, time.time(), generation_seconds)
+        with self._lock:
+            self._remember(key, entry)
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, schema_hash, normalize_question(question), sql_query, entry[1], generation_seconds),
+            )
+            self._db.commit()
+
+    def invalidate(self, question=None, schema=None):
+        """Drop one translation, or everything if no question is given."""
+        with self._lock:
+            if question is None:
+                self._memory.clear()
+                self._db.execute("DELETE FROM translations")
+            else:
+                key, _ = self._key(question, schema)
+                self._memory.pop(key, None)
+                self._db.execute("DELETE FROM translations WHERE cache_key = ?", (key,))
+            self._db.commit()
+
+    def stats(self):
+        """Return hit rate and total model latency avoided by cache hits."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    """Return the process-wide translation cache, or None if disabled via TRANSLATION_CACHE_ENABLED=0."""
+    global _cache
+    if os.getenv("TRANSLATION_CACHE_ENABLED", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache(
+                path=os.getenv("TRANSLATION_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+                ttl_seconds=float(os.getenv("TRANSLATION_CACHE_TTL", DEFAULT_CACHE_TTL)),
+            )
+        return _cache
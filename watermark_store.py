@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_WATERMARK_PATH = ".collector_watermarks.sqlite3"
+
+
+class WatermarkStore:
+    """Persisted per-(collector, region) high-water marks so collectors only fetch what is new."""
+
+    def __init__(self, path=DEFAULT_WATERMARK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                collector TEXT NOT NULL,
+                region TEXT NOT NULL,
+                watermark TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (collector, region)
+            )
+            """
+        )
+        self._db.commit()
+
+    def get(self, collector, region, default=None):
+        """Return the stored watermark, or default if the collector has never run in this region."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT watermark FROM watermarks WHERE collector = ? AND region = ?",
+                (collector, region),
+            ).fetchone()
+        return row[0] if row else default
+
+    def set(self, collector, region, watermark):
+        """Advance the watermark; call only after the corresponding rows are committed."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?)",
+                (collector, region, str(watermark), time.time()),
+            )
+            self._db.commit()
+
+    def reset(self, collector=None):
+        """Forget watermarks (for one collector or all) to force a full re-scan."""
+        with self._lock:
+            if collector is None:
+                self._db.execute("DELETE FROM watermarks")
+            else:
+                self._db.execute("DELETE FROM watermarks WHERE collector = ?", (collector,))
+            self._db.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_watermark_store():
+    """Return the process-wide watermark store at WATERMARK_STORE_PATH."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WatermarkStore(os.getenv("WATERMARK_STORE_PATH", DEFAULT_WATERMARK_PATH))
+        return _store